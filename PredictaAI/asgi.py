@@ -3,6 +3,12 @@ ASGI config for PredictaAI project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Las vistas del chatbot y del comando de voz son async: servidas con un servidor
+ASGI (p. ej. ``uvicorn PredictaAI.asgi:application``) un solo proceso atiende
+muchas conversaciones mientras espera las respuestas de OpenAI. Los endpoints
+SSE (chat/stream/ y api/eventos/) entregan un generador async cuando la petición
+llega por ASGI y uno síncrono por WSGI (runserver), así transmiten en ambos.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -76,6 +76,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # WAL: las lecturas (análisis del chatbot) no bloquean las ventas en curso
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL;',
+        },
     }
 }
 
@@ -85,6 +89,8 @@ USE_I18N = True
 USE_TZ = True
 
 OPENAI_API_KEY = config("OPENAI_API_KEY")
+# URL alternativa de la API (proxy o servidor compatible); vacío = api.openai.com
+OPENAI_BASE_URL = config("OPENAI_BASE_URL", default="") or None
 LOGIN_URL = 'custom_auth:login'
 
 # Configuración servicio SMTP, consultar con William sobre el tema
@@ -94,3 +100,52 @@ EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD")
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL")
+
+# Notificaciones en tiempo real: ventana (ms) para agrupar pings por empresa
+REALTIME_COALESCE_WINDOW_MS = config("REALTIME_COALESCE_WINDOW_MS", default=250, cast=int)
+
+# Backend de notificaciones: FirebaseRestNotifier, BroadcastNotifier (SSE),
+# LoggingNotifier o InMemoryNotifier (apps.companies.services.notifiers)
+FIREBASE_DATABASE_URL = config("FIREBASE_DATABASE_URL", default="https://predictai-8f5bb-default-rtdb.firebaseio.com/")
+REALTIME_NOTIFIER = {
+    'BACKEND': config("REALTIME_NOTIFIER_BACKEND", default="apps.companies.services.notifiers.FirebaseRestNotifier"),
+    'OPTIONS': {},
+}
+
+# Versiones de datos ('catalogo', 'datos'): cada proceso relee los contadores de la
+# base de datos como mucho cada estos segundos (cuánto tarda en ver los cambios de otro worker)
+VERSIONES_REFRESCO_S = config("VERSIONES_REFRESCO_S", default=1.0, cast=float)
+
+# Punto de venta: segundos que dura una reserva de stock sin actividad del carrito
+POS_RESERVA_TTL_SEGUNDOS = config("POS_RESERVA_TTL_SEGUNDOS", default=300, cast=int)
+
+# Búsqueda de productos: auto (FTS5 en SQLite, trigramas en PostgreSQL), fts5, trigram o simple
+BUSQUEDA_PRODUCTOS = config("BUSQUEDA_PRODUCTOS", default="auto")
+
+# Chatbot: máximo de preguntas con SQL generado guardadas (se desalojan las usadas hace más tiempo)
+SQL_CACHE_MAX_ENTRADAS = config("SQL_CACHE_MAX_ENTRADAS", default=500, cast=int)
+
+# Chatbot: memoria máxima (bytes) para resultados de consultas mientras no cambien los datos
+SQL_RESULT_CACHE_BYTES = config("SQL_RESULT_CACHE_BYTES", default=32 * 1024 * 1024, cast=int)
+
+# Chatbot: queries de un análisis en paralelo (hilos) y segundos máximos por análisis
+ANALISIS_SQL_HILOS = config("ANALISIS_SQL_HILOS", default=4, cast=int)
+ANALISIS_SQL_TIMEOUT = config("ANALISIS_SQL_TIMEOUT", default=10, cast=float)
+
+# Chatbot: límites por query generada (segundos, filas devueltas y costo del plan)
+SQL_QUERY_TIMEOUT = config("SQL_QUERY_TIMEOUT", default=5, cast=float)
+SQL_MAX_FILAS = config("SQL_MAX_FILAS", default=1000, cast=int)
+SQL_MAX_COSTO = config("SQL_MAX_COSTO", default=50_000_000, cast=int)
+
+# Chatbot: tokens máximos (aprox.) del resultado de una herramienta enviado al LLM
+CHATBOT_TOOL_MAX_TOKENS = config("CHATBOT_TOOL_MAX_TOKENS", default=2000, cast=int)
+
+# Chatbot: extracción de conocimiento en segundo plano (intercambios por llamada al LLM,
+# segundos de espera para juntar un lote, y si el proceso web vacía la cola o solo
+# el comando procesar_conocimiento)
+CONOCIMIENTO_LOTE = config("CONOCIMIENTO_LOTE", default=10, cast=int)
+CONOCIMIENTO_ESPERA_S = config("CONOCIMIENTO_ESPERA_S", default=5, cast=float)
+CONOCIMIENTO_EN_PROCESO = config("CONOCIMIENTO_EN_PROCESO", default=True, cast=bool)
+
+# Chatbot: omitir la extracción en saludos y preguntas (reglas locales, sin LLM)
+CONOCIMIENTO_FILTRO = config("CONOCIMIENTO_FILTRO", default=True, cast=bool)
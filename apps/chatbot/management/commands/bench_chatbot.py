@@ -0,0 +1,199 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import time
+
+from apps.chatbot.models import Conversacion, ExtraccionPendiente
+from apps.chatbot.services.cola_conocimiento import procesar_pendientes
+from apps.chatbot.services.llm_clients import reiniciar_clientes
+from apps.chatbot.services.openai_stub import OpenAIStubServer
+
+MODOS = ['wsgi', 'asgi']
+RUTAS = {
+    # Sin palabras de escritura: pasa por el asistente (una pregunta: no encola extracción)
+    'chat': '/chatbot/chat/api/',
+    'voz': '/sales/api/comando-voz/',
+}
+MENSAJE_CHAT = '¿Cómo van las ventas de hoy?'
+TITULO_BENCH = 'bench_chatbot'
+
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[indice]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide cuántas conversaciones simultáneas atiende el chatbot contra un OpenAI falso con latencia: '
+        'workers síncronos (WSGI) frente a un solo proceso con las vistas async (ASGI)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conversaciones', type=int, default=40, help='Peticiones simultáneas')
+        parser.add_argument('--workers', type=int, default=4, help='Workers del modo wsgi (hilos bloqueantes)')
+        parser.add_argument('--latencia', type=int, default=500, help='Latencia del OpenAI falso por llamada (ms)')
+        parser.add_argument('--modo', action='append', choices=MODOS,
+                            help='Modo a medir (repetible). Por defecto ambos')
+        parser.add_argument('--ruta', action='append', choices=list(RUTAS),
+                            help='Endpoint a medir (repetible). Por defecto todos')
+        parser.add_argument('--json', action='store_true', help='Imprimir el reporte en JSON')
+
+    def handle(self, *args, **options):
+        self.options = options
+        modos = options['modo'] or MODOS
+        rutas = options['ruta'] or list(RUTAS)
+
+        if options['verbosity'] < 2:
+            logging.getLogger('apps').setLevel(logging.CRITICAL)
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+        reportes = []
+        with OpenAIStubServer(latency_ms=options['latencia']) as stub:
+            # La cola de conocimiento se vacía aparte, después de medir las respuestas
+            with override_settings(OPENAI_BASE_URL=stub.base_url, CONOCIMIENTO_EN_PROCESO=False):
+                reiniciar_clientes()
+                try:
+                    for ruta in rutas:
+                        for modo in modos:
+                            reportes.append(self._ejecutar(stub, ruta, modo))
+                finally:
+                    reiniciar_clientes()
+
+        if options['json']:
+            self.stdout.write(json.dumps(reportes, indent=2))
+        else:
+            for reporte in reportes:
+                self._imprimir_reporte(reporte)
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def _ejecutar(self, stub, ruta, modo):
+        conversaciones = [
+            Conversacion.objects.create(titulo=TITULO_BENCH).id
+            for _ in range(self.options['conversaciones'])
+        ]
+        peticiones = [self._payload(ruta, conversacion_id) for conversacion_id in conversaciones]
+        ultima_extraccion = ExtraccionPendiente.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        stub.reiniciar_contadores()
+        # Los print de depuración del asistente no deben ensuciar el reporte
+        silencio = contextlib.redirect_stdout(io.StringIO()) if self.options['verbosity'] < 2 else contextlib.nullcontext()
+        try:
+            with silencio:
+                inicio = time.perf_counter()
+                if modo == 'wsgi':
+                    resultados = self._ejecutar_wsgi(RUTAS[ruta], peticiones)
+                else:
+                    resultados = asyncio.run(self._ejecutar_asgi(RUTAS[ruta], peticiones))
+                duracion = time.perf_counter() - inicio
+
+                llamadas_respuesta = stub.peticiones
+                extraccion = self._vaciar_cola(stub, ultima_extraccion)
+        finally:
+            Conversacion.objects.filter(id__in=conversaciones).delete()
+
+        latencias = sorted(latencia for _, latencia in resultados)
+        ok = sum(1 for status, _ in resultados if status == 200)
+        return {
+            'ruta': ruta,
+            'modo': modo,
+            'workers': self.options['workers'] if modo == 'wsgi' else 1,
+            'conversaciones': len(peticiones),
+            'ok': ok,
+            'errores': len(resultados) - ok,
+            'duracion_s': round(duracion, 3),
+            'peticiones_por_segundo': round(ok / duracion, 2) if duracion else 0,
+            'latencia_ms': {
+                'p50': round(_percentil(latencias, 50), 2),
+                'p95': round(_percentil(latencias, 95), 2),
+                'max': round(latencias[-1], 2) if latencias else 0,
+            },
+            'llamadas_openai': llamadas_respuesta,
+            'max_llamadas_simultaneas': stub.max_simultaneas,
+            'extraccion': extraccion,
+        }
+
+    def _vaciar_cola(self, stub, ultima_extraccion):
+        """Procesa la extracción de conocimiento encolada por las peticiones medidas"""
+        encolados = ExtraccionPendiente.objects.filter(id__gt=ultima_extraccion).count()
+        if not encolados:
+            return None
+
+        llamadas = stub.peticiones
+        inicio = time.perf_counter()
+        totales = procesar_pendientes()
+        return {
+            'intercambios': totales['procesados'],
+            'llamadas_openai': stub.peticiones - llamadas,
+            'duracion_s': round(time.perf_counter() - inicio, 3),
+        }
+
+    def _payload(self, ruta, conversacion_id):
+        if ruta == 'chat':
+            return {'mensaje': MENSAJE_CHAT, 'conversacion_id': conversacion_id}
+        return {'texto': '¿cuánto va?', 'contexto': {'productos': 2, 'total': 5.5}}
+
+    def _ejecutar_wsgi(self, path, peticiones):
+        """Cada worker atiende una petición a la vez, como un worker WSGI"""
+        workers = self.options['workers']
+
+        def worker(indice):
+            cliente = Client()
+            resultados = []
+            try:
+                for payload in peticiones[indice::workers]:
+                    inicio = time.perf_counter()
+                    response = cliente.post(path, data=json.dumps(payload), content_type='application/json')
+                    resultados.append((response.status_code, (time.perf_counter() - inicio) * 1000))
+            finally:
+                connections.close_all()
+            return resultados
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return [r for parte in pool.map(worker, range(workers)) for r in parte]
+
+    async def _ejecutar_asgi(self, path, peticiones):
+        """Todas las peticiones a la vez sobre el handler ASGI, en un solo event loop"""
+        cliente = AsyncClient()
+
+        async def enviar(payload):
+            inicio = time.perf_counter()
+            response = await cliente.post(path, data=json.dumps(payload), content_type='application/json')
+            return response.status_code, (time.perf_counter() - inicio) * 1000
+
+        return await asyncio.gather(*(enviar(payload) for payload in peticiones))
+
+    # ------------------------------------------------------------------
+    # Reporte
+    # ------------------------------------------------------------------
+
+    def _imprimir_reporte(self, r):
+        lat = r['latencia_ms']
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"▶ {r['ruta']} / {r['modo']} ({r['workers']} worker{'s' if r['workers'] != 1 else ''})"
+        ))
+        self.stdout.write(f"  OK: {r['ok']}/{r['conversaciones']}  errores: {r['errores']}")
+        self.stdout.write(f"  Throughput: {r['peticiones_por_segundo']} peticiones/s en {r['duracion_s']} s")
+        self.stdout.write(f"  Latencia ms  p50={lat['p50']}  p95={lat['p95']}  max={lat['max']}")
+        self.stdout.write(
+            f"  Llamadas a OpenAI: {r['llamadas_openai']} (máximo {r['max_llamadas_simultaneas']} simultáneas)"
+        )
+        if r['extraccion']:
+            ext = r['extraccion']
+            self.stdout.write(
+                f"  Extracción en segundo plano: {ext['intercambios']} intercambios en "
+                f"{ext['llamadas_openai']} llamadas ({ext['duracion_s']} s)"
+            )
@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand, CommandError
+from collections import Counter
+from pathlib import Path
+import json
+import logging
+
+from apps.chatbot.models import MensajeChat
+from apps.chatbot.services.filtro_conocimiento import clasificar_mensaje
+
+logger = logging.getLogger(__name__)
+
+MUESTRA = Path(__file__).resolve().parents[2] / 'data' / 'muestra_conocimiento.json'
+
+
+class Command(BaseCommand):
+    help = 'Mide precisión y exhaustividad del filtro de conocimiento contra una muestra etiquetada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--muestra', default=str(MUESTRA),
+                            help='JSON con [{"mensaje": ..., "conocimiento": true|false}, ...]')
+        parser.add_argument('--historial', type=int, default=0,
+                            help='Además, porcentaje omitido en los últimos N mensajes reales de usuario')
+        parser.add_argument('--errores', action='store_true', help='Listar los mensajes mal clasificados')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['muestra'], encoding='utf-8') as archivo:
+                muestra = json.load(archivo)
+        except (OSError, json.JSONDecodeError) as e:
+            raise CommandError(f'No se pudo leer la muestra: {e}')
+
+        conteo = Counter()
+        errores = []
+        for ejemplo in muestra:
+            predicho, motivo = clasificar_mensaje(ejemplo['mensaje'])
+            real = bool(ejemplo['conocimiento'])
+            conteo[(predicho, real)] += 1
+            if predicho != real:
+                errores.append((real, motivo, ejemplo['mensaje']))
+
+        vp, fp = conteo[(True, True)], conteo[(True, False)]
+        fn, vn = conteo[(False, True)], conteo[(False, False)]
+        precision = vp / (vp + fp) if vp + fp else 0.0
+        exhaustividad = vp / (vp + fn) if vp + fn else 0.0
+        f1 = 2 * precision * exhaustividad / (precision + exhaustividad) if precision + exhaustividad else 0.0
+        omitidos = (fn + vn) / len(muestra) if muestra else 0.0
+
+        resumen = (
+            f'precision={precision:.3f} exhaustividad={exhaustividad:.3f} f1={f1:.3f} '
+            f'omitidos={omitidos:.1%} (n={len(muestra)}, vp={vp}, fp={fp}, fn={fn}, vn={vn})'
+        )
+        logger.info(f'Filtro de conocimiento: {resumen}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'▶ Muestra: {options["muestra"]}'))
+        self.stdout.write(f'  Precisión: {precision:.1%}  (de lo que se envía al LLM, cuánto tenía conocimiento)')
+        self.stdout.write(f'  Exhaustividad: {exhaustividad:.1%}  (del conocimiento real, cuánto se envía)')
+        self.stdout.write(f'  F1: {f1:.3f}   Llamadas omitidas: {omitidos:.1%}')
+        self.stdout.write(f'  VP={vp}  FP={fp}  FN={fn}  VN={vn}')
+
+        if options['errores'] and errores:
+            self.stdout.write('')
+            for real, motivo, mensaje in errores:
+                etiqueta = 'perdido' if real else 'de más'
+                self.stdout.write(self.style.WARNING(f'  ✗ {etiqueta} ({motivo}): {mensaje}'))
+
+        if options['historial']:
+            self._historial(options['historial'])
+
+    def _historial(self, limite):
+        mensajes = list(
+            MensajeChat.objects.filter(tipo='user').order_by('-fecha')
+            .values_list('mensaje', flat=True)[:limite]
+        )
+        if not mensajes:
+            self.stdout.write('  Sin mensajes de usuario en el historial')
+            return
+
+        motivos = Counter(clasificar_mensaje(mensaje)[1] for mensaje in mensajes)
+        enviados = sum(1 for mensaje in mensajes if clasificar_mensaje(mensaje)[0])
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING(f'▶ Historial: últimos {len(mensajes)} mensajes de usuario'))
+        self.stdout.write(f'  Llamadas omitidas: {1 - enviados / len(mensajes):.1%}')
+        self.stdout.write('  Motivos: ' + ', '.join(f'{motivo}={n}' for motivo, n in motivos.most_common()))
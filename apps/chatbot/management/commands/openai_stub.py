@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+import time
+
+from apps.chatbot.services.openai_stub import OpenAIStubServer
+
+
+class Command(BaseCommand):
+    help = 'Levanta un servidor local que imita la API de chat completions de OpenAI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=9098)
+        parser.add_argument('--latencia', type=int, default=800, help='Latencia artificial por petición (ms)')
+
+    def handle(self, *args, **options):
+        stub = OpenAIStubServer(
+            host=options['host'],
+            port=options['port'],
+            latency_ms=options['latencia']
+        )
+        stub.start()
+
+        self.stdout.write(self.style.SUCCESS(f'✓ OpenAI stub en {stub.base_url}'))
+        self.stdout.write(f'  Usa OPENAI_BASE_URL={stub.base_url} para apuntar el servidor aquí')
+        self.stdout.write('  Ctrl+C para detener')
+
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stdout.write(f'  {stub.peticiones} peticiones recibidas (máximo {stub.max_simultaneas} simultáneas)')
+            stub.stop()
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+import time
+
+from apps.chatbot.models import ExtraccionPendiente
+from apps.chatbot.services.cola_conocimiento import MAX_INTENTOS, procesar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Extrae el conocimiento de los intercambios de chat encolados, por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, help='Intercambios por llamada al LLM (por defecto CONOCIMIENTO_LOTE)')
+        parser.add_argument('--continuo', action='store_true', help='Seguir revisando la cola (worker)')
+        parser.add_argument('--intervalo', type=float, default=5, help='Segundos entre revisiones con --continuo')
+
+    def handle(self, *args, **options):
+        if not options['continuo']:
+            self._procesar(options['lote'])
+            return
+
+        self.stdout.write(f'Revisando la cola cada {options["intervalo"]} s (Ctrl+C para detener)')
+        try:
+            while True:
+                close_old_connections()
+                self._procesar(options['lote'], silencioso=True)
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+
+    def _procesar(self, lote, silencioso=False):
+        totales = procesar_pendientes(tamano_lote=lote)
+        if silencioso and not totales['lotes']:
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {totales['procesados']} intercambios en {totales['lotes']} llamadas, "
+            f"{totales['items']} items de conocimiento guardados"
+        ))
+        if totales['fallidos']:
+            self.stdout.write(self.style.WARNING(f"⚠️ {totales['fallidos']} intercambios fallaron; se reintentarán"))
+
+        agotados = ExtraccionPendiente.objects.filter(intentos__gte=MAX_INTENTOS).count()
+        if agotados:
+            self.stdout.write(self.style.WARNING(f'⚠️ {agotados} intercambios agotaron los {MAX_INTENTOS} intentos (ver campo error)'))
@@ -123,4 +123,46 @@ class InsightNegocio(models.Model):
         ordering = ['-detectado_en']
     
     def __str__(self):
-        return f"[{self.get_severidad_display()}] {self.titulo}"
\ No newline at end of file
+        return f"[{self.get_severidad_display()}] {self.titulo}"
+
+class ConsultaSQLCache(models.Model):
+    """
+    SQL generado por el LLM para una pregunta ya vista (evita repetir la llamada)
+    """
+    clave = models.CharField(max_length=64, unique=True)  # hash de pregunta + tipo + versión
+    pregunta = models.TextField()  # Pregunta normalizada
+    tipo_analisis = models.CharField(max_length=30)
+    version_esquema = models.CharField(max_length=16)  # Hash del prompt que generó el SQL
+    consultas = models.JSONField(default=list)  # Lista de queries SQL
+
+    aciertos = models.PositiveIntegerField(default=0)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    usado_en = models.DateTimeField(db_index=True)  # Para desalojar la menos usada recientemente
+
+    class Meta:
+        ordering = ['-usado_en']
+        verbose_name_plural = "Caché de consultas SQL"
+
+    def __str__(self):
+        return f"[{self.tipo_analisis}] {self.pregunta[:50]} ({self.aciertos} aciertos)"
+
+
+class ExtraccionPendiente(models.Model):
+    """
+    Intercambio de chat en cola para extraer conocimiento fuera de la petición
+    """
+    mensaje_usuario = models.TextField()
+    respuesta_bot = models.TextField()
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    lote = models.CharField(max_length=32, null=True, blank=True, db_index=True)  # Worker que lo tomó
+    tomado_en = models.DateTimeField(null=True, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default='')  # Último error del LLM
+
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = "Extracciones de conocimiento pendientes"
+
+    def __str__(self):
+        return f"{self.mensaje_usuario[:50]} ({self.intentos} intentos)"
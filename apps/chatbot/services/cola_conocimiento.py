@@ -0,0 +1,182 @@
+"""
+Cola de Extracción de Conocimiento
+La extracción de memoria (una llamada extra al LLM con un prompt largo) ya no
+se hace dentro de la petición del chat: el intercambio se guarda en la tabla
+ExtraccionPendiente y un worker lo procesa después, varios por llamada.
+
+- En el proceso web, un hilo de fondo despierta con cada mensaje encolado,
+  espera unos segundos para juntar más y vacía la cola por lotes.
+- Con CONOCIMIENTO_EN_PROCESO=False solo la vacía el comando
+  procesar_conocimiento (cron o un worker aparte con --continuo).
+
+Al estar en la base de datos, lo encolado no se pierde si el proceso se reinicia.
+"""
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from datetime import timedelta
+import threading
+import time
+import uuid
+import logging
+
+from apps.chatbot.models import ExtraccionPendiente
+from .filtro_conocimiento import clasificar_mensaje
+from .memory_manager import extraer_conocimiento_lote, guardar_conocimiento
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = 3
+# Un lote tomado por un worker que murió vuelve a estar disponible tras este tiempo
+TOMA_EXPIRA = timedelta(minutes=10)
+
+
+def encolar_extraccion(mensaje_usuario, respuesta_bot):
+    """
+    Guarda el intercambio para extraer conocimiento más tarde (no llama al LLM)
+
+    Saludos, preguntas y pedidos no se encolan (filtro_conocimiento).
+
+    Returns:
+        True si quedó en cola
+    """
+    if getattr(settings, 'CONOCIMIENTO_FILTRO', True):
+        merece, motivo = clasificar_mensaje(mensaje_usuario)
+        if not merece:
+            logger.debug(f"Extracción omitida ({motivo}): {mensaje_usuario[:80]}")
+            return False
+
+    ExtraccionPendiente.objects.create(
+        mensaje_usuario=mensaje_usuario,
+        respuesta_bot=respuesta_bot or ''
+    )
+
+    if getattr(settings, 'CONOCIMIENTO_EN_PROCESO', True):
+        # Tras el commit: el hilo de fondo usa otra conexión y debe ver la fila
+        transaction.on_commit(get_cola_conocimiento().avisar)
+
+    return True
+
+
+def procesar_pendientes(tamano_lote=None, max_lotes=None):
+    """
+    Vacía la cola por lotes: una llamada al LLM por lote
+
+    Returns:
+        Dict con intercambios procesados, lotes, items guardados y fallidos
+    """
+    if tamano_lote is None:
+        tamano_lote = getattr(settings, 'CONOCIMIENTO_LOTE', 10)
+
+    totales = {'procesados': 0, 'lotes': 0, 'items': 0, 'fallidos': 0}
+    while max_lotes is None or totales['lotes'] < max_lotes:
+        pendientes = _tomar_lote(tamano_lote)
+        if not pendientes:
+            break
+
+        totales['lotes'] += 1
+        try:
+            resultado = extraer_conocimiento_lote(
+                [(p.mensaje_usuario, p.respuesta_bot) for p in pendientes]
+            )
+            items = resultado.get('items') if resultado.get('hay_conocimiento') else None
+            if items:
+                guardados = guardar_conocimiento(items)
+                totales['items'] += len(guardados)
+                logger.info(f"💾 Conocimiento guardado: {guardados}")
+        except Exception as e:
+            logger.error(f"❌ Error extrayendo conocimiento ({len(pendientes)} intercambios): {e}")
+            # Se liberan para reintentar; tras MAX_INTENTOS quedan para revisión
+            ExtraccionPendiente.objects.filter(id__in=[p.id for p in pendientes]).update(
+                lote=None, tomado_en=None, intentos=F('intentos') + 1, error=str(e)[:1000]
+            )
+            totales['fallidos'] += len(pendientes)
+            break
+
+        ExtraccionPendiente.objects.filter(id__in=[p.id for p in pendientes]).delete()
+        totales['procesados'] += len(pendientes)
+
+    return totales
+
+
+def _tomar_lote(tamano_lote):
+    """
+    Marca hasta tamano_lote intercambios con un identificador propio y los devuelve
+
+    El UPDATE condicionado evita que dos workers (hilo web y comando) tomen el
+    mismo intercambio, en cualquier base de datos.
+    """
+    ahora = timezone.now()
+    disponibles = (
+        ExtraccionPendiente.objects
+        .filter(intentos__lt=MAX_INTENTOS)
+        .filter(Q(lote__isnull=True) | Q(tomado_en__lt=ahora - TOMA_EXPIRA))
+    )
+    ids = list(disponibles.order_by('id').values_list('id', flat=True)[:tamano_lote])
+    if not ids:
+        return []
+
+    lote = uuid.uuid4().hex
+    disponibles.filter(id__in=ids).update(lote=lote, tomado_en=ahora)
+    return list(ExtraccionPendiente.objects.filter(lote=lote).order_by('id'))
+
+
+class ColaConocimiento:
+    """
+    Hilo de fondo que vacía la cola en el proceso web.
+
+    Cada aviso lo despierta; antes de procesar espera CONOCIMIENTO_ESPERA_S para
+    que los mensajes que llegan seguidos viajen en la misma llamada al LLM.
+    """
+
+    def __init__(self, espera_s=5):
+        self.espera = max(espera_s, 0)
+        self._evento = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def avisar(self):
+        self._iniciar()
+        self._evento.set()
+
+    def _iniciar(self):
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name='cola-conocimiento', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            self._evento.wait()
+            # Ventana para juntar más intercambios en el mismo lote
+            if self.espera:
+                time.sleep(self.espera)
+            self._evento.clear()
+
+            close_old_connections()
+            try:
+                totales = procesar_pendientes()
+                if totales['lotes']:
+                    logger.debug(f"Cola de conocimiento: {totales}")
+            except Exception as e:
+                logger.error(f"❌ Error en la cola de conocimiento: {e}")
+            finally:
+                connection.close()
+
+
+_cola = None
+_cola_lock = threading.Lock()
+
+
+def get_cola_conocimiento():
+    """Worker de fondo compartido del proceso, configurado desde settings"""
+    global _cola
+    if _cola is None:
+        with _cola_lock:
+            if _cola is None:
+                _cola = ColaConocimiento(espera_s=getattr(settings, 'CONOCIMIENTO_ESPERA_S', 5))
+    return _cola
@@ -0,0 +1,142 @@
+"""
+Compactador de resultados
+Convierte el resultado de analizar_datos_negocio en tablas CSV compactas para
+el mensaje 'tool' de la segunda llamada al LLM: sin repetir los nombres de
+columna en cada fila, con números redondeados y un presupuesto de tokens.
+"""
+
+from django.conf import settings
+from datetime import date, datetime
+from decimal import Decimal
+import csv
+import io
+import json
+
+# Sin tokenizador instalado: ~4 caracteres por token es la aproximación habitual
+CARACTERES_POR_TOKEN = 4
+
+FILAS_INICIALES = 50
+FILAS_MINIMAS = 5
+
+
+def estimar_tokens(texto):
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+
+def compactar_resultado(resultado, max_tokens=None):
+    """
+    Texto para el mensaje 'tool' que respeta el presupuesto de tokens
+
+    Las tablas se recortan a las primeras filas (el SQL ya viene ordenado por
+    relevancia); del resto se informa cuántas filas son y la suma, mínimo y
+    máximo de cada columna numérica, para no perder los totales.
+    """
+    if max_tokens is None:
+        max_tokens = getattr(settings, 'CHATBOT_TOOL_MAX_TOKENS', 2000)
+
+    if not isinstance(resultado, dict) or not isinstance(resultado.get('resultados'), list):
+        texto = json.dumps(resultado, ensure_ascii=False, default=_a_texto)
+        return _recortar(texto, max_tokens)
+
+    encabezado = _encabezado(resultado)
+
+    filas = FILAS_INICIALES
+    while True:
+        bloques = [
+            _tabla(indice, item, filas)
+            for indice, item in enumerate(resultado['resultados'], start=1)
+        ]
+        texto = '\n\n'.join([encabezado] + bloques)
+        if estimar_tokens(texto) <= max_tokens or filas <= FILAS_MINIMAS:
+            break
+        filas = max(FILAS_MINIMAS, filas // 2)
+
+    return _recortar(texto, max_tokens)
+
+
+def _encabezado(resultado):
+    lineas = [f"success: {str(resultado.get('success', False)).lower()}"]
+    for clave in ('tipo_analisis', 'consulta_original', 'message'):
+        if resultado.get(clave):
+            lineas.append(f"{clave}: {resultado[clave]}")
+    return '\n'.join(lineas)
+
+
+def _tabla(indice, item, max_filas):
+    data = item.get('data') or []
+    total = item.get('row_count', len(data))
+
+    titulo = f"## Resultado {indice}: {total} filas"
+    if item.get('truncado'):
+        titulo += f" (la consulta tenía más; se leyeron solo {item.get('max_filas', total)})"
+    if not data:
+        return titulo
+
+    columnas = list(data[0].keys())
+    visibles, resto = data[:max_filas], data[max_filas:]
+
+    salida = io.StringIO()
+    escritor = csv.writer(salida, lineterminator='\n')
+    escritor.writerow(columnas)
+    for fila in visibles:
+        escritor.writerow([_valor(fila.get(columna)) for columna in columnas])
+
+    texto = f"{titulo}\n{salida.getvalue().rstrip()}"
+    if resto:
+        texto += f"\n{_resumen_resto(columnas, resto)}"
+    return texto
+
+
+def _resumen_resto(columnas, filas):
+    """'(+120 filas más; total: suma=..., min=..., max=...)' por columna numérica"""
+    partes = []
+    for columna in columnas:
+        numeros = [
+            float(fila[columna]) for fila in filas
+            if isinstance(fila.get(columna), (int, float, Decimal)) and not isinstance(fila.get(columna), bool)
+        ]
+        if numeros:
+            partes.append(
+                f"{columna}: suma={_numero(sum(numeros))}, min={_numero(min(numeros))}, max={_numero(max(numeros))}"
+            )
+
+    resumen = f"(+{len(filas)} filas más"
+    if partes:
+        resumen += '; ' + '; '.join(partes)
+    return resumen + ')'
+
+
+def _valor(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return str(valor).lower()
+    if isinstance(valor, (float, Decimal)):
+        return _numero(valor)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _numero(valor):
+    """Dos decimales como máximo y sin ceros de relleno (12.5, 3, 0.33)"""
+    redondeado = round(float(valor), 2)
+    if redondeado == int(redondeado):
+        return str(int(redondeado))
+    return f"{redondeado:.2f}".rstrip('0')
+
+
+def _a_texto(valor):
+    if isinstance(valor, Decimal):
+        return float(round(valor, 2))
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _recortar(texto, max_tokens):
+    """Último recurso: cortar el texto si aun así supera el presupuesto"""
+    limite = max_tokens * CARACTERES_POR_TOKEN
+    if len(texto) <= limite:
+        return texto
+    return texto[:limite] + '\n[...recortado por longitud]'
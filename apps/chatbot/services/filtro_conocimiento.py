@@ -0,0 +1,108 @@
+"""
+Filtro de Conocimiento
+Reglas locales (sin LLM) que deciden si un mensaje del dueño puede contener
+información que valga la pena recordar: metas, preferencias, datos del negocio,
+estrategias o restricciones. Los saludos y las preguntas ('¿cuánto vendí hoy?')
+no se envían al extractor.
+
+La precisión y la exhaustividad contra la muestra etiquetada se miden con el
+comando evaluar_filtro_conocimiento.
+"""
+
+from apps.companies.services.tabla_nombres import normalizar_texto
+import re
+
+# Reglas que indican conocimiento, sobre el texto normalizado (sin tildes)
+REGLAS = [
+    ('meta', re.compile(
+        r'\b(mi|nuestra|la) (meta|objetivo)\b|\bme propongo\b|\bmi proposito\b'
+        r'|\bquiero (vender|llegar|alcanzar|crecer|ganar|facturar|abrir|aumentar|duplicar|reducir|bajar|subir|tener)\b'
+        r'|\bqueremos (vender|llegar|alcanzar|crecer|ganar|abrir|aumentar)\b'
+        r'|\b(espero|planeo|pienso|aspiro a) (vender|llegar|crecer|abrir|ganar|facturar)\b'
+    )),
+    ('preferencia', re.compile(
+        r'\bmi(s)? (producto|productos|articulo|linea|servicio)s? (estrella|principal|principales|favorito|mas vendidos?)\b'
+        r'|\bprefiero\b|\bpreferimos\b|\bme (enfoco|especializo|concentro)\b|\bnos (enfocamos|especializamos|concentramos)\b'
+        r'|\bmi fuerte\b|\blo que mas vendo\b|\bmi (cliente|publico) (principal|objetivo)\b'
+    )),
+    ('dato_clave', re.compile(
+        r'\btengo \d+ (empleados?|trabajadores?|vendedores?|sucursales?|locales?|tiendas?|cajas?|socios?)\b'
+        r'|\bsomos \d+\b|\bmi (horario|local|tienda|negocio|empresa|proveedor|socio) (es|esta|queda|abre|cierra)\b'
+        r'|\b(abrimos|abro|cerramos|cierro|atendemos|atiendo) (de|a las|los|todos|lunes|sabados|domingos)\b'
+        r'|\bmi negocio (es|se dedica)\b|\bsomos una?\b|\bnos dedicamos\b|\bme dedico\b'
+        r'|\btengo una? (tienda|negocio|local|papeleria|libreria|farmacia|restaurante|panaderia|bodega|ferreteria|minimarket)\b'
+        r'|\bmis (clientes|proveedores) (son|vienen|compran)\b|\bmi proveedor\b'
+        r'|\bpago (de )?(arriendo|alquiler|renta)\b|\bmi (arriendo|alquiler|renta)\b'
+    )),
+    ('estrategia', re.compile(
+        r'\bvoy a (hacer|implementar|lanzar|ofrecer|empezar|dar|poner|subir|bajar|abrir|cerrar|vender|comprar|contratar)\b'
+        r'|\bvamos a (hacer|implementar|lanzar|ofrecer|empezar|dar|poner|subir|bajar|abrir)\b'
+        r'|\bimplementare\b|\blanzare\b|\bhare (una|un|promo)\b|\bdecidi\b|\bdecidimos\b|\bmi estrategia\b'
+        r'|\ba partir de (ahora|hoy|manana|la proxima)\b|\bdesde ahora\b'
+    )),
+    ('restriccion', re.compile(
+        r'\bno (puedo|podemos) (invertir|gastar|contratar|subir|bajar|abrir|pagar|vender)\b'
+        r'|\b(solo|solamente|unicamente) (vendo|vendemos|trabajo|trabajamos|acepto|aceptamos|atiendo|atendemos)\b'
+        r'|\bno (vendo|vendemos|acepto|aceptamos|trabajo|trabajamos|fio|fiamos)\b'
+        r'|\bmi presupuesto\b|\bal por mayor\b|\bnunca (vendo|vendemos|hago|hacemos)\b'
+    )),
+]
+
+# Mensajes formados solo por estas palabras son saludos o cortesía
+PALABRAS_SALUDO = {
+    'hola', 'holi', 'buenas', 'buenos', 'buen', 'dia', 'dias', 'tardes', 'noches', 'hey', 'saludos',
+    'gracias', 'muchas', 'mil', 'ok', 'okay', 'vale', 'listo', 'perfecto', 'genial', 'excelente',
+    'chao', 'adios', 'hasta', 'luego', 'bye', 'si', 'no', 'claro', 'entendido', 'de', 'acuerdo',
+    'muy', 'bien', 'super', 'jaja', 'y', 'igualmente',
+}
+# Preguntas y pedidos al asistente que empiezan así: 'cuánto...', 'dame...', 'muéstrame...'
+INTERROGATIVO = re.compile(
+    r'^\W*(que|cual|cuales|cuanto|cuantos|cuantas|como|donde|cuando|quien|quienes|por que|para que'
+    r'|dame|dime|muestrame|mostrar|muestra|lista|listar|ensename|explicame|calcula|calcular|analiza|analizar'
+    r'|compara|comparar|busca|buscar|recomiendame|sugiereme|ayudame|necesito saber|puedes|podrias|sabes)\b'
+)
+# Primera persona con una cifra ('tengo 3 cajas', 'gano $800 al mes', 'mi margen es 30%')
+CIFRA_PROPIA = re.compile(
+    r'\b(mi|mis|tengo|tenemos|gano|ganamos|vendo|vendemos|pago|pagamos|invierto|quiero|nuestro|nuestra)\b'
+    r'.*(\$\s?\d|\d+\s?(%|mil|dolares|usd|por ciento|unidades|clientes))'
+)
+
+
+def clasificar_mensaje(mensaje):
+    """
+    Motivo por el que el mensaje merece (o no) una llamada al extractor
+
+    Returns:
+        (True, 'meta' | 'preferencia' | 'dato_clave' | 'estrategia' | 'restriccion' | 'cifra')
+        o (False, 'vacio' | 'saludo' | 'pregunta' | 'sin_patron')
+    """
+    texto = normalizar_texto(mensaje)
+    if not texto:
+        return False, 'vacio'
+
+    palabras = re.findall(r'\w+', texto)
+    if all(palabra in PALABRAS_SALUDO for palabra in palabras):
+        return False, 'saludo'
+
+    # Solo cuenta lo que el dueño afirma, no lo que pregunta: en
+    # '¿cuál es mi producto más vendido?' no hay nada que recordar, pero en
+    # 'mi meta es $8000, ¿cómo voy?' la primera parte sí lo es
+    es_pregunta = '?' in texto or '¿' in texto or bool(INTERROGATIVO.match(texto))
+    afirmacion = '' if INTERROGATIVO.match(texto) else texto.split('¿')[0]
+
+    for tipo, regla in REGLAS:
+        if regla.search(afirmacion):
+            return True, tipo
+
+    if es_pregunta:
+        return False, 'pregunta'
+
+    if CIFRA_PROPIA.search(texto):
+        return True, 'cifra'
+
+    return False, 'sin_patron'
+
+
+def merece_extraccion(mensaje):
+    """True si vale la pena gastar una llamada al LLM extrayendo conocimiento"""
+    return clasificar_mensaje(mensaje)[0]
@@ -1,13 +1,18 @@
-from openai import OpenAI
-from decouple import config
+from asgiref.sync import sync_to_async
 import json
 from .schema_generator import get_database_schema, get_sample_queries
 from .sql_executor import SafeSQLExecutor
+from . import sql_cache
+from .compactador import compactar_resultado
+from .llm_clients import get_client, get_async_client
 from .memory_manager import obtener_conocimiento_activo
-from apps.chatbot.models import InsightNegocio
+from apps.chatbot.models import ConocimientoNegocio, InsightNegocio
+from django.db.models import Count, Max
+import logging
+
+logger = logging.getLogger(__name__)
 
 
-client = OpenAI(api_key=config("OPENAI_API_KEY"))
 
 # ✅ AGREGAR NUEVA HERRAMIENTA DE INVESTIGACIÓN
 BUSINESS_TOOLS = [
@@ -83,10 +88,8 @@ Esta función busca:
 ]
 
 
-def analizar_datos_negocio(consulta, tipo_analisis):
-    """
-    Función universal que analiza datos y genera insights
-    """
+def _prompt_sql(tipo_analisis):
+    """Prompt de sistema para generar el SQL de un tipo de análisis"""
     
     # Prompt especializado según tipo de análisis
     if tipo_analisis == "recomendacion" or tipo_analisis == "prediccion":
@@ -103,17 +106,11 @@ Puedes generar MÚLTIPLES queries separadas por "|" si necesitas varios análisi
     else:
         analisis_prompt = """Genera la consulta SQL más apropiada para responder.
 
-Si la consulta menciona un nombre específico de producto, usa:
-- WHERE LOWER(nombre) LIKE LOWER('%nombre%')
-- Esto permite encontrar productos incluso con variaciones en el nombre"""
+Si la consulta menciona un nombre específico de producto, búscalo como indica
+la sección "Búsqueda de Productos" del esquema: así se encuentran productos
+incluso con variaciones en el nombre (tildes, mayúsculas, palabras sueltas)"""
     
-    # Paso 1: Generar SQL para obtener datos
-    sql_generation_response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": f"""Eres un experto en análisis de datos de negocios y SQL.
+    prompt_sql = f"""Eres un experto en análisis de datos de negocios y SQL.
 
 {get_database_schema()}
 
@@ -127,45 +124,121 @@ REGLAS ESTRICTAS:
 3. Tablas con prefijo "companies_"
 4. Para fechas: DATE('now'), DATE('now', '-X days'), strftime()
 5. Si necesitas varios análisis, separa queries con "|"
-6. Para buscar productos por nombre, usa LOWER(nombre) LIKE LOWER('%término%') para mayor flexibilidad
+6. Para buscar productos por nombre, sigue la sección "Búsqueda de Productos" del esquema
 7. Si no se puede responder con los datos disponibles, devuelve: NO_DATA
 """
-            },
-            {
-                "role": "user",
-                "content": f"Genera SQL para: {consulta}"
-            }
-        ],
-        temperature=0.1
-    )
-    
-    sql_queries = sql_generation_response.choices[0].message.content.strip()
+    return prompt_sql
+
+
+def _mensajes_sql(prompt_sql, consulta):
+    return [
+        {
+            "role": "system",
+            "content": prompt_sql
+        },
+        {
+            "role": "user",
+            "content": f"Genera SQL para: {consulta}"
+        }
+    ]
+
+
+def _queries_generadas(respuesta):
+    """Lista de queries del texto del LLM, o None si respondió NO_DATA"""
+    sql_queries = respuesta.strip()
     sql_queries = sql_queries.replace('```sql', '').replace('```', '').strip()
     
     # Verificar si no hay datos disponibles
     if sql_queries == "NO_DATA":
-        return {
-            "success": False,
-            "message": "No tengo suficiente información en la base de datos para responder esa pregunta."
-        }
+        return None
     
     # Ejecutar múltiples queries si es necesario
-    queries_list = [q.strip() for q in sql_queries.split('|') if q.strip()]
+    return [q.strip() for q in sql_queries.split('|') if q.strip()]
+
+
+SIN_DATOS = {
+    "success": False,
+    "message": "No tengo suficiente información en la base de datos para responder esa pregunta."
+}
+
+
+def analizar_datos_negocio(consulta, tipo_analisis):
+    """
+    Función universal que analiza datos y genera insights
+    """
+    prompt_sql = _prompt_sql(tipo_analisis)
+    
+    # Paso 1: Generar SQL para obtener datos (o reutilizar el de una pregunta igual)
+    queries_list = sql_cache.obtener(consulta, tipo_analisis, prompt_sql)
+    desde_cache = queries_list is not None
+    
+    if desde_cache:
+        logger.info(f"♻️ SQL desde caché para: {consulta}")
+    else:
+        sql_generation_response = get_client().chat.completions.create(
+            model="gpt-4o-mini",
+            messages=_mensajes_sql(prompt_sql, consulta),
+            temperature=0.1
+        )
+        
+        queries_list = _queries_generadas(sql_generation_response.choices[0].message.content)
+        if queries_list is None:
+            return dict(SIN_DATOS)
+    
+    return _ejecutar_analisis(consulta, tipo_analisis, prompt_sql, queries_list, desde_cache)
+
+
+async def analizar_datos_negocio_async(consulta, tipo_analisis):
+    """
+    Igual que analizar_datos_negocio: la generación del SQL espera a OpenAI sin
+    bloquear el event loop; la caché y las queries corren en el hilo del ORM
+    """
+    prompt_sql = await sync_to_async(_prompt_sql)(tipo_analisis)
+    
+    queries_list = await sync_to_async(sql_cache.obtener)(consulta, tipo_analisis, prompt_sql)
+    desde_cache = queries_list is not None
+    
+    if desde_cache:
+        logger.info(f"♻️ SQL desde caché para: {consulta}")
+    else:
+        sql_generation_response = await get_async_client().chat.completions.create(
+            model="gpt-4o-mini",
+            messages=_mensajes_sql(prompt_sql, consulta),
+            temperature=0.1
+        )
+        
+        queries_list = _queries_generadas(sql_generation_response.choices[0].message.content)
+        if queries_list is None:
+            return dict(SIN_DATOS)
     
+    return await sync_to_async(_ejecutar_analisis)(consulta, tipo_analisis, prompt_sql, queries_list, desde_cache)
+
+
+def _ejecutar_analisis(consulta, tipo_analisis, prompt_sql, queries_list, desde_cache):
+    """Ejecuta las queries, actualiza la caché de SQL y arma el resultado de la herramienta"""
+    
+    # Las queries de un mismo análisis corren en paralelo (con tiempo límite)
     all_results = []
-    for sql_query in queries_list:
+    for sql_query, result in zip(queries_list, SafeSQLExecutor.execute_many(queries_list)):
         print(f"🔍 SQL Generado: {sql_query}")
-        result = SafeSQLExecutor.execute_query(sql_query)
         
         if result["success"]:
             all_results.append({
                 "query": sql_query,
                 "data": result['data'],
-                "row_count": result['row_count']
+                "row_count": result['row_count'],
+                # Si se cortó en SQL_MAX_FILAS, el LLM no debe tratarlo como el total
+                **({"truncado": True, "max_filas": result['max_filas']} if result.get('truncado') else {})
             })
         else:
             print(f"❌ Error en query: {result['error']}")
     
+    if desde_cache and not all_results:
+        # El SQL guardado ya no funciona (p. ej. cambió la base de datos)
+        sql_cache.descartar(consulta, tipo_analisis, prompt_sql)
+    elif not desde_cache and all_results:
+        sql_cache.guardar(consulta, tipo_analisis, prompt_sql, [r['query'] for r in all_results])
+    
     # Si no hay resultados en ninguna query
     if not all_results or all(r['row_count'] == 0 for r in all_results):
         return {
@@ -181,29 +254,9 @@ REGLAS ESTRICTAS:
         "consulta_original": consulta
     }
 
-def asistente_negocio(mensaje, historial=None):
-    """
-    Asistente enfocado SOLO en el negocio con contexto conversacional Y memoria persistente
-    """
-    
-    # CARGAR MEMORIA PERSISTENTE
-    memoria_negocio = obtener_conocimiento_activo()
-    
-    # ✅ CARGAR INSIGHTS RECIENTES
-    from apps.chatbot.models import InsightNegocio
-    insights_recientes = InsightNegocio.objects.filter(activo=True).order_by('-detectado_en')[:10]
-    
-    insights_texto = ""
-    if insights_recientes.exists():
-        insights_texto = "\n\n# INSIGHTS Y PATRONES DETECTADOS AUTOMÁTICAMENTE:\n\n"
-        for insight in insights_recientes:
-            insights_texto += f"- [{insight.get_tipo_display()}] {insight.titulo}\n"
-            insights_texto += f"  {insight.descripcion}\n"
-            if insight.recomendacion:
-                insights_texto += f"  💡 Recomendación: {insight.recomendacion}\n"
-            insights_texto += "\n"
-    
-    system_prompt = """Eres un ASISTENTE DE NEGOCIO INTELIGENTE para MIPYMEs (micro, pequeñas y medianas empresas).
+# Parte fija del prompt: siempre va primero e idéntica, así el proveedor puede
+# reutilizar el prefijo ya procesado (prompt caching) entre mensajes
+PROMPT_ASISTENTE = """Eres un ASISTENTE DE NEGOCIO INTELIGENTE para MIPYMEs (micro, pequeñas y medianas empresas).
 
 TU PROPÓSITO ÚNICO:
 Ayudar al dueño a tomar mejores decisiones empresariales mediante análisis de datos REALES de su negocio.
@@ -334,13 +387,62 @@ FLUJO DE DECISIÓN:
 7. ¿Es saludo o pequeña charla profesional? → Responde directamente (usa memoria si es relevante)
 8. ¿Es completamente fuera de contexto Y no menciona productos? → Redirige educadamente
 """
+
+# (clave, texto): memoria e insights ya armados para la última clave vista
+_contexto_negocio = (None, '')
+
+
+def _contexto_dinamico():
+    """
+    Memoria persistente e insights recientes que van después de PROMPT_ASISTENTE
+
+    Solo se vuelve a armar cuando cambian: la clave es la última modificación y
+    el número de conocimientos activos, y la última detección y el número de
+    insights activos (dos agregados en lugar de leer todas las filas).
+    """
+    global _contexto_negocio
     
-    # AGREGAR MEMORIA AL PROMPT SI EXISTE
+    conocimiento = ConocimientoNegocio.objects.filter(activo=True).aggregate(
+        ultimo=Max('ultima_actualizacion'), total=Count('id')
+    )
+    insights = InsightNegocio.objects.filter(activo=True).aggregate(
+        ultimo=Max('detectado_en'), total=Count('id')
+    )
+    clave = (conocimiento['ultimo'], conocimiento['total'], insights['ultimo'], insights['total'])
+    
+    clave_guardada, texto = _contexto_negocio
+    if clave == clave_guardada:
+        return texto
+    
+    partes = []
+    
+    # MEMORIA PERSISTENTE
+    memoria_negocio = obtener_conocimiento_activo()
     if memoria_negocio:
-        system_prompt += f"\n\n{memoria_negocio}"
+        partes.append(f"\n\n{memoria_negocio}")
+    
+    # ✅ INSIGHTS RECIENTES
+    insights_recientes = list(InsightNegocio.objects.filter(activo=True).order_by('-detectado_en')[:10])
+    if insights_recientes:
+        partes.append("\n\n# INSIGHTS Y PATRONES DETECTADOS AUTOMÁTICAMENTE:\n\n")
+        for insight in insights_recientes:
+            partes.append(f"- [{insight.get_tipo_display()}] {insight.titulo}\n")
+            partes.append(f"  {insight.descripcion}\n")
+            if insight.recomendacion:
+                partes.append(f"  💡 Recomendación: {insight.recomendacion}\n")
+            partes.append("\n")
     
-    if insights_texto:
-        system_prompt += insights_texto
+    texto = ''.join(partes)
+    _contexto_negocio = (clave, texto)
+    return texto
+
+
+def _mensajes_asistente(mensaje, historial=None):
+    """
+    Mensajes de la primera llamada: prompt del asistente con memoria e insights,
+    historial de la conversación y el mensaje actual
+    """
+    system_prompt = PROMPT_ASISTENTE + _contexto_dinamico()
     
     messages = [{"role": "system", "content": system_prompt}]
     
@@ -351,8 +453,48 @@ FLUJO DE DECISIÓN:
     # Agregar el mensaje actual
     messages.append({"role": "user", "content": mensaje})
     
+    return messages
+
+
+def _ejecutar_herramienta(function_name, function_args):
+    """Ejecuta la función pedida por el LLM y devuelve el contenido del mensaje 'tool'"""
+    if function_name == "analizar_datos_negocio":
+        function_response = analizar_datos_negocio(
+            consulta=function_args["consulta"],
+            tipo_analisis=function_args["tipo_analisis"]
+        )
+    elif function_name == "investigar_producto_mercado":
+        function_response = investigar_producto_mercado(
+            producto=function_args["producto"],
+            tipo_investigacion=function_args["tipo_investigacion"]
+        )
+    else:
+        function_response = {"error": "Función no reconocida"}
+    
+    # Tablas compactas con presupuesto de tokens (no el JSON fila por fila)
+    return compactar_resultado(function_response)
+
+
+async def _ejecutar_herramienta_async(function_name, function_args):
+    """Como _ejecutar_herramienta; el análisis de datos no bloquea el event loop"""
+    if function_name == "analizar_datos_negocio":
+        function_response = await analizar_datos_negocio_async(
+            consulta=function_args["consulta"],
+            tipo_analisis=function_args["tipo_analisis"]
+        )
+        return compactar_resultado(function_response)
+    
+    return await sync_to_async(_ejecutar_herramienta)(function_name, function_args)
+
+
+def asistente_negocio(mensaje, historial=None):
+    """
+    Asistente enfocado SOLO en el negocio con contexto conversacional Y memoria persistente
+    """
+    messages = _mensajes_asistente(mensaje, historial)
+    
     # Primera llamada
-    first_response = client.chat.completions.create(
+    first_response = get_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=messages,
         tools=BUSINESS_TOOLS,
@@ -373,32 +515,202 @@ FLUJO DE DECISIÓN:
         function_name = tool_call.function.name
         function_args = json.loads(tool_call.function.arguments)
         
-        # Ejecutar la función apropiada
-        if function_name == "analizar_datos_negocio":
-            function_response = analizar_datos_negocio(
-                consulta=function_args["consulta"],
-                tipo_analisis=function_args["tipo_analisis"]
-            )
-        elif function_name == "investigar_producto_mercado":
-            function_response = investigar_producto_mercado(
-                producto=function_args["producto"],
-                tipo_investigacion=function_args["tipo_investigacion"]
-            )
-        else:
-            function_response = {"error": "Función no reconocida"}
+        messages.append({
+            "role": "tool",
+            "tool_call_id": tool_call.id,
+            "name": function_name,
+            "content": _ejecutar_herramienta(function_name, function_args)
+        })
+    
+    # Segunda llamada: generar respuesta con análisis
+    second_response = get_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        temperature=0.7
+    )
+    
+    return second_response.choices[0].message.content
+
+
+async def asistente_negocio_async(mensaje, historial=None):
+    """
+    Igual que asistente_negocio para vistas async: mientras OpenAI responde, el
+    proceso atiende otras conversaciones en lugar de dejar un worker esperando
+    """
+    messages = await sync_to_async(_mensajes_asistente)(mensaje, historial)
+    client = get_async_client()
+    
+    # Primera llamada
+    first_response = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        tools=BUSINESS_TOOLS,
+        tool_choice="auto"
+    )
+    
+    response_message = first_response.choices[0].message
+    tool_calls = response_message.tool_calls
+    
+    # Si NO usa herramientas → respuesta directa
+    if not tool_calls:
+        return response_message.content
+    
+    # Si USA herramientas → ejecutarlas
+    messages.append(response_message)
+    
+    for tool_call in tool_calls:
+        function_name = tool_call.function.name
+        function_args = json.loads(tool_call.function.arguments)
         
         messages.append({
             "role": "tool",
             "tool_call_id": tool_call.id,
             "name": function_name,
-            "content": json.dumps(function_response, ensure_ascii=False)
+            "content": await _ejecutar_herramienta_async(function_name, function_args)
         })
     
     # Segunda llamada: generar respuesta con análisis
-    second_response = client.chat.completions.create(
+    second_response = await client.chat.completions.create(
         model="gpt-4o-mini",
         messages=messages,
         temperature=0.7
     )
     
-    return second_response.choices[0].message.content
\ No newline at end of file
+    return second_response.choices[0].message.content
+
+
+def _acumular_llamadas(tool_calls, delta):
+    """Junta en tool_calls (índice -> {"id", "name", "arguments"}) los fragmentos de herramientas del chunk"""
+    for parcial in delta.tool_calls or []:
+        llamada = tool_calls.setdefault(parcial.index, {"id": None, "name": "", "arguments": ""})
+        if parcial.id:
+            llamada["id"] = parcial.id
+        if parcial.function and parcial.function.name:
+            llamada["name"] += parcial.function.name
+        if parcial.function and parcial.function.arguments:
+            llamada["arguments"] += parcial.function.arguments
+
+
+def _mensaje_llamadas(llamadas):
+    """Mensaje del asistente con las herramientas pedidas durante el stream"""
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {
+                "id": llamada["id"],
+                "type": "function",
+                "function": {"name": llamada["name"], "arguments": llamada["arguments"]}
+            }
+            for llamada in llamadas
+        ]
+    }
+
+
+def asistente_negocio_stream(mensaje, historial=None):
+    """
+    Igual que asistente_negocio pero entrega el texto por fragmentos a medida
+    que llega del modelo (generador de str).
+    
+    La primera llamada ya se pide en streaming: si responde directo, el primer
+    fragmento llega con la latencia de esa llamada. Si pide herramientas, se
+    juntan los fragmentos de las llamadas, se ejecutan y se transmite la segunda.
+    """
+    messages = _mensajes_asistente(mensaje, historial)
+    
+    first_stream = get_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        tools=BUSINESS_TOOLS,
+        tool_choice="auto",
+        stream=True
+    )
+    
+    tool_calls = {}
+    for chunk in first_stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        
+        if delta.content:
+            yield delta.content
+        _acumular_llamadas(tool_calls, delta)
+    
+    # Si NO usa herramientas → ya se transmitió la respuesta directa
+    if not tool_calls:
+        return
+    
+    llamadas = [tool_calls[indice] for indice in sorted(tool_calls)]
+    messages.append(_mensaje_llamadas(llamadas))
+    
+    for llamada in llamadas:
+        messages.append({
+            "role": "tool",
+            "tool_call_id": llamada["id"],
+            "name": llamada["name"],
+            "content": _ejecutar_herramienta(llamada["name"], json.loads(llamada["arguments"] or "{}"))
+        })
+    
+    # Segunda llamada en streaming: generar respuesta con análisis
+    second_stream = get_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        temperature=0.7,
+        stream=True
+    )
+    
+    for chunk in second_stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def asistente_negocio_stream_async(mensaje, historial=None):
+    """
+    Igual que asistente_negocio_stream para servidores ASGI (generador async de str):
+    cada fragmento sale en cuanto llega, sin ocupar un hilo por conversación
+    """
+    messages = await sync_to_async(_mensajes_asistente)(mensaje, historial)
+    client = get_async_client()
+    
+    first_stream = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        tools=BUSINESS_TOOLS,
+        tool_choice="auto",
+        stream=True
+    )
+    
+    tool_calls = {}
+    async for chunk in first_stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        
+        if delta.content:
+            yield delta.content
+        _acumular_llamadas(tool_calls, delta)
+    
+    if not tool_calls:
+        return
+    
+    llamadas = [tool_calls[indice] for indice in sorted(tool_calls)]
+    messages.append(_mensaje_llamadas(llamadas))
+    
+    for llamada in llamadas:
+        messages.append({
+            "role": "tool",
+            "tool_call_id": llamada["id"],
+            "name": llamada["name"],
+            "content": await _ejecutar_herramienta_async(llamada["name"], json.loads(llamada["arguments"] or "{}"))
+        })
+    
+    second_stream = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        temperature=0.7,
+        stream=True
+    )
+    
+    async for chunk in second_stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
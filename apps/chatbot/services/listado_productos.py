@@ -0,0 +1,89 @@
+"""
+Listado de Productos del Chatbot
+Páginas del catálogo por cursor (nombre, id) para no enviar ni guardar
+el catálogo completo en un solo mensaje.
+"""
+
+from django.db.models import Q
+from django.template.loader import render_to_string
+from apps.companies.models import Producto
+import base64
+import json
+
+TAMANO_PAGINA = 25
+
+# Lo que se guarda en el mensaje: el navegador pide las filas al mostrarlo
+REFERENCIA_LISTADO = (
+    '<strong>📦 Productos registrados ({total})</strong>\n\n'
+    '<div class="chatbot-listado" data-listado="productos"></div>'
+)
+
+
+def referencia_listado():
+    """Mensaje compacto del listado (None si no hay productos activos)"""
+    total = Producto.objects.filter(activo=True).count()
+    if not total:
+        return None
+    return REFERENCIA_LISTADO.format(total=total)
+
+
+def pagina_productos(cursor=None, tamano=TAMANO_PAGINA):
+    """
+    Una página de productos activos ordenados por nombre
+
+    Args:
+        cursor: Posición devuelta por la página anterior (None = primera página)
+
+    Returns:
+        Dict con filas y siguiente (cursor de la próxima página o None)
+    """
+    productos = Producto.objects.filter(activo=True)
+
+    despues = _leer_cursor(cursor)
+    if despues:
+        nombre, producto_id = despues
+        productos = productos.filter(Q(nombre__gt=nombre) | Q(nombre=nombre, id__gt=producto_id))
+
+    filas = list(
+        productos.order_by('nombre', 'id').values(
+            'id', 'nombre', 'stock_actual', 'precio_venta', 'categoria__nombre'
+        )[:tamano + 1]
+    )
+
+    siguiente = None
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        siguiente = _crear_cursor(filas[-1]['nombre'], filas[-1]['id'])
+
+    return {'filas': filas, 'siguiente': siguiente}
+
+
+def render_pagina_productos(cursor=None, tamano=TAMANO_PAGINA):
+    """
+    Página renderizada con la plantilla: la primera incluye la tabla completa,
+    las siguientes solo las filas para agregarlas al final
+
+    Returns:
+        Dict con html y siguiente
+    """
+    pagina = pagina_productos(cursor, tamano)
+    html = render_to_string('chatbot/fragmentos/productos_pagina.html', {
+        'filas': pagina['filas'],
+        'primera': not cursor,
+    })
+    return {'html': html, 'siguiente': pagina['siguiente']}
+
+
+def _crear_cursor(nombre, producto_id):
+    datos = json.dumps([nombre, producto_id], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(datos).decode()
+
+
+def _leer_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        nombre, producto_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(nombre), int(producto_id)
+    except (ValueError, TypeError):
+        return None
@@ -0,0 +1,58 @@
+"""
+Clientes de OpenAI
+Un solo lugar donde se crean los clientes (síncrono y asíncrono) con la clave y,
+si está configurada, la URL base alternativa (OPENAI_BASE_URL: proxy, servidor
+compatible u openai_stub para pruebas de carga).
+"""
+
+from django.conf import settings
+from openai import AsyncOpenAI, OpenAI
+import asyncio
+import threading
+import weakref
+
+_client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncOpenAI
+_lock = threading.Lock()
+
+
+def _opciones():
+    opciones = {'api_key': settings.OPENAI_API_KEY}
+    base_url = getattr(settings, 'OPENAI_BASE_URL', None)
+    if base_url:
+        opciones['base_url'] = base_url
+    return opciones
+
+
+def get_client():
+    """Cliente síncrono compartido del proceso (es seguro entre hilos)"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = OpenAI(**_opciones())
+    return _client
+
+
+def get_async_client():
+    """
+    Cliente asíncrono del event loop actual
+
+    Las conexiones de AsyncOpenAI pertenecen al loop donde se abrieron: bajo ASGI
+    hay un loop para todo el proceso, pero bajo WSGI Django crea uno por cada
+    petición a una vista async, así que se guarda un cliente por loop.
+    """
+    loop = asyncio.get_running_loop()
+    cliente = _async_clients.get(loop)
+    if cliente is None:
+        cliente = AsyncOpenAI(**_opciones())
+        _async_clients[loop] = cliente
+    return cliente
+
+
+def reiniciar_clientes():
+    """Descarta los clientes creados (p. ej. tras cambiar OPENAI_BASE_URL)"""
+    global _client
+    with _lock:
+        _client = None
+        _async_clients.clear()
@@ -1,23 +1,36 @@
-from openai import OpenAI
-from decouple import config
 import json
 from apps.chatbot.models import ConocimientoNegocio
+from django.conf import settings
 from django.utils import timezone
 
-client = OpenAI(api_key=config("OPENAI_API_KEY"))
-
-
-def extraer_conocimiento(mensaje_usuario, respuesta_bot):
-    """
-    Analiza la conversación y extrae conocimiento que vale la pena recordar
-    """
+from .filtro_conocimiento import merece_extraccion
+from .llm_clients import get_client
+
+# En lotes, las respuestas largas del bot (tablas, reportes) se recortan: el
+# conocimiento sale de lo que dice el dueño, no del detalle de la respuesta
+MAX_RESPUESTA_LOTE = 1500
+
+
+def _mensajes_extraccion(intercambios):
+    """Mensajes para el extractor; intercambios = [(mensaje_usuario, respuesta_bot), ...]"""
+    if len(intercambios) == 1:
+        mensaje_usuario, respuesta_bot = intercambios[0]
+        contenido = f"Usuario dijo: {mensaje_usuario}\nBot respondió: {respuesta_bot}"
+    else:
+        bloques = [
+            f"Intercambio {indice}:\nUsuario dijo: {mensaje_usuario}\nBot respondió: {respuesta_bot[:MAX_RESPUESTA_LOTE]}"
+            for indice, (mensaje_usuario, respuesta_bot) in enumerate(intercambios, start=1)
+        ]
+        contenido = (
+            "Varios intercambios, del más antiguo al más reciente. Devuelve UN solo JSON "
+            "con los items de todos; si dos hablan de la misma clave, usa el más reciente.\n\n"
+            + "\n\n".join(bloques)
+        )
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": """Eres un extractor de conocimiento de negocio.
+    return [
+        {
+            "role": "system",
+            "content": """Eres un extractor de conocimiento de negocio.
 
 Tu trabajo es identificar información CLAVE que el dueño del negocio menciona y que debería recordarse permanentemente.
 
@@ -86,19 +99,47 @@ Usuario: "¿Cuánto vendí hoy?"
   "items": []
 }
 """
-            },
-            {
-                "role": "user",
-                "content": f"Usuario dijo: {mensaje_usuario}\nBot respondió: {respuesta_bot}"
-            }
-        ],
+        },
+        {
+            "role": "user",
+            "content": contenido
+        }
+    ]
+
+
+def extraer_conocimiento(mensaje_usuario, respuesta_bot):
+    """
+    Analiza la conversación y extrae conocimiento que vale la pena recordar
+    """
+    return extraer_conocimiento_lote([(mensaje_usuario, respuesta_bot)], estricto=False)
+
+
+def extraer_conocimiento_lote(intercambios, estricto=True):
+    """
+    Igual que extraer_conocimiento para varios intercambios en una sola llamada
+    al LLM (el prompt de sistema, que es lo largo, se envía una vez)
+    
+    Args:
+        estricto: Si la salida no es JSON, lanzar json.JSONDecodeError en lugar de
+            tratarla como "sin conocimiento" (la cola libera el lote y lo reintenta)
+    """
+    
+    response = get_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=_mensajes_extraccion(intercambios),
         temperature=0.1
     )
     
+    return _leer_extraccion(response.choices[0].message.content, estricto)
+
+
+def _leer_extraccion(contenido, estricto=False):
     try:
-        resultado = json.loads(response.choices[0].message.content)
+        resultado = json.loads(contenido or '')
         return resultado
-    except:
+    except json.JSONDecodeError:
+        if estricto:
+            raise
         return {"hay_conocimiento": False, "items": []}
 
 
@@ -132,22 +173,24 @@ def obtener_conocimiento_activo():
     """
     Recupera todo el conocimiento activo del negocio
     """
-    conocimientos = ConocimientoNegocio.objects.filter(activo=True).order_by('-confianza', '-ultima_actualizacion')
+    conocimientos = list(
+        ConocimientoNegocio.objects.filter(activo=True).order_by('-confianza', '-ultima_actualizacion')
+    )
     
-    if not conocimientos.exists():
+    if not conocimientos:
         return None
     
     # Formatear para el prompt del LLM
-    memoria_texto = "# INFORMACIÓN CONOCIDA SOBRE ESTE NEGOCIO:\n\n"
+    lineas = ["# INFORMACIÓN CONOCIDA SOBRE ESTE NEGOCIO:\n\n"]
     
     for c in conocimientos:
-        memoria_texto += f"- **{c.get_tipo_display()}**: {c.clave} = {c.valor}\n"
+        lineas.append(f"- **{c.get_tipo_display()}**: {c.clave} = {c.valor}\n")
         if c.contexto:
-            memoria_texto += f"  _Contexto: {c.contexto}_\n"
+            lineas.append(f"  _Contexto: {c.contexto}_\n")
     
-    memoria_texto += "\n_Esta información fue mencionada por el dueño en conversaciones previas. Úsala cuando sea relevante._\n"
+    lineas.append("\n_Esta información fue mencionada por el dueño en conversaciones previas. Úsala cuando sea relevante._\n")
     
-    return memoria_texto
+    return ''.join(lineas)
 
 
 def generar_saludo_personalizado():
@@ -177,6 +220,13 @@ def procesar_y_guardar_conocimiento(mensaje_usuario, respuesta_bot):
     """
     Pipeline completo: extraer, guardar y retornar resultado
     """
+    if getattr(settings, 'CONOCIMIENTO_FILTRO', True) and not merece_extraccion(mensaje_usuario):
+        # Saludos y preguntas: no se gasta la llamada al LLM
+        return {
+            'conocimiento_guardado': False,
+            'items': []
+        }
+    
     resultado = extraer_conocimiento(mensaje_usuario, respuesta_bot)
     
     if resultado.get('hay_conocimiento') and resultado.get('items'):
@@ -189,4 +239,4 @@ def procesar_y_guardar_conocimiento(mensaje_usuario, respuesta_bot):
     return {
         'conocimiento_guardado': False,
         'items': []
-    }
\ No newline at end of file
+    }
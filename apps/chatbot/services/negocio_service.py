@@ -1,85 +1,68 @@
 from apps.companies.models import Producto, Venta, ItemVenta
-from django.db.models import Sum, Q
+from django.db.models import Sum
 from decimal import Decimal
-from rapidfuzz import fuzz, process
+from apps.companies.services.tabla_nombres import get_tabla_nombres, normalizar_texto
+from .listado_productos import referencia_listado
 
 def buscar_producto_inteligente(nombre_busqueda, umbral=60):
     """
     Búsqueda inteligente multicapa con autocompletado
     Retorna: (producto, es_exacto, similitud, sugerencias)
+    
+    Las capas (exacta, empieza con, todas las palabras, contiene, fonética, difusa) se
+    evalúan sobre la tabla de nombres en memoria, sin distinguir tildes ni
+    mayúsculas; solo el producto elegido se lee de la base de datos.
     """
     if not nombre_busqueda:
         return None, False, 0, []
     
-    nombre_limpio = nombre_busqueda.strip().lower()
-    productos = Producto.objects.filter(activo=True)
-    
-    if not productos.exists():
+    # Una sola foto del catálogo: índices, ids y nombres salen de la misma carga
+    tabla = get_tabla_nombres()
+    if not tabla.ids:
         return None, False, 0, []
     
-    # ✅ CAPA 1: Búsqueda exacta
-    producto_exacto = productos.filter(nombre__iexact=nombre_busqueda).first()
-    if producto_exacto:
-        return producto_exacto, True, 100, []
-    
-    # ✅ CAPA 2: Empieza con... (mayor prioridad)
-    productos_comienzan = productos.filter(nombre__istartswith=nombre_busqueda)
-    if productos_comienzan.count() == 1:
-        return productos_comienzan.first(), False, 95, []
-    elif productos_comienzan.count() > 1:
-        # Múltiples coincidencias - devolver sugerencias
-        sugerencias = [p.nombre for p in productos_comienzan[:5]]
-        return None, False, 90, sugerencias
+    consulta = normalizar_texto(nombre_busqueda)
+    capas = tabla.clasificar(consulta)
     
-    # ✅ CAPA 3: Contiene todas las palabras clave
-    palabras = nombre_limpio.split()
-    if len(palabras) >= 2:
-        # Buscar productos que contengan TODAS las palabras
-        q_objects = Q()
-        for palabra in palabras:
-            if len(palabra) > 2:  # Ignorar palabras muy cortas
-                q_objects &= Q(nombre__icontains=palabra)
-        
-        productos_palabras = productos.filter(q_objects)
-        if productos_palabras.count() == 1:
-            return productos_palabras.first(), False, 85, []
-        elif productos_palabras.count() > 1:
-            sugerencias = [p.nombre for p in productos_palabras[:5]]
-            return None, False, 80, sugerencias
+    # ✅ CAPA 1: Búsqueda exacta
+    if capas['exacto']:
+        return _cargar_producto(tabla, capas['exacto'][0]), True, 100, []
     
-    # ✅ CAPA 4: Contiene la frase (parcial)
-    productos_contienen = productos.filter(nombre__icontains=nombre_busqueda)
-    if productos_contienen.count() == 1:
-        return productos_contienen.first(), False, 75, []
-    elif productos_contienen.count() > 1:
-        sugerencias = [p.nombre for p in productos_contienen[:5]]
-        return None, False, 70, sugerencias
+    # ✅ CAPAS 2-4: Empieza con... / Todas las palabras / Contiene la frase
+    for capa, unico, varios in (('prefijo', 95, 90), ('palabras', 85, 80), ('contiene', 75, 70)):
+        indices = capas[capa]
+        if len(indices) == 1:
+            return _cargar_producto(tabla, indices[0]), False, unico, []
+        elif len(indices) > 1:
+            # Múltiples coincidencias - devolver sugerencias
+            return None, False, varios, [tabla.nombres[i] for i in indices[:5]]
     
-    # ✅ CAPA 5: Fuzzy matching (última opción)
-    nombres_productos = {p.nombre: p for p in productos}
-    resultado = process.extractOne(
-        nombre_busqueda,
-        nombres_productos.keys(),
-        scorer=fuzz.token_sort_ratio
-    )
+    # ✅ CAPA 5: Suena igual (transcripciones de voz: 'lapis', 'sacapunta')
+    candidatos = tabla.foneticos_de(consulta)
+    if candidatos:
+        resultados_foneticos = tabla.difusos(consulta, limite=5, minimo=40, indices=candidatos)
+        if resultados_foneticos and resultados_foneticos[0][1] >= umbral:
+            indice, similitud = resultados_foneticos[0]
+            return _cargar_producto(tabla, indice), False, similitud, []
     
-    if resultado and resultado[1] >= umbral:
-        nombre_match, similitud, _ = resultado
-        return nombres_productos[nombre_match], False, similitud, []
+    # ✅ CAPA 6: Fuzzy matching (última opción)
+    resultados_fuzzy = tabla.difusos(consulta, limite=5, minimo=40)
     
-    # ❌ No se encontró nada - intentar sugerencias generales
-    resultados_fuzzy = process.extract(
-        nombre_busqueda,
-        nombres_productos.keys(),
-        scorer=fuzz.token_sort_ratio,
-        limit=5
-    )
+    if resultados_fuzzy and resultados_fuzzy[0][1] >= umbral:
+        indice, similitud = resultados_fuzzy[0]
+        return _cargar_producto(tabla, indice), False, similitud, []
     
-    sugerencias = [r[0] for r in resultados_fuzzy if r[1] >= 40]
+    # ❌ No se encontró nada - sugerencias generales
+    sugerencias = [tabla.nombres[indice] for indice, _ in resultados_fuzzy]
     
     return None, False, 0, sugerencias
 
 
+def _cargar_producto(tabla, indice):
+    """Producto completo de la fila elegida (None si se borró entre medias)"""
+    return Producto.objects.select_related('categoria').filter(id=tabla.ids[indice]).first()
+
+
 def ejecutar_accion(data):
     accion = data.get("accion")
 
@@ -257,39 +240,13 @@ def ejecutar_accion(data):
     
     # 📋 LISTAR PRODUCTOS
     if accion == "listar_productos":
-        productos = Producto.objects.filter(activo=True)
+        # Solo una referencia: las filas se piden por páginas al mostrar el mensaje
+        referencia = referencia_listado()
 
-        if not productos.exists():
+        if not referencia:
             return "📦 No tienes productos registrados"
 
-        respuesta = """
-        <strong>📦 Productos registrados</strong>
-        <table style="width:100%; border-collapse: collapse; margin-top:8px;">
-            <thead>
-                <tr style="background:#4f46e5; color:white;">
-                    <th style="padding:6px; border:1px solid #ddd;">Producto</th>
-                    <th style="padding:6px; border:1px solid #ddd;">Stock</th>
-                    <th style="padding:6px; border:1px solid #ddd;">Precio</th>
-                </tr>
-            </thead>
-            <tbody>
-        """
-
-        for p in productos:
-            respuesta += f"""
-            <tr>
-                <td style="padding:6px; border:1px solid #ddd;">{p.nombre}</td>
-                <td style="padding:6px; border:1px solid #ddd; text-align:center;">
-                    {p.stock_actual}
-                </td>
-                <td style="padding:6px; border:1px solid #ddd;">
-                    ${p.precio_venta}
-                </td>
-            </tr>
-            """
-
-        respuesta += "</tbody></table>"
-        return respuesta
+        return referencia
 
     # 🤔 ACLARACIÓN
     if accion == "pedir_aclaracion":
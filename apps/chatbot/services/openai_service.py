@@ -1,18 +1,13 @@
-from openai import OpenAI
-from decouple import config
 import json
 import re
 
-client = OpenAI(
-    api_key=config("OPENAI_API_KEY")
-)
+from .llm_clients import get_client, get_async_client
 
-def interpretar_mensaje(mensaje):
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{
-            "role": "user",
-            "content": f"""
+
+def _mensajes_interpretacion(mensaje):
+    return [{
+        "role": "user",
+        "content": f"""
 Devuelve EXCLUSIVAMENTE JSON válido.
 NO texto adicional.
 NO markdown.
@@ -35,11 +30,29 @@ Reglas IMPORTANTES:
 
 Mensaje: "{mensaje}"
 """
-        }]
+    }]
+
+
+def interpretar_mensaje(mensaje):
+    response = get_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=_mensajes_interpretacion(mensaje)
     )
 
-    texto = response.choices[0].message.content
+    return _leer_interpretacion(response.choices[0].message.content)
+
+
+async def interpretar_mensaje_async(mensaje):
+    """Igual que interpretar_mensaje sin bloquear el event loop mientras responde OpenAI"""
+    response = await get_async_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=_mensajes_interpretacion(mensaje)
+    )
+
+    return _leer_interpretacion(response.choices[0].message.content)
+
 
+def _leer_interpretacion(texto):
     if not texto:
         return {"accion": "pedir_aclaracion"}
 
@@ -0,0 +1,208 @@
+"""
+OpenAI Stub Server
+Servidor HTTP local que imita POST /v1/chat/completions de OpenAI (con y sin
+stream) para probar y medir el chatbot sin salir a internet ni gastar tokens:
+
+    with OpenAIStubServer(latency_ms=500) as stub:
+        # OPENAI_BASE_URL=stub.base_url
+        stub.peticiones, stub.max_simultaneas
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+COMPLETIONS_PATH = '/v1/chat/completions'
+
+# Respuesta según el prompt recibido (marca en los mensajes -> contenido)
+RESPUESTAS = [
+    ('extractor de conocimiento', '{"hay_conocimiento": false, "items": []}'),
+    ('comandos de voz', json.dumps({
+        'accion': 'consultar_total',
+        'cantidad': None,
+        'confirmacion': False,
+        'respuesta_chatbot': 'Te digo el total.'
+    })),
+    ('Devuelve EXCLUSIVAMENTE JSON', '{"accion": "pedir_aclaracion", "producto": null, "cantidad": null}'),
+]
+RESPUESTA_CHAT = 'Hoy vendiste **$125.50** en 8 ventas. Tu producto más vendido fue el cuaderno espiral.'
+
+
+def contenido_para(mensajes):
+    texto = ' '.join(str(m.get('content') or '') for m in mensajes)
+    for marca, contenido in RESPUESTAS:
+        if marca in texto:
+            return contenido
+    return RESPUESTA_CHAT
+
+
+class _OpenAIStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, igual que la API real
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _responder(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        longitud = int(self.headers.get('Content-Length') or 0)
+        datos = self.rfile.read(longitud)
+
+        if self.path != COMPLETIONS_PATH:
+            self._responder(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+            return
+
+        try:
+            peticion = json.loads(datos or b'{}')
+        except json.JSONDecodeError:
+            self._responder(400, {'error': {'message': 'Invalid JSON', 'type': 'invalid_request_error'}})
+            return
+
+        self.server.entrar()
+        try:
+            if self.server.latency_ms:
+                time.sleep(self.server.latency_ms / 1000)
+
+            contenido = contenido_para(peticion.get('messages') or [])
+            modelo = peticion.get('model', 'gpt-4o-mini')
+            if peticion.get('stream'):
+                self._responder_stream(modelo, contenido)
+            else:
+                self._responder(200, self._completion(modelo, contenido))
+        finally:
+            self.server.salir()
+
+    def _completion(self, modelo, contenido):
+        return {
+            'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': modelo,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': contenido},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        }
+
+    def _responder_stream(self, modelo, contenido):
+        """Server-Sent Events: un chunk por palabra y 'data: [DONE]' al final"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        identificador = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+        palabras = contenido.split(' ')
+        for indice, palabra in enumerate(palabras):
+            chunk = {
+                'id': identificador,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': modelo,
+                'choices': [{
+                    'index': 0,
+                    'delta': {'content': palabra if indice == 0 else f' {palabra}'},
+                    'finish_reason': 'stop' if indice == len(palabras) - 1 else None,
+                }],
+            }
+            self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.close_connection = True
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # muchas conexiones a la vez en las pruebas de carga
+
+    def __init__(self, address, latency_ms):
+        super().__init__(address, _OpenAIStubHandler)
+        self.latency_ms = latency_ms
+        self.peticiones = 0
+        self.simultaneas = 0
+        self.max_simultaneas = 0
+        self._lock = threading.Lock()
+
+    def entrar(self):
+        with self._lock:
+            self.peticiones += 1
+            self.simultaneas += 1
+            self.max_simultaneas = max(self.max_simultaneas, self.simultaneas)
+
+    def salir(self):
+        with self._lock:
+            self.simultaneas -= 1
+
+
+class OpenAIStubServer:
+    """
+    Servidor stub de OpenAI en un hilo de fondo.
+
+    Args:
+        host: Interfaz donde escuchar
+        port: Puerto (0 = puerto libre aleatorio)
+        latency_ms: Latencia artificial por petición (simula el tiempo del modelo)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def base_url(self):
+        """Valor para OPENAI_BASE_URL"""
+        return f"{self.url}/v1"
+
+    @property
+    def peticiones(self):
+        return self._server.peticiones if self._server else 0
+
+    @property
+    def max_simultaneas(self):
+        return self._server.max_simultaneas if self._server else 0
+
+    def reiniciar_contadores(self):
+        if self._server:
+            with self._server._lock:
+                self._server.peticiones = 0
+                self._server.max_simultaneas = self._server.simultaneas
+
+    def start(self):
+        self._server = _StubHTTPServer((self.host, self.port), self.latency_ms)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"🧪 OpenAI stub escuchando en {self.base_url} (latencia {self.latency_ms} ms)")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join(timeout=5)
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
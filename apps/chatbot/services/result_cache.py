@@ -0,0 +1,162 @@
+"""
+Caché de resultados SQL
+Filas de las consultas del asistente guardadas en memoria mientras los datos
+del negocio no cambien (versión 'datos': ventas, compras, productos).
+"""
+
+from collections import OrderedDict
+from django.conf import settings
+from django.utils import timezone
+import json
+import re
+import threading
+import time
+import logging
+
+from apps.companies.services.versioning import get_version
+
+logger = logging.getLogger(__name__)
+
+# Literales entre comillas simples ('' escapa una comilla): su contenido no se toca
+LITERAL = re.compile(r"('(?:[^']|'')*')")
+ESPACIOS = re.compile(r'\s+')
+
+# Consultas cuyo resultado cambia con el reloj aunque los datos no cambien
+DEPENDE_DE_HORA = re.compile(r"\bnow\b|current_(date|time|timestamp)|localtime", re.IGNORECASE)
+
+
+def normalizar_sql(sql):
+    """Espacios colapsados fuera de los literales y sin ';' final"""
+    partes = LITERAL.split(sql.strip().rstrip(';').strip())
+    return ''.join(
+        parte if i % 2 else ESPACIOS.sub(' ', parte)
+        for i, parte in enumerate(partes)
+    )
+
+
+class ResultCache:
+    """
+    LRU acotada por bytes: cada entrada cuenta el tamaño de sus filas en JSON
+    (lo que luego se envía al LLM). Cuando cambia la versión de los datos se
+    vacía completa; las consultas que dependen de la fecha actual además
+    caducan a los TTL_HORA segundos y nunca cruzan de un día a otro.
+    """
+
+    TTL_HORA = 60
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or getattr(settings, 'SQL_RESULT_CACHE_BYTES', 32 * 1024 * 1024)
+        self.max_entrada = self.max_bytes // 8
+        self._entradas = OrderedDict()  # clave -> (columnas, filas, bytes, expira, extra)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self._stats = {'aciertos': 0, 'fallos': 0, 'guardados': 0, 'desalojos': 0, 'demasiado_grandes': 0}
+
+    def clave(self, sql):
+        normalizado = normalizar_sql(sql)
+        if DEPENDE_DE_HORA.search(normalizado):
+            return f"{timezone.localdate().isoformat()}|{normalizado}"
+        return normalizado
+
+    def obtener(self, sql):
+        """
+        Resultado guardado en el formato de SafeSQLExecutor.execute_query, o None
+        """
+        clave = self.clave(sql)
+        with self._lock:
+            self._comprobar_version()
+            entrada = self._entradas.get(clave)
+            if entrada is None or (entrada[3] and entrada[3] < time.monotonic()):
+                if entrada is not None:
+                    self._quitar(clave)
+                self._stats['fallos'] += 1
+                return None
+
+            self._entradas.move_to_end(clave)
+            self._stats['aciertos'] += 1
+            columnas, filas, extra = entrada[0], entrada[1], entrada[4]
+
+        # Diccionarios nuevos: quien reciba el resultado puede modificarlo
+        data = [dict(zip(columnas, fila)) for fila in filas]
+        return {
+            "success": True,
+            "error": None,
+            "data": data,
+            "row_count": len(data),
+            "columns": list(columnas),
+            **(extra or {})
+        }
+
+    def guardar(self, sql, columnas, filas, version, extra=None):
+        """
+        Guarda las filas si siguen correspondiendo a la versión actual de los datos
+
+        Args:
+            version: get_version('datos') leída ANTES de ejecutar la consulta
+            extra: Claves adicionales del resultado (p. ej. truncado)
+        """
+        tamano = len(json.dumps(filas, default=str)) + len(json.dumps(columnas))
+        if tamano > self.max_entrada:
+            self._stats['demasiado_grandes'] += 1
+            return False
+
+        clave = self.clave(sql)
+        expira = time.monotonic() + self.TTL_HORA if DEPENDE_DE_HORA.search(clave) else 0
+
+        with self._lock:
+            self._comprobar_version()
+            if version != self._version:
+                # Los datos cambiaron mientras corría la consulta
+                return False
+
+            if clave in self._entradas:
+                self._quitar(clave)
+
+            self._entradas[clave] = (tuple(columnas), [tuple(fila) for fila in filas], tamano, expira, extra)
+            self._bytes += tamano
+            self._stats['guardados'] += 1
+
+            while self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self._stats['desalojos'] += 1
+
+        return True
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def stats(self):
+        data = dict(self._stats)
+        data['entradas'] = len(self._entradas)
+        data['bytes'] = self._bytes
+        data['version'] = self._version
+        return data
+
+    def _comprobar_version(self):
+        """Vacía la caché si cambiaron los datos (llamar con el lock tomado)"""
+        version = get_version('datos')
+        if version != self._version:
+            self._entradas.clear()
+            self._bytes = 0
+            self._version = version
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave)
+        self._bytes -= entrada[2]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Caché de resultados compartida del proceso"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
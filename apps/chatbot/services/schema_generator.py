@@ -64,10 +64,17 @@ def get_database_schema():
     - Extraer año: strftime('%Y', fecha)
 
     ## IMPORTANTE - Búsqueda de Productos:
-    Cuando busques un producto específico por nombre, usa LIKE con comodines para ser flexible:
-    - WHERE nombre LIKE '%término%' (busca en cualquier parte del nombre)
-    - WHERE LOWER(nombre) LIKE LOWER('%término%') (case-insensitive)
-    """
+    """ + get_product_search_hint()
+
+
+def get_product_search_hint():
+        """
+        Cómo buscar productos por nombre según el índice de búsqueda disponible
+        (sin preparar el índice: armar el prompt no debe ejecutar DDL)
+        """
+        from apps.companies.services.busqueda_service import pista_sql
+
+        return pista_sql() + "\n"
 
 
 def get_sample_queries():
@@ -0,0 +1,146 @@
+"""
+Caché de SQL generado
+Guarda en la base de datos el SQL que generó el LLM para cada pregunta
+normalizada, así las preguntas que se repiten a diario ("¿cuánto vendí hoy?")
+no vuelven a pagar la llamada al modelo.
+
+Si el SQL trae fechas escritas por el LLM ('2026-10-19' para "hoy"), la
+entrada solo vale el día en que se generó: la clave incluye la fecha.
+"""
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+import hashlib
+import re
+import logging
+
+from apps.chatbot.models import ConsultaSQLCache
+from apps.companies.services.tabla_nombres import normalizar_texto
+from .sql_executor import SafeSQLExecutor
+
+logger = logging.getLogger(__name__)
+
+PUNTUACION = re.compile(r'[^\w\s]', re.UNICODE)
+
+# Literales de fecha: '2026-10-19', '2026-10', '2026', '19/10/2026' (con hora opcional)
+FECHA_LITERAL = re.compile(
+    r"'\s*(?:(?:19|20)\d{2}(?:[-/]\d{1,2}){0,2}|\d{1,2}/\d{1,2}/(?:19|20)\d{2})(?:[ T][\d:.]+)?\s*'"
+)
+
+_stats = {'aciertos': 0, 'fallos': 0, 'descartes': 0}
+
+
+def normalizar_pregunta(pregunta):
+    """'¿Cuánto vendí HOY?' -> 'cuanto vendi hoy'"""
+    return ' '.join(PUNTUACION.sub(' ', normalizar_texto(pregunta)).split())
+
+
+def version_esquema(prompt):
+    """Versión del prompt de generación: si cambia el esquema o las reglas, cambia la clave"""
+    return hashlib.sha256(prompt.encode()).hexdigest()[:16]
+
+
+def tiene_fechas(consultas):
+    """True si alguna query fija el periodo con una fecha literal"""
+    return any(FECHA_LITERAL.search(sql) for sql in consultas)
+
+
+def _clave(pregunta, tipo_analisis, version, dia=None):
+    texto = f"{version}|{tipo_analisis}|{pregunta}"
+    if dia is not None:
+        texto += f"|{dia.isoformat()}"
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def _claves(pregunta, tipo_analisis, prompt):
+    """Clave general y clave del día (SQL con fechas literales) de una pregunta"""
+    normalizada = normalizar_pregunta(pregunta)
+    version = version_esquema(prompt)
+    return [
+        _clave(normalizada, tipo_analisis, version),
+        _clave(normalizada, tipo_analisis, version, timezone.localdate()),
+    ]
+
+
+def obtener(pregunta, tipo_analisis, prompt):
+    """
+    SQL guardado para la pregunta (None si no hay o ya no es válido)
+
+    Cada query se vuelve a validar con SafeSQLExecutor.is_safe_query antes de reutilizarla.
+    """
+    claves = _claves(pregunta, tipo_analisis, prompt)
+    entrada = ConsultaSQLCache.objects.filter(clave__in=claves).only('id', 'consultas').first()
+
+    if entrada is None:
+        _stats['fallos'] += 1
+        return None
+
+    if not entrada.consultas or not all(SafeSQLExecutor.is_safe_query(sql)[0] for sql in entrada.consultas):
+        logger.warning(f"⚠️ SQL en caché inválido, se descarta: {entrada.consultas}")
+        descartar(pregunta, tipo_analisis, prompt)
+        _stats['fallos'] += 1
+        return None
+
+    ConsultaSQLCache.objects.filter(id=entrada.id).update(aciertos=F('aciertos') + 1, usado_en=timezone.now())
+    _stats['aciertos'] += 1
+    return list(entrada.consultas)
+
+
+def guardar(pregunta, tipo_analisis, prompt, consultas):
+    """
+    Guarda el SQL generado (solo si todas las queries son seguras) y desaloja lo más viejo
+
+    Con fechas literales la entrada queda ligada al día de hoy: "¿cuánto vendí
+    hoy?" no debe responder mañana con el periodo de hoy.
+    """
+    if not consultas or not all(SafeSQLExecutor.is_safe_query(sql)[0] for sql in consultas):
+        return False
+
+    normalizada = normalizar_pregunta(pregunta)
+    version = version_esquema(prompt)
+    dia = timezone.localdate() if tiene_fechas(consultas) else None
+
+    try:
+        ConsultaSQLCache.objects.update_or_create(
+            clave=_clave(normalizada, tipo_analisis, version, dia),
+            defaults={
+                'pregunta': normalizada,
+                'tipo_analisis': tipo_analisis,
+                'version_esquema': version,
+                'consultas': list(consultas),
+                'usado_en': timezone.now(),
+            }
+        )
+    except IntegrityError:
+        # Otro proceso la guardó al mismo tiempo
+        return False
+
+    _desalojar()
+    return True
+
+
+def descartar(pregunta, tipo_analisis, prompt):
+    """Elimina la entrada (p. ej. si su SQL dejó de funcionar)"""
+    if ConsultaSQLCache.objects.filter(clave__in=_claves(pregunta, tipo_analisis, prompt)).delete()[0]:
+        _stats['descartes'] += 1
+
+
+def _desalojar():
+    """Mantiene como máximo SQL_CACHE_MAX_ENTRADAS, quitando las usadas hace más tiempo"""
+    maximo = getattr(settings, 'SQL_CACHE_MAX_ENTRADAS', 500)
+    sobrantes = ConsultaSQLCache.objects.order_by('-usado_en').values_list('id', flat=True)[maximo:]
+    ids = list(sobrantes)
+    if ids:
+        ConsultaSQLCache.objects.filter(id__in=ids).delete()
+
+
+def estadisticas():
+    """Aciertos y fallos del proceso más el total guardado en la base de datos"""
+    data = dict(_stats)
+    consultas = data['aciertos'] + data['fallos']
+    data['tasa_aciertos'] = round(data['aciertos'] / consultas, 3) if consultas else 0.0
+    data['entradas'] = ConsultaSQLCache.objects.count()
+    data['aciertos_historicos'] = ConsultaSQLCache.objects.aggregate(total=Sum('aciertos'))['total'] or 0
+    return data
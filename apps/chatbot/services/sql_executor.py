@@ -1,5 +1,41 @@
-from django.db import connection
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection, close_old_connections, DatabaseError
+from apps.companies.services.versioning import get_version
+from .result_cache import get_result_cache
+import json
+import threading
+import time
 import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Líneas de EXPLAIN QUERY PLAN que recorren una tabla completa: 'SCAN iv' / 'SCAN companies_venta'
+ESCANEO = re.compile(r'^SCAN (\w+)')
+# 'FROM companies_itemventa iv' / 'JOIN companies_producto AS p' / ', companies_venta v'
+ALIAS = re.compile(r'(?:\bFROM|\bJOIN|,)\s+(\w+)\s+(?:AS\s+)?(\w+)', re.IGNORECASE)
+
+
+class QueryTimeout(Exception):
+    """La query superó el tiempo máximo"""
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Hilos compartidos para ejecutar las queries de un análisis en paralelo"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ANALISIS_SQL_HILOS', 4),
+                    thread_name_prefix='sql-analisis'
+                )
+    return _pool
 
 
 class SafeSQLExecutor:
@@ -40,9 +76,12 @@ class SafeSQLExecutor:
         return True, "Query segura"
     
     @classmethod
-    def execute_query(cls, sql):
+    def execute_query(cls, sql, usar_cache=True):
         """
         Ejecutar query de forma segura y retornar resultados
+        
+        Con usar_cache, una query idéntica se responde desde memoria mientras
+        no cambien los datos del negocio (ventas, compras, productos).
         """
         # Validar seguridad
         is_safe, message = cls.is_safe_query(sql)
@@ -54,15 +93,39 @@ class SafeSQLExecutor:
                 "data": None
             }
         
+        cache = get_result_cache() if usar_cache else None
+        if cache is not None:
+            guardado = cache.obtener(sql)
+            if guardado is not None:
+                return guardado
+            # Leída antes de ejecutar: si los datos cambian mientras tanto, no se guarda
+            version = get_version('datos')
+        
+        max_filas = getattr(settings, 'SQL_MAX_FILAS', 1000)
+        
         try:
             with connection.cursor() as cursor:
-                cursor.execute(sql)
+                # Antes de ejecutar: rechazar planes obviamente carísimos
+                costoso = cls._plan_costoso(cursor, sql)
+                if costoso:
+                    return {
+                        "success": False,
+                        "error": costoso,
+                        "data": None
+                    }
                 
-                # Obtener nombres de columnas
-                columns = [col[0] for col in cursor.description]
+                with cls._tiempo_limite(cursor):
+                    # El LIMIT exterior deja que la BD pare al llegar al tope de filas
+                    cursor.execute(cls._limitar(sql, max_filas + 1))
+                    
+                    # Obtener nombres de columnas
+                    columns = [col[0] for col in cursor.description]
+                    
+                    # Obtener filas (como máximo max_filas)
+                    rows = cursor.fetchmany(max_filas + 1)
                 
-                # Obtener filas
-                rows = cursor.fetchall()
+                truncado = len(rows) > max_filas
+                rows = rows[:max_filas]
                 
                 # Convertir a lista de diccionarios
                 results = [
@@ -70,17 +133,210 @@ class SafeSQLExecutor:
                     for row in rows
                 ]
                 
+                extra = {"truncado": truncado, "max_filas": max_filas} if truncado else None
+                if cache is not None:
+                    cache.guardar(sql, columns, rows, version, extra)
+                
                 return {
                     "success": True,
                     "error": None,
                     "data": results,
                     "row_count": len(results),
-                    "columns": columns
+                    "columns": columns,
+                    **(extra or {})
                 }
                 
+        except QueryTimeout as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "data": None
+            }
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
                 "data": None
-            }
\ No newline at end of file
+            }
+    
+    @staticmethod
+    def _limitar(sql, limite):
+        """
+        Envuelve la query para que nunca devuelva más de limite filas
+        
+        El cuerpo va en líneas propias: un '-- comentario' al final de la query
+        del LLM se tragaría el paréntesis de cierre si quedara en la misma línea.
+        """
+        cuerpo = sql.strip().rstrip(';').strip()
+        return f"SELECT * FROM (\n{cuerpo}\n) AS limitada LIMIT {int(limite)}"
+    
+    @classmethod
+    def _plan_costoso(cls, cursor, sql):
+        """
+        Revisa el plan con EXPLAIN antes de ejecutar
+        
+        SQLite: multiplica las filas de las tablas que se recorren completas
+        (un producto cartesiano de dos tablas grandes dispara el número).
+        PostgreSQL: costo total estimado por el planificador.
+        
+        Returns:
+            Mensaje de error si el plan supera SQL_MAX_COSTO, None si es aceptable
+        """
+        max_costo = getattr(settings, 'SQL_MAX_COSTO', 50_000_000)
+        cuerpo = sql.strip().rstrip(';')
+        
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"EXPLAIN QUERY PLAN {cuerpo}")
+            recorridos = [
+                m.group(1) for m in (ESCANEO.match(fila[-1]) for fila in cursor.fetchall()) if m
+            ]
+            
+            # El plan muestra alias: traducirlos a tablas reales
+            tablas = set(connection.introspection.table_names(cursor))
+            alias = {a.lower(): t for t, a in ALIAS.findall(cuerpo) if t in tablas}
+            recorridos = [
+                nombre if nombre in tablas else alias.get(nombre.lower())
+                for nombre in recorridos
+            ]
+            recorridos = [tabla for tabla in recorridos if tabla]
+            
+            costo = 1
+            for tabla in recorridos:
+                costo *= max(cls._filas_tabla(cursor, tabla), 1)
+            if len(recorridos) > 1 and costo > max_costo:
+                return (
+                    f"Consulta demasiado costosa: recorre completas {', '.join(recorridos)} "
+                    f"(~{costo:,} combinaciones). Usa JOIN ... ON o filtra por índice."
+                )
+        
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {cuerpo}")
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            costo = plan[0]['Plan']['Total Cost']
+            if costo > max_costo:
+                return f"Consulta demasiado costosa (costo estimado {costo:,.0f}). Agrega filtros o agregaciones."
+        
+        return None
+    
+    @staticmethod
+    def _filas_tabla(cursor, tabla):
+        """Filas aproximadas de una tabla SQLite (max(rowid) usa el índice de la clave)"""
+        try:
+            cursor.execute(f'SELECT MAX(rowid) FROM "{tabla}"')
+            return cursor.fetchone()[0] or 0
+        except DatabaseError:
+            return 0
+    
+    @staticmethod
+    @contextmanager
+    def _tiempo_limite(cursor):
+        """Corta la query si pasa de SQL_QUERY_TIMEOUT segundos"""
+        segundos = getattr(settings, 'SQL_QUERY_TIMEOUT', 5)
+        
+        if connection.vendor == 'sqlite':
+            limite = time.monotonic() + segundos
+            conexion = connection.connection
+            conexion.set_progress_handler(lambda: time.monotonic() > limite, 10000)
+            try:
+                yield
+            except DatabaseError as e:
+                if time.monotonic() > limite and 'interrupted' in str(e):
+                    raise QueryTimeout(f"Consulta cancelada: superó {segundos}s") from e
+                raise
+            finally:
+                conexion.set_progress_handler(None, 10000)
+        
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SET statement_timeout = %s", [int(segundos * 1000)])
+            try:
+                yield
+            except DatabaseError as e:
+                if 'statement timeout' in str(e):
+                    raise QueryTimeout(f"Consulta cancelada: superó {segundos}s") from e
+                raise
+            finally:
+                cursor.execute("RESET statement_timeout")
+        
+        else:
+            yield
+    
+    @classmethod
+    def execute_many(cls, queries, timeout=None):
+        """
+        Ejecutar varias queries a la vez, cada una en su propia conexión de solo lectura
+        
+        Tarda lo que la query más lenta, no la suma. Las que no terminan antes del
+        límite se interrumpen y vuelven con error: el resto se devuelve igual.
+        
+        Returns:
+            Lista de resultados (formato de execute_query) en el orden de las queries
+        """
+        if len(queries) <= 1:
+            return [cls.execute_query(sql) for sql in queries]
+        
+        if timeout is None:
+            timeout = getattr(settings, 'ANALISIS_SQL_TIMEOUT', 10)
+        
+        conexiones = {}
+        futuros = [
+            _get_pool().submit(cls._execute_en_hilo, sql, indice, conexiones)
+            for indice, sql in enumerate(queries)
+        ]
+        
+        wait(futuros, timeout=timeout)
+        
+        resultados = []
+        for indice, (sql, futuro) in enumerate(zip(queries, futuros)):
+            if futuro.done():
+                resultados.append(futuro.result())
+                continue
+            
+            # Si aún no empezó se cancela; si está corriendo se interrumpe en la BD
+            if not futuro.cancel():
+                cls._interrumpir(conexiones.get(indice))
+            logger.warning(f"⏱️ Query sin terminar tras {timeout}s: {sql[:120]}")
+            resultados.append({
+                "success": False,
+                "error": f"Tiempo agotado ({timeout}s)",
+                "data": None
+            })
+        
+        return resultados
+    
+    @classmethod
+    def _execute_en_hilo(cls, sql, indice, conexiones):
+        close_old_connections()
+        try:
+            cls._solo_lectura()
+        except DatabaseError as e:
+            return {"success": False, "error": str(e), "data": None}
+        
+        conexiones[indice] = connection.connection
+        try:
+            return cls.execute_query(sql)
+        finally:
+            conexiones.pop(indice, None)
+    
+    @staticmethod
+    def _solo_lectura():
+        """La conexión del hilo solo puede leer (segunda barrera además de is_safe_query)"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute("PRAGMA query_only = ON")
+            elif connection.vendor == 'postgresql':
+                cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+    
+    @staticmethod
+    def _interrumpir(conexion):
+        """Aborta la query en curso de otra conexión (sqlite3.interrupt / cancel de psycopg)"""
+        if conexion is None:
+            return
+        try:
+            if hasattr(conexion, 'interrupt'):
+                conexion.interrupt()
+            elif hasattr(conexion, 'cancel'):
+                conexion.cancel()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo interrumpir la query: {e}")
@@ -186,6 +186,67 @@ const DOM = {
 // MÓDULO: API - Comunicación con el servidor
 // ==========================================
 const ChatAPI = {
+    /**
+     * Enviar mensaje y recibir la respuesta por Server-Sent Events.
+     * onToken recibe cada fragmento de texto; devuelve los datos del evento 'fin'.
+     */
+    async streamMessage(message, conversacionId, onToken) {
+        const response = await fetch('/chatbot/chat/stream/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': Utils.getCookie('csrftoken')
+            },
+            credentials: 'same-origin',
+            body: JSON.stringify({
+                mensaje: message,
+                conversacion_id: conversacionId
+            })
+        });
+
+        if (!response.ok || !response.body) {
+            // El servidor no abrió el stream: el mensaje no se guardó y se puede reenviar
+            const error = new Error(`HTTP ${response.status}`);
+            error.sinStream = true;
+            throw error;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+
+            // Cada evento SSE termina con una línea en blanco
+            let separador;
+            while ((separador = buffer.indexOf('\n\n')) !== -1) {
+                const bloque = buffer.slice(0, separador);
+                buffer = buffer.slice(separador + 2);
+
+                const evento = (bloque.match(/^event: (.*)$/m) || [])[1];
+                const datos = (bloque.match(/^data: (.*)$/m) || [])[1];
+                if (!evento || datos === undefined) continue;
+
+                const payload = JSON.parse(datos);
+                if (evento === 'token') {
+                    onToken(payload.t);
+                } else if (evento === 'fin') {
+                    reader.cancel();
+                    return payload;
+                } else if (evento === 'error') {
+                    reader.cancel();
+                    return payload;
+                }
+            }
+        }
+
+        throw new Error('Stream terminado sin respuesta');
+    },
+
     async sendMessage(message, conversacionId) {
         const response = await fetch('/chatbot/chat/api/', {
             method: 'POST',
@@ -572,6 +633,7 @@ const ChatUI = {
         `;
         
         DOM.messagesContainer.appendChild(messageDiv);
+        ProductListing.hidratar(messageDiv);
 
         // ✅ RENDERIZAR FÓRMULAS CON MATHJAX
         if (sender === 'bot' && typeof MathJax !== 'undefined') {
@@ -582,6 +644,34 @@ const ChatUI = {
     },
 
 
+    /**
+     * Mensaje del bot que se va llenando con texto plano mientras llega el stream
+     */
+    startStreamingMessage() {
+        const messageDiv = document.createElement('div');
+        messageDiv.className = 'message bot';
+        messageDiv.innerHTML = `
+            <div class="message-content">
+                <div class="message-stream"></div>
+            </div>
+        `;
+        DOM.messagesContainer.appendChild(messageDiv);
+        return messageDiv;
+    },
+
+    appendStreamingText(messageDiv, text) {
+        messageDiv.querySelector('.message-stream').textContent += text;
+        this.scrollToBottom();
+    },
+
+    /**
+     * Reemplaza el texto provisional por la respuesta ya formateada
+     */
+    finishStreamingMessage(messageDiv, html) {
+        messageDiv.remove();
+        this.addMessage(html, 'bot');
+    },
+
     addMessageFromData(msgData) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${msgData.tipo}`;
@@ -594,6 +684,7 @@ const ChatUI = {
         `;
         
         DOM.messagesContainer.appendChild(messageDiv);
+        ProductListing.hidratar(messageDiv);
 
         // ✅ RENDERIZAR FÓRMULAS CON MATHJAX
         if (msgData.tipo === 'bot' && typeof MathJax !== 'undefined') {
@@ -961,16 +1052,34 @@ const MessageHandler = {
         ChatUI.clearInput();
         ChatUI.showTypingIndicator();
 
+        let streamDiv = null;
+
         try {
             console.log('📤 Enviando mensaje a conversación:', window.CONVERSACION_ID); // ✅ LOG
             
-            const data = await ChatAPI.sendMessage(message, window.CONVERSACION_ID);
+            let data;
+            try {
+                data = await ChatAPI.streamMessage(message, window.CONVERSACION_ID, (texto) => {
+                    if (!streamDiv) {
+                        ChatUI.hideTypingIndicator();
+                        streamDiv = ChatUI.startStreamingMessage();
+                    }
+                    ChatUI.appendStreamingText(streamDiv, texto);
+                });
+            } catch (streamError) {
+                // Sin stream: respuesta completa de una vez
+                if (!streamError.sinStream) throw streamError;
+                console.warn('⚠️ Streaming no disponible, usando respuesta completa:', streamError);
+                data = await ChatAPI.sendMessage(message, window.CONVERSACION_ID);
+            }
             
             ChatUI.hideTypingIndicator();
-            ChatUI.addMessage(
-                data.respuesta || data.error || MESSAGES.INVALID_RESPONSE.message, 
-                'bot'
-            );
+            const respuesta = data.respuesta || data.error || MESSAGES.INVALID_RESPONSE.message;
+            if (streamDiv) {
+                ChatUI.finishStreamingMessage(streamDiv, respuesta);
+            } else {
+                ChatUI.addMessage(respuesta, 'bot');
+            }
             
             // ✅ MARCAR que esta conversación ahora tiene mensajes
             EmptyConversationManager.markCurrentAsHavingMessages();
@@ -982,6 +1091,7 @@ const MessageHandler = {
             }
         } catch (error) {
             ChatUI.hideTypingIndicator();
+            if (streamDiv) streamDiv.remove();
             ChatUI.addMessage(MESSAGES.SERVER_ERROR.message, 'bot');
             
             Notification.error(
@@ -994,6 +1104,116 @@ const MessageHandler = {
     }
 };
 
+// ==========================================
+// MÓDULO: Listado de productos por páginas
+// ==========================================
+const ProductListing = {
+    init() {
+        DOM.messagesContainer.addEventListener('click', (e) => {
+            const boton = e.target.closest('.listado-mas');
+            if (boton) {
+                this.cargarPagina(boton.closest('.chatbot-listado'), boton.dataset.cursor);
+            }
+        });
+        this.hidratar(DOM.messagesContainer);
+    },
+
+    // Los mensajes guardan solo una referencia: se piden las filas al mostrarlos
+    hidratar(root) {
+        root.querySelectorAll('.chatbot-listado:not([data-cargado])').forEach(listado => {
+            listado.dataset.cargado = '1';
+            this.cargarPagina(listado, '');
+        });
+    },
+
+    async cargarPagina(listado, cursor) {
+        const boton = listado.querySelector('.listado-mas');
+        if (boton) boton.disabled = true;
+
+        try {
+            const response = await fetch(
+                `/chatbot/chat/productos/?cursor=${encodeURIComponent(cursor)}`,
+                { credentials: 'same-origin' }
+            );
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+            const data = await response.json();
+
+            if (cursor) {
+                listado.querySelector('tbody').insertAdjacentHTML('beforeend', data.html);
+            } else {
+                listado.innerHTML = data.html;
+            }
+
+            if (boton) boton.remove();
+            if (data.siguiente) {
+                const mas = document.createElement('button');
+                mas.type = 'button';
+                mas.className = 'listado-mas';
+                mas.dataset.cursor = data.siguiente;
+                mas.textContent = 'Ver más productos';
+                listado.appendChild(mas);
+            }
+        } catch (error) {
+            if (boton) boton.disabled = false;
+            console.error('❌ Error al cargar el listado de productos:', error);
+        }
+    }
+};
+
+// ==========================================
+// MÓDULO: Autocompletado de productos
+// ==========================================
+const ProductAutocomplete = {
+    timer: null,
+    controller: null,
+
+    init() {
+        this.datalist = document.getElementById('chatbotSugerencias');
+        if (!this.datalist) return;
+
+        DOM.input.addEventListener('input', () => {
+            clearTimeout(this.timer);
+            this.timer = setTimeout(() => this.sugerir(), 120);
+        });
+    },
+
+    async sugerir() {
+        // Se completa la última palabra que se está escribiendo
+        const texto = DOM.input.value;
+        const match = texto.match(/(\S{2,})$/);
+        if (!match) {
+            this.datalist.innerHTML = '';
+            return;
+        }
+
+        const prefijo = texto.slice(0, match.index);
+
+        if (this.controller) this.controller.abort();
+        this.controller = new AbortController();
+
+        try {
+            const response = await fetch(
+                `/companies/api/productos/autocompletar/?q=${encodeURIComponent(match[1])}&limite=8`,
+                { credentials: 'same-origin', signal: this.controller.signal }
+            );
+            if (!response.ok) return;
+
+            const data = await response.json();
+            this.datalist.innerHTML = '';
+            data.sugerencias.forEach(producto => {
+                const option = document.createElement('option');
+                option.value = prefijo + producto.nombre;
+                this.datalist.appendChild(option);
+            });
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                console.warn('⚠️ Autocompletado no disponible:', error);
+            }
+        }
+    }
+};
+
 // ==========================================
 // MÓDULO: Reconocimiento de Voz
 // ==========================================
@@ -1130,6 +1350,8 @@ document.addEventListener('DOMContentLoaded', () => {
     ChatUI.scrollToBottom();
     SidebarManager.restoreState();
     VoiceRecognition.init();
+    ProductAutocomplete.init();
+    ProductListing.init();
     setupEventListeners();
     InsightsManager.init();
 
@@ -1,3 +1,354 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+import json
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.companies.services.versioning import bump_version, get_version
+
+from .models import ConocimientoNegocio, ConsultaSQLCache, ExtraccionPendiente, InsightNegocio
+from .services import cola_conocimiento, intelligent_business_assistant, sql_cache
+from .services.compactador import compactar_resultado, estimar_tokens
+from .services.filtro_conocimiento import clasificar_mensaje
+from .services.memory_manager import _leer_extraccion
+from .services.result_cache import ResultCache, normalizar_sql
+from .services.sql_executor import SafeSQLExecutor, _get_pool
+
+MUESTRA = Path(__file__).resolve().parent / 'data' / 'muestra_conocimiento.json'
+
+
+def _resultado(filas, **extra):
+    return {
+        'success': True,
+        'tipo_analisis': 'ventas',
+        'consulta_original': 'ventas por producto',
+        'resultados': [{'data': filas, 'row_count': len(filas), **extra}],
+    }
+
+
+class CompactadorTests(SimpleTestCase):
+
+    def test_tabla_csv_sin_repetir_columnas(self):
+        filas = [
+            {'producto': 'Cuaderno', 'total': Decimal('12.500'), 'unidades': 5},
+            {'producto': 'Lápiz, HB', 'total': 3.0, 'unidades': None},
+        ]
+        texto = compactar_resultado(_resultado(filas), max_tokens=500)
+
+        self.assertIn('success: true', texto)
+        self.assertIn('## Resultado 1: 2 filas', texto)
+        self.assertIn('producto,total,unidades\nCuaderno,12.5,5\n"Lápiz, HB",3,', texto)
+        self.assertEqual(texto.count('unidades'), 1)
+
+    def test_resultado_grande_respeta_el_presupuesto_y_resume_el_resto(self):
+        filas = [{'producto': f'Producto {i}', 'total': 10} for i in range(500)]
+        texto = compactar_resultado(_resultado(filas), max_tokens=300)
+
+        self.assertLessEqual(estimar_tokens(texto), 300)
+        self.assertIn('filas más; total: suma=', texto)
+        self.assertIn('max=10', texto)
+
+    def test_avisa_si_la_consulta_fue_truncada(self):
+        texto = compactar_resultado(_resultado([{'n': 1}], truncado=True, max_filas=1), max_tokens=200)
+        self.assertIn('se leyeron solo 1', texto)
+
+    def test_resultado_sin_tablas_va_en_json(self):
+        texto = compactar_resultado({'success': False, 'error': 'sin datos'}, max_tokens=200)
+        self.assertEqual(json.loads(texto), {'success': False, 'error': 'sin datos'})
+
+    def test_recorte_final(self):
+        texto = compactar_resultado({'error': 'x' * 5000}, max_tokens=100)
+        self.assertTrue(texto.endswith('[...recortado por longitud]'))
+
+
+class ClasificarMensajeTests(SimpleTestCase):
+
+    def test_saludos_y_vacios(self):
+        self.assertEqual(clasificar_mensaje(''), (False, 'vacio'))
+        self.assertEqual(clasificar_mensaje('Hola, buenos días!'), (False, 'saludo'))
+        self.assertEqual(clasificar_mensaje('muchas gracias'), (False, 'saludo'))
+
+    def test_preguntas_no_se_extraen(self):
+        self.assertEqual(clasificar_mensaje('¿Cuánto vendí hoy?'), (False, 'pregunta'))
+        self.assertEqual(clasificar_mensaje('¿Cuál es mi producto más vendido?'), (False, 'pregunta'))
+        self.assertEqual(clasificar_mensaje('dame las ventas de la semana'), (False, 'pregunta'))
+
+    def test_afirmaciones_con_conocimiento(self):
+        self.assertEqual(clasificar_mensaje('Mi meta es vender $8000 este mes'), (True, 'meta'))
+        self.assertEqual(clasificar_mensaje('Mi producto estrella es el cuaderno'), (True, 'preferencia'))
+        self.assertEqual(clasificar_mensaje('Tengo 3 empleados'), (True, 'dato_clave'))
+        self.assertEqual(clasificar_mensaje('No vendemos fiado'), (True, 'restriccion'))
+        self.assertEqual(clasificar_mensaje('Voy a lanzar una promo de útiles'), (True, 'estrategia'))
+
+    def test_afirmacion_seguida_de_pregunta(self):
+        self.assertEqual(clasificar_mensaje('Mi meta es $8000, ¿cómo voy?'), (True, 'meta'))
+
+    def test_muestra_etiquetada(self):
+        with open(MUESTRA, encoding='utf-8') as archivo:
+            muestra = json.load(archivo)
+
+        errores = [
+            ejemplo['mensaje'] for ejemplo in muestra
+            if clasificar_mensaje(ejemplo['mensaje'])[0] != bool(ejemplo['conocimiento'])
+        ]
+        self.assertEqual(errores, [])
+
+
+class LimitarSQLTests(SimpleTestCase):
+
+    def test_comentario_final_no_se_traga_el_parentesis(self):
+        sql = SafeSQLExecutor._limitar('SELECT 1 AS total -- total del dia;', 10)
+        self.assertTrue(sql.endswith('\n) AS limitada LIMIT 10'))
+        self.assertIn('-- total del dia\n', sql)
+
+
+@override_settings(VERSIONES_REFRESCO_S=0)
+class ResultCacheTests(TestCase):
+
+    def test_clave_normaliza_espacios_fuera_de_literales(self):
+        self.assertEqual(
+            normalizar_sql("SELECT  *\n FROM t WHERE nombre = 'a  b' ;"),
+            "SELECT * FROM t WHERE nombre = 'a  b'"
+        )
+
+    def test_acierto_hasta_que_cambian_los_datos(self):
+        cache = ResultCache(max_bytes=10_000)
+        cache.guardar('SELECT 1', ['n'], [(1,)], get_version('datos'))
+
+        self.assertEqual(cache.obtener('SELECT   1;')['data'], [{'n': 1}])
+
+        bump_version('datos')
+        self.assertIsNone(cache.obtener('SELECT 1'))
+
+    def test_no_guarda_si_los_datos_cambiaron_durante_la_consulta(self):
+        cache = ResultCache(max_bytes=10_000)
+        version = get_version('datos')
+        bump_version('datos')
+
+        self.assertFalse(cache.guardar('SELECT 1', ['n'], [(1,)], version))
+
+    def test_desaloja_por_bytes(self):
+        cache = ResultCache(max_bytes=800)
+        version = get_version('datos')
+        for i in range(20):
+            cache.guardar(f'SELECT {i}', ['texto'], [('x' * 50,)], version)
+
+        self.assertLessEqual(cache.stats()['bytes'], 800)
+        self.assertGreater(cache.stats()['desalojos'], 0)
+        self.assertIsNone(cache.obtener('SELECT 0'))
+        self.assertIsNotNone(cache.obtener('SELECT 19'))
+
+
+class SQLCacheTests(TestCase):
+    """SQL generado reutilizado por pregunta normalizada"""
+
+    PROMPT = 'esquema v1'
+    VENTAS = 'SELECT SUM(total) AS total FROM companies_venta'
+    VENTAS_HOY = "SELECT SUM(total) AS total FROM companies_venta WHERE DATE(fecha) = '2026-10-19'"
+
+    def test_pregunta_normalizada(self):
+        self.assertTrue(sql_cache.guardar('¿Cuánto vendí en total?', 'ventas', self.PROMPT, [self.VENTAS]))
+
+        self.assertEqual(sql_cache.obtener('cuanto vendi en  TOTAL', 'ventas', self.PROMPT), [self.VENTAS])
+        # Otro prompt (esquema) u otro tipo de análisis: otra clave
+        self.assertIsNone(sql_cache.obtener('cuanto vendi en total', 'ventas', 'esquema v2'))
+        self.assertIsNone(sql_cache.obtener('cuanto vendi en total', 'productos', self.PROMPT))
+
+    def test_no_guarda_sql_inseguro(self):
+        self.assertFalse(sql_cache.guardar('borra todo', 'ventas', self.PROMPT, ['DELETE FROM companies_venta']))
+        self.assertFalse(ConsultaSQLCache.objects.exists())
+
+    def test_sql_con_fecha_literal_solo_vale_ese_dia(self):
+        with mock.patch.object(timezone, 'localdate', return_value=date(2026, 10, 19)):
+            sql_cache.guardar('¿Cuánto vendí hoy?', 'ventas', self.PROMPT, [self.VENTAS_HOY])
+            self.assertEqual(sql_cache.obtener('cuanto vendi hoy', 'ventas', self.PROMPT), [self.VENTAS_HOY])
+
+        with mock.patch.object(timezone, 'localdate', return_value=date(2026, 10, 20)):
+            self.assertIsNone(sql_cache.obtener('cuanto vendi hoy', 'ventas', self.PROMPT))
+
+    def test_detecta_fechas_literales(self):
+        self.assertTrue(sql_cache.tiene_fechas([self.VENTAS_HOY]))
+        self.assertTrue(sql_cache.tiene_fechas(["SELECT 1 WHERE strftime('%Y', fecha) = '2026'"]))
+        self.assertTrue(sql_cache.tiene_fechas(["SELECT 1 WHERE fecha >= '2026-10-01 00:00:00'"]))
+        self.assertFalse(sql_cache.tiene_fechas(["SELECT 1 WHERE DATE(fecha) = DATE('now', '-7 days')"]))
+
+    def test_descartar(self):
+        sql_cache.guardar('ventas de hoy', 'ventas', self.PROMPT, [self.VENTAS_HOY])
+        sql_cache.descartar('ventas de hoy', 'ventas', self.PROMPT)
+        self.assertIsNone(sql_cache.obtener('ventas de hoy', 'ventas', self.PROMPT))
+
+    @override_settings(SQL_CACHE_MAX_ENTRADAS=2)
+    def test_desaloja_la_menos_usada(self):
+        for i in range(3):
+            sql_cache.guardar(f'pregunta {i}', 'ventas', self.PROMPT, [f'SELECT {i}'])
+            ConsultaSQLCache.objects.filter(pregunta=f'pregunta {i}').update(
+                usado_en=timezone.now() + timedelta(seconds=i)
+            )
+        sql_cache._desalojar()
+
+        self.assertEqual(ConsultaSQLCache.objects.count(), 2)
+        self.assertIsNone(sql_cache.obtener('pregunta 0', 'ventas', self.PROMPT))
+        self.assertEqual(sql_cache.obtener('pregunta 2', 'ventas', self.PROMPT), ['SELECT 2'])
+
+
+class ExecuteManyTests(TransactionTestCase):
+    """Queries de un análisis en paralelo, cada una en una conexión de solo lectura"""
+
+    # Cuenta hasta 10^9 sin tocar tablas: tarda mucho más que el límite del test
+    LENTA = (
+        'SELECT (WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) '
+        'SELECT COUNT(*) FROM c) AS n'
+    )
+
+    def test_resultados_en_el_orden_de_las_queries(self):
+        resultados = SafeSQLExecutor.execute_many(['SELECT 1 AS n', 'SELECT 2 AS n'])
+        self.assertEqual([r['data'] for r in resultados], [[{'n': 1}], [{'n': 2}]])
+
+    @override_settings(SQL_QUERY_TIMEOUT=30)
+    def test_query_lenta_se_interrumpe_y_el_resto_se_devuelve(self):
+        inicio = time.monotonic()
+        lenta, rapida = SafeSQLExecutor.execute_many([self.LENTA, 'SELECT 3 AS n'], timeout=0.5)
+
+        self.assertFalse(lenta['success'])
+        self.assertIn('Tiempo agotado', lenta['error'])
+        self.assertEqual(rapida['data'], [{'n': 3}])
+        self.assertLess(time.monotonic() - inicio, 5)
+
+        # El hilo quedó libre: la interrupción cortó la query en la base de datos
+        self.assertEqual(SafeSQLExecutor.execute_many(['SELECT 4 AS n', 'SELECT 5 AS n'], timeout=5)[0]['data'], [{'n': 4}])
+
+    def test_conexion_del_hilo_es_de_solo_lectura(self):
+        def escribir():
+            SafeSQLExecutor._solo_lectura()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO chatbot_consultasqlcache "
+                    "(clave, pregunta, tipo_analisis, version_esquema, consultas, aciertos, creado_en, usado_en) "
+                    "VALUES ('x', 'x', 'x', 'x', '[]', 0, '2026-01-01', '2026-01-01')"
+                )
+
+        with self.assertRaises(DatabaseError):
+            _get_pool().submit(escribir).result(timeout=5)
+        self.assertFalse(ConsultaSQLCache.objects.exists())
+
+
+@override_settings(CONOCIMIENTO_EN_PROCESO=False, CONOCIMIENTO_FILTRO=True)
+class ColaConocimientoTests(TestCase):
+    """Cola de extracción: toma por lotes, reintentos y tope de intentos (el LLM va simulado)"""
+
+    def _encolar(self, cantidad):
+        for i in range(cantidad):
+            cola_conocimiento.encolar_extraccion(f'Mi meta es vender ${i}000 este mes', 'Anotado')
+
+    def test_solo_encola_mensajes_con_conocimiento(self):
+        self.assertFalse(cola_conocimiento.encolar_extraccion('Hola!', 'Hola, ¿en qué te ayudo?'))
+        self.assertTrue(cola_conocimiento.encolar_extraccion('Tengo 3 empleados', 'Anotado'))
+        self.assertEqual(ExtraccionPendiente.objects.count(), 1)
+
+    def test_un_lote_no_se_toma_dos_veces(self):
+        self._encolar(3)
+
+        primero = cola_conocimiento._tomar_lote(2)
+        segundo = cola_conocimiento._tomar_lote(2)
+
+        self.assertEqual(len(primero), 2)
+        self.assertEqual(len(segundo), 1)
+        self.assertNotEqual(primero[0].lote, segundo[0].lote)
+        self.assertEqual(cola_conocimiento._tomar_lote(2), [])
+
+    def test_toma_vencida_vuelve_a_estar_disponible(self):
+        self._encolar(1)
+        cola_conocimiento._tomar_lote(5)
+        ExtraccionPendiente.objects.update(
+            tomado_en=timezone.now() - cola_conocimiento.TOMA_EXPIRA - timedelta(seconds=1)
+        )
+
+        self.assertEqual(len(cola_conocimiento._tomar_lote(5)), 1)
+
+    def test_lote_procesado_se_guarda_y_se_borra(self):
+        self._encolar(3)
+        items = [{'tipo': 'meta', 'clave': 'meta_ventas_mensual', 'valor': '3000'}]
+
+        with mock.patch.object(cola_conocimiento, 'extraer_conocimiento_lote',
+                               return_value={'hay_conocimiento': True, 'items': items}) as extraer, \
+                mock.patch.object(cola_conocimiento, 'guardar_conocimiento', return_value=[1]) as guardar:
+            totales = cola_conocimiento.procesar_pendientes(tamano_lote=2)
+
+        self.assertEqual(extraer.call_count, 2)
+        self.assertEqual(guardar.call_count, 2)
+        self.assertEqual(totales, {'procesados': 3, 'lotes': 2, 'items': 2, 'fallidos': 0})
+        self.assertFalse(ExtraccionPendiente.objects.exists())
+
+    def test_error_libera_el_lote_y_cuenta_el_intento(self):
+        self._encolar(2)
+        error = ValueError('La respuesta del extractor no es JSON')
+
+        with mock.patch.object(cola_conocimiento, 'extraer_conocimiento_lote', side_effect=error):
+            totales = cola_conocimiento.procesar_pendientes()
+
+        self.assertEqual(totales['fallidos'], 2)
+        self.assertEqual(
+            list(ExtraccionPendiente.objects.values_list('intentos', 'lote', 'error')),
+            [(1, None, str(error))] * 2
+        )
+
+    def test_tras_max_intentos_queda_para_revision(self):
+        self._encolar(1)
+
+        with mock.patch.object(cola_conocimiento, 'extraer_conocimiento_lote', side_effect=RuntimeError('429')) as extraer:
+            for _ in range(cola_conocimiento.MAX_INTENTOS + 1):
+                cola_conocimiento.procesar_pendientes()
+
+        self.assertEqual(extraer.call_count, cola_conocimiento.MAX_INTENTOS)
+        self.assertEqual(ExtraccionPendiente.objects.get().intentos, cola_conocimiento.MAX_INTENTOS)
+        self.assertEqual(cola_conocimiento._tomar_lote(5), [])
+
+    def test_respuesta_no_json_solo_falla_en_modo_estricto(self):
+        self.assertEqual(_leer_extraccion('no es json'), {'hay_conocimiento': False, 'items': []})
+        with self.assertRaises(json.JSONDecodeError):
+            _leer_extraccion('no es json', estricto=True)
+
+
+class ContextoDinamicoTests(TestCase):
+    """Memoria e insights del prompt: se rearman solo cuando cambian"""
+
+    def setUp(self):
+        intelligent_business_assistant._contexto_negocio = (None, '')
+        self.meta = ConocimientoNegocio.objects.create(tipo='meta', clave='meta_ventas_mensual', valor='8000')
+
+    def _contexto(self):
+        return intelligent_business_assistant._contexto_dinamico()
+
+    def test_sin_cambios_solo_consulta_los_agregados(self):
+        self.assertIn('meta_ventas_mensual = 8000', self._contexto())
+
+        with self.assertNumQueries(2):
+            self.assertIn('meta_ventas_mensual = 8000', self._contexto())
+
+    def test_cambio_de_valor(self):
+        self._contexto()
+        self.meta.valor = '9000'
+        self.meta.save()
+
+        self.assertIn('meta_ventas_mensual = 9000', self._contexto())
+
+    def test_conocimiento_desactivado(self):
+        ConocimientoNegocio.objects.create(tipo='dato_clave', clave='empleados', valor='3')
+        self.assertIn('empleados = 3', self._contexto())
+
+        # Desactivar con update() no toca ultima_actualizacion: cambia el total
+        ConocimientoNegocio.objects.filter(clave='empleados').update(activo=False)
+        self.assertNotIn('empleados', self._contexto())
+
+    def test_insight_nuevo(self):
+        self._contexto()
+        InsightNegocio.objects.create(
+            tipo='alerta', titulo='Stock bajo de cuadernos', descripcion='Quedan 3 unidades'
+        )
+
+        self.assertIn('Stock bajo de cuadernos', self._contexto())
@@ -1,21 +1,26 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST, require_http_methods
+from asgiref.sync import sync_to_async
 import json
 from .services.openai_service import interpretar_mensaje
 from .services.negocio_service import ejecutar_accion
 from apps.chatbot.models import MensajeChat, Conversacion
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET
-from .services.intelligent_business_assistant import asistente_negocio
-from .services.openai_service import interpretar_mensaje
+from .services.intelligent_business_assistant import (
+    asistente_negocio_async, asistente_negocio_stream, asistente_negocio_stream_async
+)
+from .services.openai_service import interpretar_mensaje, interpretar_mensaje_async
 from .services.negocio_service import ejecutar_accion
-from .services.memory_manager import procesar_y_guardar_conocimiento
+from .services.cola_conocimiento import encolar_extraccion
 from .services.pattern_analyzer import ejecutar_analisis_completo, obtener_insights_no_vistos
 from .models import MensajeChat, Conversacion, InsightNegocio  # ✅ Agregar InsightNegocio
 from django.utils import timezone
 from .services.text_formatter import formatear_respuesta_chatbot
+from .services.listado_productos import render_pagina_productos
 
 def chatbot(request, conversacion_id=None):
     """Vista principal del chatbot"""
@@ -55,12 +60,19 @@ def chatbot(request, conversacion_id=None):
     })
 
 
-@require_POST
-def chatbot_api(request):
+# Palabras clave de ESCRITURA (modificar datos)
+KEYWORDS_ESCRITURA = [
+    'registrar', 'registra', 'vendí', 'vender', 'vende',
+    'agregar', 'agrega', 'crear', 'crea', 'añadir', 'añade'
+]
+
+
+def _leer_cuerpo(request):
+    """(mensaje, conversacion_id, None) o (None, None, JsonResponse de error)"""
     try:
         body = json.loads(request.body)
     except json.JSONDecodeError:
-        return JsonResponse(
+        return None, None, JsonResponse(
             {"respuesta": "❌ Formato de mensaje inválido"},
             status=400
         )
@@ -69,14 +81,25 @@ def chatbot_api(request):
     conversacion_id = body.get("conversacion_id")
     
     if not mensaje:
-        return JsonResponse({"respuesta": "❌ Mensaje vacío"})
+        return None, None, JsonResponse({"respuesta": "❌ Mensaje vacío"})
     
     if not conversacion_id:
-        return JsonResponse({"error": "❌ ID de conversación requerido"}, status=400)
+        return None, None, JsonResponse({"error": "❌ ID de conversación requerido"}, status=400)
+
+    return mensaje, conversacion_id, None
 
-    conversacion = get_object_or_404(Conversacion, id=conversacion_id)
 
-    # Guardar mensaje del usuario
+def _leer_mensaje(request):
+    """(conversacion, mensaje, None) o (None, None, JsonResponse de error)"""
+    mensaje, conversacion_id, error = _leer_cuerpo(request)
+    if error:
+        return None, None, error
+
+    return get_object_or_404(Conversacion, id=conversacion_id), mensaje, None
+
+
+def _iniciar_turno(conversacion, mensaje):
+    """Guarda el mensaje del usuario y devuelve (es_primer_mensaje, historial)"""
     MensajeChat.objects.create(
         conversacion=conversacion,
         tipo='user',
@@ -98,32 +121,18 @@ def chatbot_api(request):
             "content": msg.mensaje
         })
 
-    # Palabras clave de ESCRITURA (modificar datos)
-    keywords_escritura = [
-        'registrar', 'registra', 'vendí', 'vender', 'vende',
-        'agregar', 'agrega', 'crear', 'crea', 'añadir', 'añade'
-    ]
-    
-    es_accion_escritura = any(word in mensaje.lower() for word in keywords_escritura)
-    
-    if es_accion_escritura:
-        # Sistema antiguo para registros
-        data = interpretar_mensaje(mensaje)
-        respuesta = ejecutar_accion(data)
-    else:
-        # Sistema inteligente
-        respuesta = asistente_negocio(mensaje, historial=historial)
-        
-    
+    return es_primer_mensaje, historial
+
+
+def _es_accion_escritura(mensaje):
+    return any(word in mensaje.lower() for word in KEYWORDS_ESCRITURA)
+
+
+def _cerrar_turno(conversacion, respuesta, es_primer_mensaje):
+    """Formatea y guarda la respuesta del bot; devuelve los datos para el cliente"""
     # ✅ FORMATEAR LA RESPUESTA (convertir markdown a HTML)
     respuesta_formateada = formatear_respuesta_chatbot(respuesta)
 
-    # ✅ EXTRAER Y GUARDAR CONOCIMIENTO DESPUÉS DE RESPONDER
-    resultado_memoria = procesar_y_guardar_conocimiento(mensaje, respuesta)
-    
-    if resultado_memoria['conocimiento_guardado']:
-        print(f"💾 Conocimiento guardado: {resultado_memoria['items']}")
-
     # Guardar respuesta del bot
     MensajeChat.objects.create(
         conversacion=conversacion,
@@ -139,9 +148,112 @@ def chatbot_api(request):
         response_data["nuevo_titulo"] = conversacion.titulo
         response_data["es_primer_mensaje"] = True
 
+    return response_data
+
+
+@require_POST
+async def chatbot_api(request):
+    """
+    Vista async: las llamadas a OpenAI (varios segundos por turno) se esperan sin
+    ocupar un worker, así un proceso ASGI atiende muchas conversaciones a la vez.
+    Los pasos con varias consultas a la BD corren juntos en el hilo del ORM.
+    """
+    mensaje, conversacion_id, error = _leer_cuerpo(request)
+    if error:
+        return error
+
+    conversacion = await aget_object_or_404(Conversacion, id=conversacion_id)
+    es_primer_mensaje, historial = await sync_to_async(_iniciar_turno)(conversacion, mensaje)
+    
+    if _es_accion_escritura(mensaje):
+        # Sistema antiguo para registros
+        data = await interpretar_mensaje_async(mensaje)
+        respuesta = await sync_to_async(ejecutar_accion)(data)
+    else:
+        # Sistema inteligente
+        respuesta = await asistente_negocio_async(mensaje, historial=historial)
+    
+    response_data = await sync_to_async(_cerrar_turno)(conversacion, respuesta, es_primer_mensaje)
+
+    # ✅ EXTRAER CONOCIMIENTO EN SEGUNDO PLANO (la respuesta no espera al LLM)
+    await sync_to_async(encolar_extraccion)(mensaje, respuesta)
+
     return JsonResponse(response_data)
 
 
+def _evento_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+@require_POST
+def chatbot_stream(request):
+    """
+    Igual que chatbot_api pero responde con Server-Sent Events:
+    
+    - event: token  -> {"t": fragmento de texto} a medida que lo genera el modelo
+    - event: fin    -> mismos datos que chatbot_api (respuesta ya formateada en HTML)
+    - event: error  -> {"respuesta": mensaje de error}
+    
+    El mensaje completo se guarda y su extracción de memoria se encola al terminar el stream.
+    
+    Bajo ASGI el cuerpo es un generador async: Django consume un generador
+    síncrono con sync_to_async(list) y lo enviaría entero al final.
+    """
+    conversacion, mensaje, error = _leer_mensaje(request)
+    if error:
+        return error
+
+    es_primer_mensaje, historial = _iniciar_turno(conversacion, mensaje)
+
+    def eventos():
+        fragmentos = []
+        try:
+            if _es_accion_escritura(mensaje):
+                # Los registros no pasan por el modelo de respuesta: un solo fragmento
+                fragmentos.append(ejecutar_accion(interpretar_mensaje(mensaje)))
+                yield _evento_sse('token', {"t": fragmentos[0]})
+            else:
+                for fragmento in asistente_negocio_stream(mensaje, historial=historial):
+                    fragmentos.append(fragmento)
+                    yield _evento_sse('token', {"t": fragmento})
+        except Exception as e:
+            print(f"❌ Error en streaming: {e}")
+            yield _evento_sse('error', {"respuesta": "❌ Error al generar la respuesta"})
+            return
+
+        respuesta = ''.join(fragmentos)
+        response_data = _cerrar_turno(conversacion, respuesta, es_primer_mensaje)
+        encolar_extraccion(mensaje, respuesta)
+        yield _evento_sse('fin', response_data)
+
+    async def eventos_async():
+        fragmentos = []
+        try:
+            if _es_accion_escritura(mensaje):
+                data = await interpretar_mensaje_async(mensaje)
+                fragmentos.append(await sync_to_async(ejecutar_accion)(data))
+                yield _evento_sse('token', {"t": fragmentos[0]})
+            else:
+                async for fragmento in asistente_negocio_stream_async(mensaje, historial=historial):
+                    fragmentos.append(fragmento)
+                    yield _evento_sse('token', {"t": fragmento})
+        except Exception as e:
+            print(f"❌ Error en streaming: {e}")
+            yield _evento_sse('error', {"respuesta": "❌ Error al generar la respuesta"})
+            return
+
+        respuesta = ''.join(fragmentos)
+        response_data = await sync_to_async(_cerrar_turno)(conversacion, respuesta, es_primer_mensaje)
+        await sync_to_async(encolar_extraccion)(mensaje, respuesta)
+        yield _evento_sse('fin', response_data)
+
+    cuerpo = eventos_async() if isinstance(request, ASGIRequest) else eventos()
+    response = StreamingHttpResponse(cuerpo, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: no acumular el stream
+    return response
+
+
 @require_POST
 def nueva_conversacion(request):
     """Crear nueva conversación"""
@@ -212,4 +324,14 @@ def descartar_insight(request, insight_id):
 def descartar_todos_insights(request):
     """Marca todos los insights como vistos"""
     InsightNegocio.objects.filter(visto=False).update(visto=True)
-    return JsonResponse({'success': True})
\ No newline at end of file
+    return JsonResponse({'success': True})
+
+
+@require_GET
+def listado_productos_pagina(request):
+    """
+    Página del listado de productos de un mensaje del chatbot
+    
+    GET /chatbot/chat/productos/?cursor=<siguiente de la página anterior>
+    """
+    return JsonResponse(render_pagina_productos(request.GET.get('cursor') or None))
@@ -109,6 +109,80 @@ def test_firebase(request):
         }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
+@api_view(['GET'])
+def notification_stats(request):
+    """
+    Contadores del dispatcher de notificaciones en tiempo real
+    
+    GET /companies/api/notificaciones/estadisticas/
+    """
+    from .services import get_dispatcher
+    
+    return Response(get_dispatcher().stats())
+
+
+@api_view(['GET'])
+def buscar_productos_api(request):
+    """
+    Búsqueda de productos por nombre o código (con índice de texto)
+    
+    GET /companies/api/productos/buscar/?q=cuaderno&limite=20
+    """
+    from .services import ProductService
+    
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({
+            'status': 'error',
+            'message': 'El parámetro q es requerido'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limite = min(max(int(request.query_params.get('limite', 20)), 1), 100)
+    except ValueError:
+        limite = 20
+    
+    productos = ProductService.buscar_productos(query, limite=limite)
+    
+    return Response({
+        'status': 'success',
+        'query': query,
+        'productos': [
+            {
+                'id': p.id,
+                'nombre': p.nombre,
+                'codigo_barras': p.codigo_barras,
+                'precio_venta': float(p.precio_venta),
+                'stock': p.stock_actual,
+                'categoria': p.categoria.nombre
+            }
+            for p in productos
+        ]
+    })
+
+
+@api_view(['GET'])
+def autocompletar_productos_api(request):
+    """
+    Sugerencias de productos mientras se escribe (prefijo de las palabras del nombre)
+    
+    GET /companies/api/productos/autocompletar/?q=cuad&limite=10
+    """
+    from .services.autocompletado import get_autocompletado
+    
+    query = request.query_params.get('q', '').strip()
+    try:
+        limite = min(max(int(request.query_params.get('limite', 10)), 1), 50)
+    except ValueError:
+        limite = 10
+    
+    return Response({
+        'status': 'success',
+        'query': query,
+        'sugerencias': get_autocompletado().sugerir(query, limite) if query else []
+    })
+
+
 @api_view(['GET'])
 def dashboard_data(request):
     """
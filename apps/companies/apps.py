@@ -1,5 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class CompaniesConfig(AppConfig):
     name = 'apps.companies'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(_preparar_busqueda, sender=self)
+
+
+def _preparar_busqueda(sender, using='default', **kwargs):
+    # Índice de búsqueda de productos (FTS5 / trigramas): no vive en las migraciones
+    if using != 'default':
+        return
+    from .services.busqueda_service import preparar_busqueda
+    preparar_busqueda()
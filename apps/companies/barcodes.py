@@ -0,0 +1,94 @@
+"""
+Utilidades de códigos de barras
+Normalización, dígito de control GTIN (EAN-8, UPC-A, EAN-13, GTIN-14)
+y claves invertidas para buscar por sufijo con índice.
+"""
+
+LONGITUDES_GTIN = (8, 12, 13, 14)
+
+
+def normalizar_codigo(codigo):
+    """Quita espacios y guiones y pasa a mayúsculas ('' si no hay código)"""
+    if not codigo:
+        return ''
+    return str(codigo).strip().replace(' ', '').replace('-', '').upper()
+
+
+def invertir_codigo(codigo):
+    """
+    Código normalizado e invertido. Un sufijo del código es un prefijo
+    de esta clave, así que la búsqueda por sufijo usa el índice (rango).
+    """
+    normalizado = normalizar_codigo(codigo)
+    return normalizado[::-1] or None
+
+
+def rango_prefijo(prefijo):
+    """
+    Límites [desde, hasta) que contienen todas las cadenas que empiezan por prefijo.
+    Se usa con __gte / __lt para que la base de datos recorra solo ese rango del índice.
+    """
+    return prefijo, prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+
+
+def es_gtin(codigo):
+    """True si el código tiene forma de GTIN (solo dígitos y longitud estándar)"""
+    return codigo.isdigit() and len(codigo) in LONGITUDES_GTIN
+
+
+def digito_control_gtin(cuerpo):
+    """
+    Dígito de control GTIN para el cuerpo (el código sin su último dígito).
+    Pesos 3 y 1 alternados desde la derecha, módulo 10.
+    """
+    suma = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(cuerpo)))
+    return (10 - suma % 10) % 10
+
+
+def gtin_valido(codigo):
+    """True si es un GTIN con dígito de control correcto"""
+    return es_gtin(codigo) and digito_control_gtin(codigo[:-1]) == int(codigo[-1])
+
+
+def candidatos_gtin(codigo):
+    """
+    Correcciones posibles de un GTIN mal leído: todos los códigos con dígito de
+    control válido a un solo error de distancia. Cubre la sustitución de un dígito
+    y la transposición de dos dígitos adyacentes, los errores típicos de una
+    cámara de baja calidad.
+
+    Como mucho hay una sustitución válida por posición, así que el resultado
+    son unas decenas de códigos como máximo.
+
+    Returns:
+        Lista de tuplas (candidato, tipo, posicion) con tipo 'sustitucion' o 'transposicion'
+    """
+    if not es_gtin(codigo) or gtin_valido(codigo):
+        return []
+
+    candidatos = []
+    vistos = {codigo}
+
+    # Con el código completo, sum(dígito * peso) debe ser múltiplo de 10 (pesos 1, 3, 1...
+    # desde la derecha). Para cada posición hay un único dígito que corrige la suma
+    # (3 es invertible módulo 10: 3 * 7 = 21)
+    pesos = [3 if (len(codigo) - 1 - i) % 2 else 1 for i in range(len(codigo))]
+    resto = sum(int(d) * p for d, p in zip(codigo, pesos)) % 10
+
+    for posicion, peso in enumerate(pesos):
+        inverso = 7 if peso == 3 else 1
+        digito = str((int(codigo[posicion]) - resto * inverso) % 10)
+        candidato = codigo[:posicion] + digito + codigo[posicion + 1:]
+        if candidato not in vistos:
+            vistos.add(candidato)
+            candidatos.append((candidato, 'sustitucion', posicion))
+
+    for posicion in range(len(codigo) - 1):
+        if codigo[posicion] == codigo[posicion + 1]:
+            continue
+        candidato = codigo[:posicion] + codigo[posicion + 1] + codigo[posicion] + codigo[posicion + 2:]
+        if candidato not in vistos and gtin_valido(candidato):
+            vistos.add(candidato)
+            candidatos.append((candidato, 'transposicion', posicion))
+
+    return candidatos
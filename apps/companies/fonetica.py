@@ -0,0 +1,107 @@
+"""
+Clave fonética para español
+Variante simplificada de metaphone adaptada a la pronunciación latinoamericana
+(seseo y yeísmo): palabras que suenan igual producen la misma clave, así que
+las transcripciones de voz con errores de ortografía ('lapis', 'sacapunta')
+encuentran el producto ('Lápiz', 'Sacapuntas').
+"""
+
+VOCALES = 'aeiou'
+
+
+def clave_fonetica(palabra):
+    """
+    Clave de una palabra ya normalizada (minúsculas, sin tildes)
+
+    - b/v/w -> B, c(e,i)/s/z -> S, c/k/q(u) -> K, g(e,i)/j -> J, gu(e,i) -> G
+    - ll/y -> Y, ch -> X, ph -> F, h muda, rr -> R, x -> KS (S al inicio)
+    - las vocales solo cuentan al inicio; las letras repetidas se cuentan una vez
+    - se quita la S final (plurales: 'lapices' y 'lapiz' dan la misma clave)
+
+    >>> clave_fonetica('lapis') == clave_fonetica('lapiz') == clave_fonetica('lapices')
+    True
+    """
+    letras = ''.join(c for c in palabra if c.isalnum())
+    if not letras or letras.isdigit():
+        return letras
+
+    codigos = []
+    i = 0
+    n = len(letras)
+    while i < n:
+        c = letras[i]
+        sig = letras[i + 1] if i + 1 < n else ''
+        codigo = ''
+
+        if c in VOCALES:
+            codigo = c.upper() if not codigos else ''
+        elif c.isdigit():
+            codigo = c
+        elif c in 'bvw':
+            codigo = 'B'
+        elif c == 'c':
+            if sig == 'h':
+                codigo = 'X'
+                i += 1
+            else:
+                codigo = 'S' if sig in ('e', 'i') else 'K'
+        elif c in 'kq':
+            codigo = 'K'
+            if c == 'q' and sig == 'u':
+                i += 1
+        elif c == 'g':
+            if sig == 'u' and i + 2 < n and letras[i + 2] in 'ei':
+                codigo = 'G'
+                i += 1
+            else:
+                codigo = 'J' if sig in ('e', 'i') else 'G'
+        elif c == 'j':
+            codigo = 'J'
+        elif c == 'l':
+            if sig == 'l':
+                codigo = 'Y'
+                i += 1
+            else:
+                codigo = 'L'
+        elif c == 'y':
+            # Consonante delante de vocal ('yeso', 'mayo'); vocal en otro caso ('muy')
+            if sig and sig in VOCALES:
+                codigo = 'Y'
+            else:
+                codigo = 'I' if not codigos else ''
+        elif c == 'p':
+            if sig == 'h':
+                codigo = 'F'
+                i += 1
+            else:
+                codigo = 'P'
+        elif c in 'sz':
+            codigo = 'S'
+        elif c == 'x':
+            codigo = 'S' if not codigos else 'KS'
+        elif c == 'h':
+            codigo = ''
+        elif c.isalpha():
+            codigo = c.upper()
+
+        for letra in codigo:
+            if not codigos or codigos[-1] != letra:
+                codigos.append(letra)
+        i += 1
+
+    clave = ''.join(codigos)
+    if len(clave) > 2 and clave.endswith('S'):
+        clave = clave[:-1]
+    return clave
+
+
+def claves_foneticas(texto_normalizado, minimo=3):
+    """
+    Claves de las palabras de un texto normalizado, ignorando las palabras
+    cortas ('de', 'la', 'hb') que no ayudan a distinguir productos
+    """
+    return {
+        clave_fonetica(palabra)
+        for palabra in texto_normalizado.split()
+        if len(palabra) >= minimo
+    } - {''}
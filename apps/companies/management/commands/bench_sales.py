@@ -0,0 +1,390 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, OperationalError, DatabaseError
+from django.db.models import Sum
+from django.test import Client, override_settings
+from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+
+from apps.companies.barcodes import invertir_codigo
+from apps.companies.models import Categoria, Producto, Venta, ItemVenta
+from apps.companies.services import SalesService, get_dispatcher
+from apps.companies.services.firebase_stub import FirebaseStubServer
+from apps.companies.services.versioning import bump_version
+from apps.sales.services.venta_service import VentaService
+
+# Cada corrida crea su propia categoría 'bench_sales <marca>'; solo esa se borra al terminar
+PREFIJO_CATEGORIA = 'bench_sales'
+MODOS = ['sales_service', 'venta_service', 'api_ventas', 'pos_venta']
+ERRORES_BLOQUEO = ('locked', 'deadlock', 'could not serialize', 'lock timeout', 'could not obtain lock')
+
+
+class ErrorBloqueo(Exception):
+    """Conflicto de concurrencia reintentable (bloqueo, deadlock, serialización)"""
+
+
+class RechazoStock(Exception):
+    """La venta fue rechazada por stock insuficiente (resultado esperado)"""
+
+
+def _es_bloqueo(texto):
+    texto = (texto or '').lower()
+    return any(marca in texto for marca in ERRORES_BLOQUEO)
+
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[indice]
+
+
+class Command(BaseCommand):
+    help = 'Mide el throughput de ventas concurrentes y verifica la consistencia del stock'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=200, help='Tamaño del catálogo de prueba')
+        parser.add_argument('--stock', type=int, default=1000, help='Stock inicial por producto')
+        parser.add_argument('--workers', type=int, default=8, help='Hilos concurrentes')
+        parser.add_argument('--ventas', type=int, default=50, help='Ventas por worker')
+        parser.add_argument('--items-max', type=int, default=3, help='Máximo de líneas por venta')
+        parser.add_argument('--hot-productos', type=int, default=5, help='Productos "calientes"')
+        parser.add_argument('--hot-ratio', type=float, default=0.8,
+                            help='Probabilidad de que una línea sea de un producto caliente')
+        parser.add_argument('--modo', action='append', choices=MODOS,
+                            help='Ruta a medir (repetible). Por defecto todas')
+        parser.add_argument('--url', help='URL de un servidor en vivo para los modos HTTP (por defecto Django test client)')
+        parser.add_argument('--host', default='localhost', help='Host para el test client')
+        parser.add_argument('--notificador', choices=['memoria', 'stub', 'configurado'], default='memoria',
+                            help='Backend de notificaciones durante la prueba')
+        parser.add_argument('--latencia-notificador', type=int, default=0, help='Latencia simulada del notificador (ms)')
+        parser.add_argument('--reintentos', type=int, default=3, help='Reintentos ante bloqueos/deadlocks')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--conservar', action='store_true', help='No borrar el catálogo de prueba al terminar')
+        parser.add_argument('--limpiar', metavar='MARCA',
+                            help='Solo borrar el catálogo y las ventas de una corrida anterior hecha con --conservar')
+        parser.add_argument('--yes', action='store_true',
+                            help='Confirma que se escriban (y borren) datos de prueba en la base de datos configurada')
+        parser.add_argument('--json', action='store_true', help='Imprimir el reporte en JSON')
+
+    def handle(self, *args, **options):
+        if options['hot_productos'] > options['productos']:
+            raise CommandError('--hot-productos no puede ser mayor que --productos')
+
+        if not options['yes']:
+            base = connections['default'].settings_dict['NAME']
+            raise CommandError(
+                f'bench_sales crea productos y ventas de prueba en la base de datos configurada ({base}). '
+                'Usar --yes para confirmar.'
+            )
+
+        self.options = options
+        if options['limpiar']:
+            self.nombre_categoria = f'{PREFIJO_CATEGORIA} {options["limpiar"]}'
+            if not Categoria.objects.filter(nombre=self.nombre_categoria).exists():
+                raise CommandError(f'No existe la categoría de prueba "{self.nombre_categoria}"')
+            self._limpiar_catalogo()
+            self.stdout.write(self.style.SUCCESS(f'✓ Catálogo de prueba "{self.nombre_categoria}" eliminado'))
+            return
+
+        marca = uuid.uuid4().hex[:8]
+        self.nombre_categoria = f'{PREFIJO_CATEGORIA} {marca}'
+        modos = options['modo'] or MODOS
+
+        if options['verbosity'] < 2:
+            # Los rechazos por stock son esperados; no inundar la salida con ellos
+            logging.getLogger('apps').setLevel(logging.CRITICAL)
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+        productos = self._sembrar_catalogo(marca)
+        self.stdout.write(f'Catálogo de prueba "{self.nombre_categoria}": {len(productos)} productos, stock {options["stock"]}')
+
+        stub = None
+        notifier_settings = None
+        if options['notificador'] == 'memoria':
+            notifier_settings = {
+                'BACKEND': 'apps.companies.services.notifiers.InMemoryNotifier',
+                'OPTIONS': {'latency_ms': options['latencia_notificador']},
+            }
+        elif options['notificador'] == 'stub':
+            stub = FirebaseStubServer(latency_ms=options['latencia_notificador']).start()
+            notifier_settings = {
+                'BACKEND': 'apps.companies.services.notifiers.FirebaseRestNotifier',
+                'OPTIONS': {'database_url': stub.url},
+            }
+
+        reportes = []
+        try:
+            for modo in modos:
+                if notifier_settings:
+                    with override_settings(REALTIME_NOTIFIER=notifier_settings):
+                        reportes.append(self._ejecutar_modo(modo, productos))
+                else:
+                    reportes.append(self._ejecutar_modo(modo, productos))
+        finally:
+            if stub:
+                stub.stop()
+            if options['conservar']:
+                self.stdout.write(f'Catálogo conservado; para borrarlo: bench_sales --yes --limpiar {marca}')
+            else:
+                self._limpiar_catalogo()
+
+        if options['json']:
+            self.stdout.write(json.dumps(reportes, indent=2))
+        else:
+            for reporte in reportes:
+                self._imprimir_reporte(reporte)
+
+    # ------------------------------------------------------------------
+    # Catálogo de prueba
+    # ------------------------------------------------------------------
+
+    def _sembrar_catalogo(self, marca):
+        categoria = Categoria.objects.create(
+            nombre=self.nombre_categoria,
+            descripcion='Productos generados por bench_sales'
+        )
+        Producto.objects.bulk_create([
+            Producto(
+                nombre=f'Bench {i:05d}',
+                categoria=categoria,
+                precio_venta=Decimal('2.50'),
+                precio_compra=Decimal('1.00'),
+                stock_actual=self.options['stock'],
+                stock_minimo=0,
+                codigo_barras=f'BENCH{marca}{i:07d}',
+                codigo_barras_invertido=invertir_codigo(f'BENCH{marca}{i:07d}'),
+                activo=True
+            )
+            for i in range(self.options['productos'])
+        ])
+        # bulk_create no dispara señales: invalidar índices del catálogo a mano
+        bump_version('catalogo')
+        bump_version('datos')
+        return list(Producto.objects.filter(categoria=categoria).order_by('id').values_list('id', flat=True))
+
+    def _limpiar_catalogo(self):
+        # Solo la categoría de esta corrida: sus productos y las ventas que los incluyen
+        bench = Producto.objects.filter(categoria__nombre=self.nombre_categoria)
+        ventas = ItemVenta.objects.filter(producto__in=bench).values('venta_id')
+        Venta.objects.filter(id__in=ventas).delete()
+        bench.delete()
+        Categoria.objects.filter(nombre=self.nombre_categoria).delete()
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def _ejecutar_modo(self, modo, productos):
+        opts = self.options
+        Producto.objects.filter(id__in=productos).update(
+            stock_actual=opts['stock'],
+            fecha_actualizacion=timezone.now()
+        )
+        ultima_venta = Venta.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        dispatcher = get_dispatcher()
+        dispatcher.flush()
+        dispatcher.reset_stats()
+
+        calientes = productos[:opts['hot_productos']]
+        frios = productos[opts['hot_productos']:] or calientes
+        lock = threading.Lock()
+        resultados = {
+            'latencias': [], 'ok': 0, 'rechazadas_stock': 0, 'errores': 0,
+            'reintentos': 0, 'errores_bloqueo': 0, 'espera_bloqueo_ms': 0.0, 'ultimo_error': None,
+        }
+
+        def worker(indice):
+            rng = random.Random(opts['semilla'] + indice)
+            cliente = self._crear_cliente()
+            try:
+                for _ in range(opts['ventas']):
+                    items = self._generar_items(rng, calientes, frios)
+                    inicio = time.perf_counter()
+                    estado, reintentos, bloqueos, espera, error = self._vender_con_reintentos(modo, cliente, items)
+                    duracion = (time.perf_counter() - inicio) * 1000
+                    with lock:
+                        resultados['latencias'].append(duracion)
+                        resultados[estado] += 1
+                        resultados['reintentos'] += reintentos
+                        resultados['errores_bloqueo'] += bloqueos
+                        resultados['espera_bloqueo_ms'] += espera
+                        if error:
+                            resultados['ultimo_error'] = error
+            finally:
+                connections.close_all()
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=opts['workers']) as pool:
+            list(pool.map(worker, range(opts['workers'])))
+        duracion = time.perf_counter() - inicio
+
+        dispatcher.flush()
+        latencias = sorted(resultados['latencias'])
+
+        return {
+            'modo': modo,
+            'workers': opts['workers'],
+            'intentos': len(latencias),
+            'ok': resultados['ok'],
+            'rechazadas_stock': resultados['rechazadas_stock'],
+            'errores': resultados['errores'],
+            'ultimo_error': resultados['ultimo_error'],
+            'reintentos': resultados['reintentos'],
+            'errores_bloqueo': resultados['errores_bloqueo'],
+            'espera_bloqueo_ms': round(resultados['espera_bloqueo_ms'], 2),
+            'duracion_s': round(duracion, 3),
+            'ventas_por_segundo': round(resultados['ok'] / duracion, 2) if duracion else 0,
+            'latencia_ms': {
+                'p50': round(_percentil(latencias, 50), 2),
+                'p95': round(_percentil(latencias, 95), 2),
+                'p99': round(_percentil(latencias, 99), 2),
+                'max': round(latencias[-1], 2) if latencias else 0,
+            },
+            'notificaciones': dispatcher.stats(),
+            'consistencia': self._verificar_consistencia(productos, ultima_venta, resultados['ok']),
+        }
+
+    def _generar_items(self, rng, calientes, frios):
+        items = {}
+        for _ in range(rng.randint(1, self.options['items_max'])):
+            origen = calientes if rng.random() < self.options['hot_ratio'] else frios
+            producto_id = rng.choice(origen)
+            items[producto_id] = items.get(producto_id, 0) + rng.randint(1, 3)
+        return [{'producto_id': pid, 'cantidad': cantidad} for pid, cantidad in items.items()]
+
+    def _vender_con_reintentos(self, modo, cliente, items):
+        """
+        Devuelve (estado, reintentos, bloqueos, espera_ms, error)
+
+        espera_ms es el tiempo perdido por bloqueos: la duración de los intentos
+        que fallaron por un bloqueo (incluye la espera del busy_timeout/lock
+        timeout de la base de datos) más el backoff antes de reintentar.
+        """
+        bloqueos = 0
+        espera = 0.0
+        ultimo = None
+        for intento in range(self.options['reintentos'] + 1):
+            inicio = time.perf_counter()
+            try:
+                self._vender(modo, cliente, items)
+                return 'ok', intento, bloqueos, espera, None
+            except RechazoStock:
+                return 'rechazadas_stock', intento, bloqueos, espera, None
+            except ErrorBloqueo as e:
+                ultimo = str(e)
+            except (OperationalError, DatabaseError) as e:
+                if not _es_bloqueo(str(e)):
+                    return 'errores', intento, bloqueos, espera, str(e)
+                ultimo = str(e)
+            except Exception as e:
+                return 'errores', intento, bloqueos, espera, str(e)
+
+            bloqueos += 1
+            time.sleep(0.005 * (2 ** intento))
+            espera += (time.perf_counter() - inicio) * 1000
+        return 'errores', self.options['reintentos'], bloqueos, espera, ultimo
+
+    def _vender(self, modo, cliente, items):
+        if modo == 'sales_service':
+            try:
+                SalesService.crear_venta(items_data=items, notas='bench_sales')
+            except ValueError as e:
+                raise RechazoStock(str(e)) if 'Stock insuficiente' in str(e) else e
+
+        elif modo == 'venta_service':
+            resultado = VentaService.crear_venta(items_data=items, usa_voz=False, dispositivo='bench')
+            self._clasificar_respuesta(resultado.get('success'), resultado.get('mensaje', ''))
+
+        elif modo == 'api_ventas':
+            status, data = self._post(cliente, '/companies/api/ventas/', {'items': items, 'notas': 'bench_sales'})
+            self._clasificar_respuesta(status == 201, f"{data.get('error', '')} {data.get('details', '')}")
+
+        elif modo == 'pos_venta':
+            status, data = self._post(cliente, '/sales/api/venta/', {'items': items, 'usa_voz': False, 'dispositivo': 'bench'})
+            self._clasificar_respuesta(status == 200 and data.get('success'), data.get('mensaje', ''))
+
+    def _clasificar_respuesta(self, exito, mensaje):
+        if exito:
+            return
+        if 'Stock insuficiente' in mensaje:
+            raise RechazoStock(mensaje)
+        if _es_bloqueo(mensaje):
+            raise ErrorBloqueo(mensaje)
+        raise RuntimeError(mensaje.strip() or 'Error desconocido')
+
+    def _crear_cliente(self):
+        if self.options['url']:
+            import requests
+            return requests.Session()
+        return Client(HTTP_HOST=self.options['host'])
+
+    def _post(self, cliente, path, payload):
+        if self.options['url']:
+            response = cliente.post(self.options['url'].rstrip('/') + path, json=payload, timeout=30)
+            status = response.status_code
+        else:
+            response = cliente.post(path, data=json.dumps(payload), content_type='application/json')
+            status = response.status_code
+        try:
+            return status, response.json()
+        except ValueError:
+            return status, {}
+
+    # ------------------------------------------------------------------
+    # Verificación y reporte
+    # ------------------------------------------------------------------
+
+    def _verificar_consistencia(self, productos, ultima_venta, ventas_ok):
+        vendidos = dict(
+            ItemVenta.objects.filter(producto_id__in=productos, venta_id__gt=ultima_venta)
+            .values('producto_id').annotate(total=Sum('cantidad'))
+            .values_list('producto_id', 'total')
+        )
+        stocks = dict(Producto.objects.filter(id__in=productos).values_list('id', 'stock_actual'))
+
+        descuadres = [
+            pid for pid, stock in stocks.items()
+            if stock != self.options['stock'] - vendidos.get(pid, 0)
+        ]
+        negativos = [pid for pid, stock in stocks.items() if stock < 0]
+        ventas = Venta.objects.filter(id__gt=ultima_venta, items__producto_id__in=productos).distinct().count()
+
+        return {
+            'ok': not descuadres and not negativos and ventas == ventas_ok,
+            'productos_descuadrados': len(descuadres),
+            'stock_negativo': len(negativos),
+            'ventas_registradas': ventas,
+            'ventas_confirmadas': ventas_ok,
+        }
+
+    def _imprimir_reporte(self, r):
+        lat = r['latencia_ms']
+        cons = r['consistencia']
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING(f"▶ {r['modo']} ({r['workers']} workers)"))
+        self.stdout.write(f"  Ventas OK: {r['ok']}/{r['intentos']}  rechazadas por stock: {r['rechazadas_stock']}  errores: {r['errores']}")
+        self.stdout.write(f"  Throughput: {r['ventas_por_segundo']} ventas/s en {r['duracion_s']} s")
+        self.stdout.write(f"  Latencia ms  p50={lat['p50']}  p95={lat['p95']}  p99={lat['p99']}  max={lat['max']}")
+        self.stdout.write(
+            f"  Errores por bloqueo: {r['errores_bloqueo']}  tiempo perdido en bloqueos: {r['espera_bloqueo_ms']} ms  "
+            f"reintentos: {r['reintentos']}"
+        )
+        notif = r['notificaciones']
+        self.stdout.write(f"  Notificaciones: {notif['recibidas']} recibidas, {notif['coalescidas']} coalescidas, {notif['enviadas']} enviadas")
+        if r['ultimo_error']:
+            self.stdout.write(self.style.WARNING(f"  Último error: {r['ultimo_error'][:200]}"))
+        estilo = self.style.SUCCESS if cons['ok'] else self.style.ERROR
+        self.stdout.write(estilo(
+            f"  Consistencia: {'OK' if cons['ok'] else 'FALLA'} "
+            f"(descuadres={cons['productos_descuadrados']}, negativos={cons['stock_negativo']}, "
+            f"ventas={cons['ventas_registradas']}/{cons['ventas_confirmadas']})"
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+import time
+
+from apps.companies.services.firebase_stub import FirebaseStubServer
+
+
+class Command(BaseCommand):
+    help = 'Levanta un servidor local que imita el endpoint REST de ping de Firebase'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=9099)
+        parser.add_argument('--latencia', type=int, default=0, help='Latencia artificial por petición (ms)')
+
+    def handle(self, *args, **options):
+        stub = FirebaseStubServer(
+            host=options['host'],
+            port=options['port'],
+            latency_ms=options['latencia']
+        )
+        stub.start()
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Firebase stub en {stub.url}'))
+        self.stdout.write(f'  Usa FIREBASE_DATABASE_URL={stub.url} para apuntar el servidor aquí')
+        self.stdout.write('  Ctrl+C para detener')
+
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stub.stop()
+            self.stdout.write(f'  {len(stub.pings)} pings recibidos')
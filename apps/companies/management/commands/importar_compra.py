@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.companies.models import Proveedor
+from apps.companies.services.compra_service import CompraService
+
+
+class Command(BaseCommand):
+    help = 'Registra una compra a proveedor desde el CSV de su factura (producto_id/codigo_barras, cantidad, precio_unitario)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del CSV de la factura')
+        parser.add_argument('--proveedor', required=True, help='ID o nombre del proveedor')
+        parser.add_argument('--notas', default=None, help='Notas de la compra (p. ej. número de factura)')
+        parser.add_argument('--sin-precios', action='store_true', help='No actualizar precio_compra de los productos')
+
+    def handle(self, *args, **options):
+        proveedor = self._buscar_proveedor(options['proveedor'])
+
+        try:
+            with CaptureQueriesContext(connection) as consultas:
+                compra = CompraService.importar_csv(
+                    options['archivo'],
+                    proveedor_id=proveedor.id,
+                    notas=options['notas'],
+                    actualizar_precio=not options['sin_precios']
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Compra {compra.id} registrada para {proveedor.nombre}'))
+        self.stdout.write(f'  - {compra.items.count()} líneas')
+        self.stdout.write(f'  - Total: ${compra.total}')
+        self.stdout.write(f'  - {len(consultas)} consultas')
+
+    def _buscar_proveedor(self, valor):
+        try:
+            if valor.isdigit():
+                return Proveedor.objects.get(id=int(valor))
+            return Proveedor.objects.get(nombre__iexact=valor)
+        except Proveedor.DoesNotExist:
+            raise CommandError(f'Proveedor "{valor}" no encontrado')
+        except Proveedor.MultipleObjectsReturned:
+            raise CommandError(f'Hay varios proveedores llamados "{valor}", usa el ID')
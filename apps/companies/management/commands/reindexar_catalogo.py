@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from apps.companies.barcodes import es_gtin, gtin_valido, invertir_codigo
+from apps.companies.models import Producto
+from apps.companies.services.busqueda_service import preparar_busqueda
+from apps.companies.services.versioning import bump_version
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el código de barras invertido (búsqueda por sufijo), reconstruye el índice de texto y revisa los dígitos de control'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Productos por UPDATE')
+
+    def handle(self, *args, **options):
+        pendientes = []
+        invalidos = []
+        revisados = 0
+
+        filas = Producto.objects.values_list('id', 'nombre', 'codigo_barras', 'codigo_barras_invertido')
+        for producto_id, nombre, codigo, invertido in filas.iterator(chunk_size=options['lote']):
+            revisados += 1
+            nuevo = invertir_codigo(codigo)
+            if nuevo != invertido:
+                pendientes.append(Producto(id=producto_id, codigo_barras_invertido=nuevo))
+
+            codigo = (codigo or '').strip()
+            if es_gtin(codigo) and not gtin_valido(codigo):
+                invalidos.append((producto_id, nombre, codigo))
+
+        Producto.objects.bulk_update(pendientes, ['codigo_barras_invertido'], batch_size=options['lote'])
+        if pendientes:
+            bump_version('catalogo')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {revisados} productos revisados, {len(pendientes)} reindexados'))
+
+        busqueda = preparar_busqueda()
+        indexados = busqueda.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'✓ Índice de búsqueda ({busqueda.nombre}): {indexados} productos'))
+
+        if invalidos:
+            self.stdout.write(self.style.WARNING(f'⚠️ {len(invalidos)} códigos GTIN con dígito de control inválido:'))
+            for producto_id, nombre, codigo in invalidos[:50]:
+                self.stdout.write(f'  - [{producto_id}] {nombre}: {codigo}')
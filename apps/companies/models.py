@@ -1,10 +1,13 @@
 # models.py
 
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
+from .barcodes import invertir_codigo
+
 class Categoria(models.Model):
     """Categorías de productos: Libros, Cuadernos, Útiles, etc."""
     nombre = models.CharField(max_length=100, unique=True)
@@ -35,6 +38,9 @@ class Proveedor(models.Model):
 
 class Producto(models.Model):
     """Productos de la librería"""
+    # Campos que leen los índices en memoria del catálogo (nombres, autocompletado, códigos)
+    CAMPOS_CATALOGO = ('nombre', 'codigo_barras', 'precio_venta', 'activo', 'categoria_id')
+    
     nombre = models.CharField(max_length=200)
     categoria = models.ForeignKey(Categoria, on_delete=models.PROTECT, related_name='productos')
     proveedor = models.ForeignKey(Proveedor, on_delete=models.SET_NULL, null=True, blank=True, related_name='productos')
@@ -54,7 +60,7 @@ class Producto(models.Model):
     
     # Timestamps
     fecha_creacion = models.DateTimeField(auto_now_add=True)
-    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_index=True)  # versión del catálogo (deltas)
     
     codigo_barras = models.CharField(
         max_length=50,
@@ -65,12 +71,44 @@ class Producto(models.Model):
         help_text="Código de barras del producto (EAN-13, UPC, Code-128, etc.)"
     )
     
+    # Código normalizado e invertido: búsqueda por sufijo (lecturas parciales) con índice
+    codigo_barras_invertido = models.CharField(max_length=50, blank=True, null=True, db_index=True, editable=False)
+    
     class Meta:
         ordering = ['nombre']
     
     def __str__(self):
         return f"{self.nombre} - ${self.precio_venta}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._catalogo_cargado = instancia.valores_catalogo()
+        return instancia
+    
+    def valores_catalogo(self):
+        """Valores actuales de CAMPOS_CATALOGO (None para los diferidos, sin consultar la BD)"""
+        return tuple(self.__dict__.get(campo) for campo in self.CAMPOS_CATALOGO)
+    
+    def cambio_catalogo(self, update_fields=None):
+        """
+        True si el último save() pudo cambiar algo que muestran los índices del catálogo.
+        Un save() que solo mueve el stock (cada venta) no los invalida.
+        """
+        if update_fields is not None:
+            campos = {'categoria_id' if campo == 'categoria' else campo for campo in update_fields}
+            return not campos.isdisjoint(self.CAMPOS_CATALOGO)
+        
+        cargado = getattr(self, '_catalogo_cargado', None)
+        return cargado is None or cargado != self.valores_catalogo()
+    
+    def save(self, *args, **kwargs):
+        self.codigo_barras_invertido = invertir_codigo(self.codigo_barras)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'codigo_barras' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'codigo_barras_invertido'}
+        super().save(*args, **kwargs)
+    
     @property
     def margen_ganancia(self):
         """Calcula el margen de ganancia en porcentaje"""
@@ -173,9 +211,26 @@ class ItemCompra(models.Model):
         return f"{self.cantidad}x {self.producto.nombre}"
     
     def save(self, *args, **kwargs):
+        nuevo = self._state.adding
         self.subtotal = self.cantidad * self.precio_unitario
         super().save(*args, **kwargs)
         
-        # Actualiza el stock del producto
-        self.producto.stock_actual += self.cantidad
-        self.producto.save()
\ No newline at end of file
+        # Actualiza el stock del producto (solo al recibir el item, con un UPDATE atómico).
+        # Para compras de muchas líneas usar CompraService.registrar_compra
+        if nuevo:
+            Producto.objects.filter(pk=self.producto_id).update(
+                stock_actual=F('stock_actual') + self.cantidad,
+                fecha_actualizacion=timezone.now()
+            )
+
+
+class ContadorVersion(models.Model):
+    """Versión de un espacio de nombres de cachés ('catalogo', 'datos'); ver services/versioning.py"""
+    nombre = models.CharField(max_length=50, unique=True)
+    valor = models.BigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = "Contadores de versión"
+    
+    def __str__(self):
+        return f"{self.nombre}: {self.valor}"
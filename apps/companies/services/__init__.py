@@ -6,6 +6,12 @@ Contiene la lógica de negocio separada de las vistas
 from .dashboard_service import DashboardService
 from .product_service import ProductService
 from .sales_service import SalesService
+from .compra_service import CompraService
 from .firebase_service import FirebaseService  # ← AGREGAR ESTA LÍNEA
+from .notification_dispatcher import NotificationDispatcher, get_dispatcher, notificar_cambio
+from .notifiers import get_notifier
 
-__all__ = ['DashboardService', 'ProductService', 'SalesService', 'FirebaseService']
\ No newline at end of file
+__all__ = [
+    'DashboardService', 'ProductService', 'SalesService', 'CompraService', 'FirebaseService',
+    'NotificationDispatcher', 'get_dispatcher', 'notificar_cambio', 'get_notifier',
+]
\ No newline at end of file
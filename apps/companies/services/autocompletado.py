@@ -0,0 +1,234 @@
+"""
+Autocompletado de Productos
+Sugerencias por prefijo de nombre (typeahead) resueltas en memoria, sin consultar
+la base de datos en cada tecla.
+"""
+
+from django.db.models import Sum
+from django.utils import timezone
+from datetime import timedelta
+from itertools import islice
+from operator import itemgetter
+import bisect
+import threading
+import time
+import logging
+
+from ..models import Producto, ItemVenta
+from .tabla_nombres import normalizar_texto
+from .versioning import get_version
+
+logger = logging.getLogger(__name__)
+
+CAMPOS = ('id', 'nombre', 'codigo_barras', 'precio_venta', 'activo', 'fecha_actualizacion')
+
+# Mayor que cualquier carácter de una palabra: (prefijo + FIN_PREFIJO,) acota el rango
+FIN_PREFIJO = '\U0010ffff'
+
+
+class IndiceSugerencias:
+    """
+    Foto inmutable del índice: quien sugiere toma una referencia y lee
+    palabras, productos, ventas y orden de la misma carga.
+    """
+
+    __slots__ = ('palabras', 'productos', 'ventas', 'orden', 'rango', 'marca')
+
+    def __init__(self, palabras=(), productos=None, ventas=None, marca=None):
+        self.palabras = palabras            # [(palabra, producto_id)] ordenada
+        self.productos = productos or {}    # producto_id -> dict con id, nombre, codigo_barras, precio_venta
+        self.ventas = ventas or {}          # producto_id -> unidades vendidas recientemente
+        self.marca = marca                  # fecha_actualizacion más reciente cargada
+
+        # Orden de sugerencia: más vendidos, luego nombres más cortos
+        orden = sorted(
+            self.productos.values(),
+            key=lambda p: (-self.ventas.get(p['id'], 0), len(p['nombre']), p['nombre'])
+        )
+        self.orden = [p['id'] for p in orden]
+        self.rango = {producto_id: posicion for posicion, producto_id in enumerate(self.orden)}
+
+
+class Autocompletado:
+    """
+    Lista ordenada de pares (palabra normalizada, producto_id) sobre la que se
+    busca por prefijo con bisect: todas las palabras que empiezan por 'cua'
+    quedan contiguas entre bisect_left('cua') y la primera que ya no coincide.
+
+    Se construye la primera vez que se usa. Cuando cambia la versión del catálogo
+    solo se reemplazan las palabras de los productos modificados desde la última
+    carga (fecha_actualizacion); si faltan productos (borrados) se reconstruye.
+
+    Las sugerencias se ordenan por unidades vendidas en los últimos días.
+
+    Los cambios se arman sobre copias y se publican como un IndiceSugerencias
+    nuevo en una sola asignación; nunca se modifica una foto ya publicada.
+    """
+
+    DIAS_VENTAS = 30
+    TTL_VENTAS = 300  # segundos entre recálculos de las ventas recientes
+    MAX_CAMBIOS = 200  # con más productos modificados se reconstruye completo
+
+    def __init__(self):
+        self._indice = IndiceSugerencias()
+        self._ventas_hasta = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def sugerir(self, texto, limite=10):
+        """
+        Productos activos cuyo nombre tiene palabras que empiezan por cada término
+
+        'cuad esp' sugiere 'Cuaderno Espiral A4' (cada término es prefijo de alguna palabra)
+
+        Returns:
+            Lista de dicts con id, nombre, codigo_barras, precio_venta y vendidos
+        """
+        terminos = normalizar_texto(texto).split()
+        if not terminos:
+            return []
+
+        self._sincronizar()
+        self._actualizar_ventas()
+
+        indice = self._indice
+        palabras = indice.palabras
+        candidatos = None
+        # El término más largo suele ser el más selectivo: se empieza por él
+        for termino in sorted(set(terminos), key=len, reverse=True):
+            inicio = bisect.bisect_left(palabras, (termino,))
+            fin = bisect.bisect_left(palabras, (termino + FIN_PREFIJO,), inicio)
+            ids = set(map(itemgetter(1), palabras[inicio:fin]))
+
+            candidatos = ids if candidatos is None else candidatos & ids
+            if not candidatos:
+                return []
+
+        if len(candidatos) <= limite * 50:
+            mejores = sorted(candidatos, key=indice.rango.__getitem__)[:limite]
+        else:
+            # Prefijo amplio: recorrer por popularidad hasta juntar el límite
+            mejores = islice(filter(candidatos.__contains__, indice.orden), limite)
+        return [
+            dict(indice.productos[i], vendidos=indice.ventas.get(i, 0))
+            for i in mejores
+        ]
+
+    def invalidar(self):
+        """Descarta el índice; la próxima sugerencia lo reconstruye completo"""
+        with self._lock:
+            self._version = None
+            self._ventas_hasta = 0
+
+    def _sincronizar(self):
+        version = get_version('catalogo')
+        if version == self._version:
+            return
+
+        with self._lock:
+            if version == self._version:
+                return
+
+            actual = self._indice
+            if self._version is None or actual.marca is None:
+                self._indice = self._cargar(actual.ventas)
+            else:
+                cambios = list(
+                    Producto.objects.filter(fecha_actualizacion__gte=actual.marca)
+                    .values(*CAMPOS)[:self.MAX_CAMBIOS + 1]
+                )
+                if len(cambios) > self.MAX_CAMBIOS:
+                    self._indice = self._cargar(actual.ventas)
+                else:
+                    # Copias: los lectores siguen usando la foto anterior sin bloquearse
+                    palabras = list(actual.palabras)
+                    productos = dict(actual.productos)
+                    marca = actual.marca
+                    for fila in cambios:
+                        self._aplicar(fila, palabras, productos)
+                        marca = max(marca, fila['fecha_actualizacion'])
+
+                    # Los productos borrados no aparecen en el delta
+                    if len(productos) != Producto.objects.filter(activo=True).count():
+                        self._indice = self._cargar(actual.ventas)
+                    else:
+                        self._indice = IndiceSugerencias(palabras, productos, actual.ventas, marca)
+
+            self._version = version
+
+    def _cargar(self, ventas):
+        """Construcción completa"""
+        palabras = []
+        productos = {}
+        marca = None
+
+        for fila in Producto.objects.filter(activo=True).values(*CAMPOS):
+            productos[fila['id']] = self._resumen(fila)
+            palabras.extend((palabra, fila['id']) for palabra in self._palabras_de(fila['nombre']))
+            if marca is None or fila['fecha_actualizacion'] > marca:
+                marca = fila['fecha_actualizacion']
+
+        palabras.sort()
+        logger.debug(f"Autocompletado cargado: {len(productos)} productos, {len(palabras)} palabras")
+        return IndiceSugerencias(palabras, productos, ventas, marca)
+
+    def _aplicar(self, fila, palabras, productos):
+        """Reemplaza las palabras de un producto modificado en las copias recibidas"""
+        producto_id = fila['id']
+        anterior = productos.pop(producto_id, None)
+
+        if anterior is not None:
+            for palabra in self._palabras_de(anterior['nombre']):
+                posicion = bisect.bisect_left(palabras, (palabra, producto_id))
+                if posicion < len(palabras) and palabras[posicion] == (palabra, producto_id):
+                    del palabras[posicion]
+
+        if fila['activo']:
+            productos[producto_id] = self._resumen(fila)
+            for palabra in self._palabras_de(fila['nombre']):
+                bisect.insort(palabras, (palabra, producto_id))
+
+    def _actualizar_ventas(self):
+        ahora = time.monotonic()
+        if ahora < self._ventas_hasta:
+            return
+
+        desde = timezone.now() - timedelta(days=self.DIAS_VENTAS)
+        ventas = dict(
+            ItemVenta.objects.filter(venta__fecha__gte=desde)
+            .values_list('producto_id')
+            .annotate(unidades=Sum('cantidad'))
+            .values_list('producto_id', 'unidades')
+        )
+
+        with self._lock:
+            actual = self._indice
+            self._indice = IndiceSugerencias(actual.palabras, actual.productos, ventas, actual.marca)
+            self._ventas_hasta = ahora + self.TTL_VENTAS
+
+    @staticmethod
+    def _palabras_de(nombre):
+        return set(normalizar_texto(nombre).split())
+
+    @staticmethod
+    def _resumen(fila):
+        return {
+            'id': fila['id'],
+            'nombre': fila['nombre'],
+            'codigo_barras': fila['codigo_barras'],
+            'precio_venta': float(fila['precio_venta']),
+        }
+
+
+_autocompletado = None
+_autocompletado_lock = threading.Lock()
+
+
+def get_autocompletado():
+    """Índice de autocompletado compartido del proceso"""
+    global _autocompletado
+    if _autocompletado is None:
+        with _autocompletado_lock:
+            if _autocompletado is None:
+                _autocompletado = Autocompletado()
+    return _autocompletado
@@ -0,0 +1,279 @@
+"""
+Búsqueda de Productos
+Búsqueda de texto con índice según el motor de base de datos:
+
+- SQLite: tabla virtual FTS5 (tokenizador unicode61 sin tildes) mantenida con triggers;
+  si no encuentra nada, o el texto es un número (fragmento de código de barras),
+  se busca por subcadena como antes
+- PostgreSQL: índices GIN de trigramas (pg_trgm) sobre el nombre sin tildes
+- Otros motores (o si el índice no está disponible): icontains, como antes
+
+El backend se elige con settings.BUSQUEDA_PRODUCTOS ('auto', 'fts5', 'trigram', 'simple').
+"""
+
+from django.conf import settings
+from django.db import connection, DatabaseError
+from django.db.models import Q
+import re
+import threading
+import logging
+
+from ..models import Producto
+from .tabla_nombres import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+class BusquedaSimple:
+    """Búsqueda por subcadena sin índice (comportamiento original)"""
+
+    nombre = 'simple'
+
+    def preparar(self):
+        return True
+
+    def reconstruir(self):
+        return 0
+
+    def buscar(self, texto, limite=20):
+        """
+        Returns:
+            Lista de (producto_id, puntaje) de más a menos relevante
+        """
+        ids = Producto.objects.filter(
+            Q(nombre__icontains=texto) | Q(codigo_barras__icontains=texto),
+            activo=True
+        ).order_by('nombre').values_list('id', flat=True)[:limite]
+        return [(producto_id, 1.0) for producto_id in ids]
+
+    def pista_sql(self):
+        """Instrucciones para el SQL generado por el asistente"""
+        return (
+            "Cuando busques un producto específico por nombre, usa LIKE con comodines para ser flexible:\n"
+            "    - WHERE LOWER(nombre) LIKE LOWER('%término%') (case-insensitive)"
+        )
+
+
+class BusquedaFTS5(BusquedaSimple):
+    """
+    Índice FTS5 de SQLite. La tabla guarda una copia del nombre y el código de
+    los productos activos; los triggers la mantienen al día con cualquier
+    escritura (save, update, bulk_create o SQL directo).
+    """
+
+    nombre = 'fts5'
+    TABLA = 'companies_producto_fts'
+
+    SQL_PREPARAR = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5(
+            nombre, codigo_barras,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {TABLA}_ai AFTER INSERT ON companies_producto
+        WHEN new.activo BEGIN
+            INSERT INTO {TABLA}(rowid, nombre, codigo_barras) VALUES (new.id, new.nombre, new.codigo_barras);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {TABLA}_ad AFTER DELETE ON companies_producto BEGIN
+            DELETE FROM {TABLA} WHERE rowid = old.id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {TABLA}_au AFTER UPDATE OF nombre, codigo_barras, activo ON companies_producto BEGIN
+            DELETE FROM {TABLA} WHERE rowid = old.id;
+            INSERT INTO {TABLA}(rowid, nombre, codigo_barras)
+                SELECT new.id, new.nombre, new.codigo_barras WHERE new.activo;
+        END""",
+    ]
+
+    def preparar(self):
+        with connection.cursor() as cursor:
+            existia = self.TABLA in connection.introspection.table_names(cursor)
+            for sql in self.SQL_PREPARAR:
+                cursor.execute(sql)
+        if not existia:
+            self.reconstruir()
+        return True
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.TABLA}")
+            cursor.execute(
+                f"INSERT INTO {self.TABLA}(rowid, nombre, codigo_barras) "
+                f"SELECT id, nombre, codigo_barras FROM companies_producto WHERE activo"
+            )
+            return cursor.rowcount
+
+    def buscar(self, texto, limite=20):
+        # FTS5 solo encuentra palabras por prefijo: los últimos dígitos de un
+        # código o un trozo a mitad de palabra ('piral') los sigue hallando icontains
+        if texto.isdigit():
+            return super().buscar(texto, limite)
+
+        expresion = self._expresion(texto)
+        if not expresion:
+            return []
+
+        # bm25: menor es mejor; el nombre pesa más que el código
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({self.TABLA}, 10.0, 2.0) AS puntaje FROM {self.TABLA} "
+                f"WHERE {self.TABLA} MATCH %s ORDER BY puntaje LIMIT %s",
+                [expresion, limite]
+            )
+            resultados = [(producto_id, -puntaje) for producto_id, puntaje in cursor.fetchall()]
+
+        return resultados or super().buscar(texto, limite)
+
+    @staticmethod
+    def _expresion(texto):
+        """'cuadérno espi' -> '"cuaderno"* "espi"*' (todas las palabras, por prefijo)"""
+        palabras = TOKEN.findall(normalizar_texto(texto))
+        return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+    def pista_sql(self):
+        return (
+            f"Para buscar productos por nombre usa el índice de texto completo {self.TABLA}\n"
+            f"    (rowid = id del producto; ignora tildes y mayúsculas; término* busca por prefijo):\n"
+            f"    SELECT p.* FROM companies_producto p\n"
+            f"    JOIN {self.TABLA} f ON f.rowid = p.id\n"
+            f"    WHERE {self.TABLA} MATCH 'cuaderno* espiral*'\n"
+            f"    ORDER BY bm25({self.TABLA})"
+        )
+
+
+class BusquedaTrigramas(BusquedaSimple):
+    """
+    Índices GIN de trigramas de PostgreSQL. Sirven tanto para LIKE '%texto%'
+    como para similitud (operador %), así que la subcadena deja de recorrer
+    toda la tabla y además se toleran errores de escritura.
+    """
+
+    nombre = 'trigram'
+
+    SQL_PREPARAR = [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        # unaccent() no es IMMUTABLE: envoltura para poder indexarla
+        """CREATE OR REPLACE FUNCTION predicta_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, lower($1)) $$""",
+        """CREATE INDEX IF NOT EXISTS companies_producto_nombre_trgm
+        ON companies_producto USING gin (predicta_unaccent(nombre) gin_trgm_ops)""",
+        """CREATE INDEX IF NOT EXISTS companies_producto_codigo_trgm
+        ON companies_producto USING gin (codigo_barras gin_trgm_ops)""",
+    ]
+
+    def preparar(self):
+        with connection.cursor() as cursor:
+            for sql in self.SQL_PREPARAR:
+                cursor.execute(sql)
+        return True
+
+    def buscar(self, texto, limite=20):
+        termino = normalizar_texto(texto)
+        if not termino:
+            return []
+
+        patron = '%' + termino.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT id,
+                       GREATEST(word_similarity(%s, predicta_unaccent(nombre)),
+                                CASE WHEN predicta_unaccent(nombre) LIKE %s THEN 1 ELSE 0 END) AS puntaje
+                FROM companies_producto
+                WHERE activo
+                  AND (predicta_unaccent(nombre) LIKE %s
+                       OR %s <%% predicta_unaccent(nombre)
+                       OR codigo_barras ILIKE %s)
+                ORDER BY puntaje DESC, nombre
+                LIMIT %s
+                """,
+                [termino, patron, patron, termino, patron, limite]
+            )
+            return [(producto_id, float(puntaje)) for producto_id, puntaje in cursor.fetchall()]
+
+    def pista_sql(self):
+        return (
+            "Para buscar productos por nombre usa el índice de trigramas (ignora tildes y mayúsculas):\n"
+            "    WHERE predicta_unaccent(nombre) LIKE predicta_unaccent('%término%')"
+        )
+
+
+BACKENDS = {
+    'simple': BusquedaSimple,
+    'fts5': BusquedaFTS5,
+    'trigram': BusquedaTrigramas,
+}
+
+_busqueda = None
+_busqueda_lock = threading.Lock()
+
+
+def _elegir_backend():
+    configurado = getattr(settings, 'BUSQUEDA_PRODUCTOS', 'auto')
+    if configurado != 'auto':
+        return BACKENDS[configurado]()
+
+    if connection.vendor == 'sqlite':
+        return BusquedaFTS5()
+    if connection.vendor == 'postgresql':
+        return BusquedaTrigramas()
+    return BusquedaSimple()
+
+
+def preparar_busqueda():
+    """
+    Crea (si faltan) el índice y los objetos de base de datos del backend.
+    Si el motor no los soporta, la búsqueda queda en modo simple.
+    """
+    global _busqueda
+    backend = _elegir_backend()
+    try:
+        backend.preparar()
+    except DatabaseError as e:
+        logger.warning(f"⚠️ Índice de búsqueda '{backend.nombre}' no disponible, se usa búsqueda simple: {e}")
+        backend = BusquedaSimple()
+
+    with _busqueda_lock:
+        _busqueda = backend
+    return backend
+
+
+def get_busqueda():
+    """Backend de búsqueda del proceso (se prepara la primera vez que se usa)"""
+    if _busqueda is None:
+        with _busqueda_lock:
+            pendiente = _busqueda is None
+        if pendiente:
+            return preparar_busqueda()
+    return _busqueda
+
+
+def pista_sql():
+    """
+    Instrucciones de búsqueda para el prompt del asistente. No crea índices: usa
+    el backend ya preparado o, si aún no se preparó, el que se elegiría
+    (el DDL queda para el post_migrate y reindexar_catalogo)
+    """
+    return (_busqueda or _elegir_backend()).pista_sql()
+
+
+def buscar_productos(texto, limite=20):
+    """
+    Productos activos que coinciden con el texto, del más al menos relevante
+
+    Returns:
+        Lista de (producto_id, puntaje)
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return []
+
+    busqueda = get_busqueda()
+    try:
+        return busqueda.buscar(texto, limite)
+    except DatabaseError as e:
+        logger.error(f"Error en búsqueda '{busqueda.nombre}', se usa búsqueda simple: {e}")
+        return BusquedaSimple().buscar(texto, limite)
@@ -0,0 +1,373 @@
+"""
+Compra Service
+Recepción de compras a proveedores (reabastecimiento de stock)
+"""
+
+from django.db import transaction
+from django.db.models import Case, When, Value, F, IntegerField, DecimalField
+from django.utils import timezone
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Any
+import csv
+import io
+import os
+import re
+import logging
+
+from ..models import Compra, ItemCompra, Producto, Proveedor
+from .notification_dispatcher import notificar_cambio
+
+logger = logging.getLogger(__name__)
+
+
+class CompraService:
+    """
+    Servicio para registrar compras a proveedores.
+
+    Una compra de cientos de líneas se registra en una sola transacción con
+    un número fijo de consultas: lectura de productos, inserción de la compra,
+    inserción masiva de items y un único UPDATE agrupado de stock y costos.
+    """
+
+    # Productos por sentencia UPDATE (límite de parámetros de la base de datos)
+    LOTE_ACTUALIZACION = 500
+
+    # Encabezados aceptados en el CSV de la factura del proveedor
+    COLUMNAS_CSV = {
+        'producto_id': ('producto_id', 'id', 'id_producto'),
+        'codigo_barras': ('codigo_barras', 'codigo', 'ean', 'barcode', 'sku'),
+        'cantidad': ('cantidad', 'unidades', 'qty'),
+        'precio_unitario': ('precio_unitario', 'precio_compra', 'costo', 'precio'),
+    }
+
+    @staticmethod
+    def registrar_compra(
+        proveedor_id: int,
+        items_data: List[Dict],
+        notas: str = None,
+        fecha=None,
+        actualizar_precio: bool = True
+    ) -> Compra:
+        """
+        Registra una compra y suma el stock recibido
+
+        Args:
+            proveedor_id: ID del proveedor
+            items_data: Lista de dicts con {producto_id | codigo_barras, cantidad, precio_unitario}
+            notas: Notas de la compra (p. ej. número de factura)
+            fecha: Fecha de la compra (por defecto ahora)
+            actualizar_precio: Si True, actualiza precio_compra de los productos cuyo costo cambió
+
+        Returns:
+            Compra creada
+
+        Raises:
+            ValueError: Si el proveedor, algún producto o alguna línea no es válida
+        """
+        if not items_data:
+            raise ValueError("La compra no tiene productos")
+
+        if not Proveedor.objects.filter(id=proveedor_id).exists():
+            raise ValueError(f"Proveedor {proveedor_id} no encontrado")
+
+        lineas, costos_actuales = CompraService._resolver_lineas(items_data)
+
+        # Agrupar por producto: cantidad total y último costo recibido
+        cantidades = {}
+        costos = {}
+        for producto_id, cantidad, precio in lineas:
+            cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+            costos[producto_id] = precio
+
+        total = sum((precio * cantidad for _, cantidad, precio in lineas), Decimal('0'))
+
+        with transaction.atomic():
+            # Primera escritura: toma el bloqueo de escritura desde el inicio
+            compra = Compra.objects.create(
+                proveedor_id=proveedor_id,
+                fecha=fecha or timezone.now(),
+                total=total,
+                notas=notas
+            )
+
+            ItemCompra.objects.bulk_create(
+                [
+                    ItemCompra(
+                        compra=compra,
+                        producto_id=producto_id,
+                        cantidad=cantidad,
+                        precio_unitario=precio,
+                        subtotal=precio * cantidad
+                    )
+                    for producto_id, cantidad, precio in lineas
+                ],
+                batch_size=CompraService.LOTE_ACTUALIZACION
+            )
+
+            nuevos_costos = {
+                pid: precio for pid, precio in costos.items()
+                if actualizar_precio and costos_actuales[pid] != precio
+            }
+
+            CompraService._aplicar_stock(cantidades, nuevos_costos)
+
+            # Notificar en tiempo real (agrupado, después del commit)
+            transaction.on_commit(lambda: notificar_cambio(company_id='demo_company'))
+
+        logger.info(
+            f"📦 Compra {compra.id} registrada: {len(lineas)} líneas, "
+            f"{len(cantidades)} productos, {len(nuevos_costos)} costos actualizados (${total})"
+        )
+
+        return compra
+
+    @staticmethod
+    def importar_csv(
+        archivo,
+        proveedor_id: int,
+        notas: str = None,
+        actualizar_precio: bool = True
+    ) -> Compra:
+        """
+        Registra una compra a partir del CSV de la factura del proveedor
+
+        El CSV debe tener encabezado con una columna de producto (producto_id o
+        codigo_barras), cantidad y precio_unitario. Acepta ',' o ';' como
+        separador y coma decimal.
+
+        Args:
+            archivo: Ruta, archivo abierto (texto o binario) o contenido en texto
+            proveedor_id: ID del proveedor
+            notas: Notas de la compra
+            actualizar_precio: Si True, actualiza precio_compra de los productos
+
+        Returns:
+            Compra creada
+        """
+        items_data = CompraService.leer_csv(archivo)
+        return CompraService.registrar_compra(
+            proveedor_id=proveedor_id,
+            items_data=items_data,
+            notas=notas,
+            actualizar_precio=actualizar_precio
+        )
+
+    @staticmethod
+    def leer_csv(archivo) -> List[Dict[str, Any]]:
+        """
+        Convierte el CSV de una factura en líneas para registrar_compra
+
+        Raises:
+            ValueError: Con el detalle de las filas inválidas
+        """
+        contenido = CompraService._leer_contenido(archivo)
+        if not contenido.strip():
+            raise ValueError("El archivo CSV está vacío")
+
+        try:
+            dialecto = csv.Sniffer().sniff(contenido[:4096], delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+
+        lector = csv.DictReader(io.StringIO(contenido), dialect=dialecto)
+        columnas = CompraService._mapear_columnas(lector.fieldnames or [])
+
+        items = []
+        errores = []
+        for numero, fila in enumerate(lector, start=2):
+            if not any((valor or '').strip() for valor in fila.values()):
+                continue
+
+            item = {}
+            producto_id = (fila.get(columnas.get('producto_id')) or '').strip()
+            codigo = (fila.get(columnas.get('codigo_barras')) or '').strip()
+
+            if producto_id:
+                item['producto_id'] = producto_id
+            elif codigo:
+                item['codigo_barras'] = codigo
+            else:
+                errores.append(f"fila {numero}: sin producto")
+                continue
+
+            item['cantidad'] = CompraService._normalizar_cantidad(
+                fila.get(columnas['cantidad']), dialecto.delimiter
+            )
+            item['precio_unitario'] = CompraService._normalizar_precio(
+                fila.get(columnas['precio_unitario']), dialecto.delimiter
+            )
+            item['fila'] = numero
+            items.append(item)
+
+        if errores:
+            raise ValueError("CSV inválido: " + "; ".join(errores[:10]))
+
+        return items
+
+    # ------------------------------------------------------------------
+    # Auxiliares
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _normalizar_precio(texto, delimitador):
+        """
+        Precio del CSV en formato Decimal ('1.234,50' o '1,234.50' -> '1234.50')
+
+        Los CSV separados por ';' suelen usar coma decimal y punto de miles; los
+        separados por ',' o tabulador, punto decimal y coma de miles. Si aparecen
+        los dos separadores, el último es el decimal; si aparece solo el de miles
+        y no agrupa de a tres dígitos ('12.50' en un CSV con ';'), es el decimal.
+        """
+        texto = (texto or '').strip().replace(' ', '')
+        decimal, miles = (',', '.') if delimitador == ';' else ('.', ',')
+
+        if ',' in texto and '.' in texto:
+            decimal = ',' if texto.rfind(',') > texto.rfind('.') else '.'
+            miles = '.' if decimal == ',' else ','
+        elif miles in texto and not re.fullmatch(rf'[-+]?\d{{1,3}}(\{miles}\d{{3}})+', texto):
+            decimal, miles = miles, decimal
+
+        return texto.replace(miles, '').replace(decimal, '.')
+
+    @staticmethod
+    def _normalizar_cantidad(texto, delimitador):
+        """
+        Cantidad del CSV como entero en texto ('1.200' o '1,200' -> '1200', '5,00' -> '5')
+
+        Las cantidades son unidades: un separador seguido de grupos de tres
+        dígitos siempre es de miles, sea cual sea el separador del CSV. Una
+        cantidad con decimales distintos de cero se deja igual (fila inválida).
+        """
+        texto = (texto or '').strip().replace(' ', '')
+        if re.fullmatch(r'\d{1,3}([.,])\d{3}(\1\d{3})*', texto):
+            return re.sub(r'[.,]', '', texto)
+
+        numero = CompraService._normalizar_precio(texto, delimitador)
+        try:
+            valor = Decimal(numero)
+        except InvalidOperation:
+            return texto
+        if valor.is_finite() and valor == valor.to_integral_value():
+            return str(int(valor))
+        return numero
+
+    @staticmethod
+    def _resolver_lineas(items_data):
+        """
+        Valida las líneas y resuelve códigos de barras a IDs en una sola consulta
+
+        Returns:
+            (lineas, costos_actuales): lista de tuplas (producto_id, cantidad, precio_unitario)
+            y dict {producto_id: precio_compra actual}
+        """
+        codigos = {str(item['codigo_barras']).strip() for item in items_data if not item.get('producto_id') and item.get('codigo_barras')}
+        ids_por_codigo = dict(
+            Producto.objects.filter(codigo_barras__in=codigos).values_list('codigo_barras', 'id')
+        ) if codigos else {}
+
+        lineas = []
+        errores = []
+        for indice, item in enumerate(items_data, start=1):
+            etiqueta = f"fila {item['fila']}" if item.get('fila') else f"línea {indice}"
+
+            try:
+                if item.get('producto_id'):
+                    producto_id = int(item['producto_id'])
+                else:
+                    codigo = str(item.get('codigo_barras') or '').strip()
+                    producto_id = ids_por_codigo.get(codigo)
+                    if producto_id is None:
+                        errores.append(f"{etiqueta}: código {codigo or '(vacío)'} no encontrado")
+                        continue
+
+                cantidad = int(item['cantidad'])
+                precio = Decimal(str(item['precio_unitario'])).quantize(Decimal('0.01'))
+            except (KeyError, TypeError, ValueError, InvalidOperation):
+                errores.append(f"{etiqueta}: datos inválidos")
+                continue
+
+            if cantidad < 1:
+                errores.append(f"{etiqueta}: la cantidad debe ser mayor a 0")
+                continue
+            if precio < 0:
+                errores.append(f"{etiqueta}: el precio no puede ser negativo")
+                continue
+
+            lineas.append((producto_id, cantidad, precio))
+
+        ids = {producto_id for producto_id, _, _ in lineas}
+        costos_actuales = dict(Producto.objects.filter(id__in=ids).values_list('id', 'precio_compra'))
+        for faltante in sorted(ids - set(costos_actuales)):
+            errores.append(f"producto {faltante} no encontrado")
+
+        if errores:
+            raise ValueError("Compra inválida: " + "; ".join(errores[:10]))
+
+        return lineas, costos_actuales
+
+    @staticmethod
+    def _aplicar_stock(cantidades, nuevos_costos):
+        """
+        Suma el stock y actualiza costos con un UPDATE ... CASE por lote de productos
+        """
+        ahora = timezone.now()
+        ids = sorted(cantidades)
+
+        for inicio in range(0, len(ids), CompraService.LOTE_ACTUALIZACION):
+            lote = ids[inicio:inicio + CompraService.LOTE_ACTUALIZACION]
+
+            cambios = {
+                'stock_actual': F('stock_actual') + Case(
+                    *[When(id=pid, then=Value(cantidades[pid])) for pid in lote],
+                    default=Value(0),
+                    output_field=IntegerField()
+                ),
+                'fecha_actualizacion': ahora,
+            }
+
+            costos_lote = [pid for pid in lote if pid in nuevos_costos]
+            if costos_lote:
+                cambios['precio_compra'] = Case(
+                    *[When(id=pid, then=Value(nuevos_costos[pid])) for pid in costos_lote],
+                    default=F('precio_compra'),
+                    output_field=DecimalField(max_digits=10, decimal_places=2)
+                )
+
+            Producto.objects.filter(id__in=lote).update(**cambios)
+
+    @staticmethod
+    def _leer_contenido(archivo) -> str:
+        if hasattr(archivo, 'read'):
+            contenido = archivo.read()
+        elif isinstance(archivo, (str, os.PathLike)) and os.path.isfile(archivo):
+            with open(archivo, 'rb') as f:
+                contenido = f.read()
+        else:
+            contenido = archivo
+
+        if isinstance(contenido, bytes):
+            try:
+                contenido = contenido.decode('utf-8-sig')
+            except UnicodeDecodeError:
+                contenido = contenido.decode('latin-1')
+
+        return contenido
+
+    @staticmethod
+    def _mapear_columnas(encabezados):
+        """Asocia cada campo esperado con el encabezado real del CSV"""
+        normalizados = {(h or '').strip().lower().replace(' ', '_'): h for h in encabezados}
+        columnas = {}
+        for campo, alias in CompraService.COLUMNAS_CSV.items():
+            for nombre in alias:
+                if nombre in normalizados:
+                    columnas[campo] = normalizados[nombre]
+                    break
+
+        faltantes = [c for c in ('cantidad', 'precio_unitario') if c not in columnas]
+        if 'producto_id' not in columnas and 'codigo_barras' not in columnas:
+            faltantes.insert(0, 'producto_id o codigo_barras')
+        if faltantes:
+            raise ValueError(f"Faltan columnas en el CSV: {', '.join(faltantes)}")
+
+        return columnas
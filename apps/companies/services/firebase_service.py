@@ -3,43 +3,77 @@ Firebase Service
 Notifica cambios a Firebase Realtime Database
 """
 
+from django.conf import settings
 import requests
+from requests.adapters import HTTPAdapter
+import threading
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Sesión HTTP compartida con pool de conexiones keep-alive.
+    Evita abrir una conexión TCP/TLS nueva en cada ping.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
 class FirebaseService:
     """
     Servicio para notificar cambios en tiempo real via Firebase
     No requiere firebase-admin, usa REST API directamente
     """
     
-    # ⭐ CAMBIA ESTA URL POR LA TUYA
+    # ⭐ URL por defecto; se sobrescribe con settings.FIREBASE_DATABASE_URL
     DATABASE_URL = "https://predictai-8f5bb-default-rtdb.firebaseio.com/"
     
     @classmethod
-    def ping_update(cls, company_id='demo_company'):
+    def get_database_url(cls, database_url=None):
+        """URL base de Firebase sin la barra final"""
+        url = database_url or getattr(settings, 'FIREBASE_DATABASE_URL', None) or cls.DATABASE_URL
+        return url.rstrip('/')
+    
+    @classmethod
+    def ping_update(cls, company_id='demo_company', timestamp=None, database_url=None, timeout=5):
         """
         Notifica a Firebase que hubo un cambio enviando timestamp actual
         
         Args:
             company_id: ID de la empresa (por ahora hardcodeado como 'demo_company')
+            timestamp: Versión a publicar en ms (por defecto, el instante actual)
+            database_url: URL alternativa (p. ej. un servidor stub local)
+            timeout: Timeout de la petición en segundos
         """
         try:
             # Timestamp en milisegundos (JavaScript usa milisegundos)
-            timestamp = int(time.time() * 1000)
+            if timestamp is None:
+                timestamp = int(time.time() * 1000)
             
             # URL del endpoint de Firebase
             # IMPORTANTE: .json es requerido por Firebase REST API
-            url = f"{cls.DATABASE_URL}/companies/{company_id}/ping.json"
+            url = f"{cls.get_database_url(database_url)}/companies/{company_id}/ping.json"
             
             # PUT actualiza/crea el valor en Firebase
-            response = requests.put(
+            response = get_session().put(
                 url, 
                 json=timestamp,
-                timeout=5  # Timeout de 5 segundos
+                timeout=timeout
             )
             
             if response.status_code == 200:
@@ -50,7 +84,7 @@ class FirebaseService:
                 return False
                 
         except requests.exceptions.Timeout:
-            logger.error("⏱️ Timeout al notificar Firebase (5s)")
+            logger.error(f"⏱️ Timeout al notificar Firebase ({timeout}s)")
             return False
         except requests.exceptions.ConnectionError:
             logger.error("🌐 Error de conexión con Firebase")
@@ -63,14 +97,14 @@ class FirebaseService:
             return False
     
     @classmethod
-    def test_connection(cls):
+    def test_connection(cls, database_url=None):
         """
         Prueba la conexión a Firebase
         Útil para debugging - devuelve True si la conexión es exitosa
         """
         try:
-            url = f"{cls.DATABASE_URL}/.json"
-            response = requests.get(url, timeout=5)
+            url = f"{cls.get_database_url(database_url)}/.json"
+            response = get_session().get(url, timeout=5)
             
             if response.status_code == 200:
                 logger.info("✅ Conexión a Firebase exitosa")
@@ -88,8 +122,8 @@ class FirebaseService:
         Obtiene el último ping de una empresa (útil para debugging)
         """
         try:
-            url = f"{cls.DATABASE_URL}/companies/{company_id}/ping.json"
-            response = requests.get(url, timeout=5)
+            url = f"{cls.get_database_url()}/companies/{company_id}/ping.json"
+            response = get_session().get(url, timeout=5)
             
             if response.status_code == 200:
                 timestamp = response.json()
@@ -0,0 +1,140 @@
+"""
+Firebase Stub Server
+Servidor HTTP local que imita el endpoint REST de ping de Firebase.
+
+Permite probar y medir el flujo de ventas sin salir a internet:
+
+    with FirebaseStubServer(latency_ms=80) as stub:
+        FirebaseService.ping_update('demo_company', database_url=stub.url)
+        stub.pings  # [('demo_company', 1700000000000)]
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+PING_PATH = re.compile(r'^/companies/(?P<company_id>[^/]+)/ping\.json$')
+
+
+class _FirebaseStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, igual que Firebase
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _responder(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _esperar(self):
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000)
+
+    def do_PUT(self):
+        longitud = int(self.headers.get('Content-Length') or 0)
+        datos = self.rfile.read(longitud)
+        self._esperar()
+
+        match = PING_PATH.match(self.path)
+        if not match:
+            self._responder(404, {'error': 'Not found'})
+            return
+
+        try:
+            valor = json.loads(datos or b'null')
+        except json.JSONDecodeError:
+            self._responder(400, {'error': 'Invalid data; couldn\'t parse JSON object.'})
+            return
+
+        self.server.registrar_ping(match.group('company_id'), valor)
+        self._responder(200, valor)
+
+    def do_GET(self):
+        self._esperar()
+
+        if self.path == '/.json':
+            self._responder(200, self.server.snapshot())
+            return
+
+        match = PING_PATH.match(self.path)
+        if not match:
+            self._responder(404, {'error': 'Not found'})
+            return
+
+        self._responder(200, self.server.valores.get(match.group('company_id')))
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms):
+        super().__init__(address, _FirebaseStubHandler)
+        self.latency_ms = latency_ms
+        self.valores = {}
+        self.pings = []
+        self._lock = threading.Lock()
+
+    def registrar_ping(self, company_id, valor):
+        with self._lock:
+            self.valores[company_id] = valor
+            self.pings.append((company_id, valor))
+
+    def snapshot(self):
+        with self._lock:
+            return {'companies': {c: {'ping': v} for c, v in self.valores.items()}}
+
+
+class FirebaseStubServer:
+    """
+    Servidor stub de Firebase en un hilo de fondo.
+
+    Args:
+        host: Interfaz donde escuchar
+        port: Puerto (0 = puerto libre aleatorio)
+        latency_ms: Latencia artificial por petición
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def pings(self):
+        return list(self._server.pings) if self._server else []
+
+    def start(self):
+        self._server = _StubHTTPServer((self.host, self.port), self.latency_ms)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"🧪 Firebase stub escuchando en {self.url} (latencia {self.latency_ms} ms)")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join(timeout=5)
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,150 @@
+"""
+Notification Dispatcher
+Agrupa (debounce) las notificaciones en tiempo real por empresa
+"""
+
+from django.conf import settings
+import atexit
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDispatcher:
+    """
+    Coalesce las notificaciones de cambios por empresa dentro de una ventana
+    de tiempo y envía una sola actualización con la versión más reciente.
+
+    Con varias cajas vendiendo en el mismo segundo, Firebase (y cada dashboard
+    abierto) recibe como máximo un ping por ventana en lugar de uno por venta.
+    """
+
+    def __init__(self, send, window_ms=250):
+        """
+        Args:
+            send: Callable(company_id, version) -> bool que realiza el envío real
+            window_ms: Ventana de agrupación en milisegundos (0 = envío inmediato)
+        """
+        self._send = send
+        self.window = max(window_ms, 0) / 1000
+        self._lock = threading.Lock()
+        self._pendientes = {}       # company_id -> versión pendiente de enviar
+        self._timers = {}           # company_id -> threading.Timer
+        self._ultima_version = {}   # company_id -> última versión asignada
+        self._stats = {
+            'recibidas': 0,
+            'coalescidas': 0,
+            'enviadas': 0,
+            'fallidas': 0,
+        }
+
+    def notify(self, company_id='demo_company'):
+        """
+        Registra un cambio para la empresa. El envío se hace al cerrar la ventana.
+
+        Returns:
+            Versión (timestamp en ms) asignada a este cambio
+        """
+        enviar_ya = False
+
+        with self._lock:
+            self._stats['recibidas'] += 1
+
+            # Versión estrictamente creciente para que el listener siempre dispare
+            version = max(int(time.time() * 1000), self._ultima_version.get(company_id, 0) + 1)
+            self._ultima_version[company_id] = version
+
+            if company_id in self._pendientes:
+                self._stats['coalescidas'] += 1
+                self._pendientes[company_id] = version
+                return version
+
+            self._pendientes[company_id] = version
+
+            if self.window == 0:
+                enviar_ya = True
+            else:
+                timer = threading.Timer(self.window, self._flush_company, args=(company_id,))
+                timer.daemon = True
+                self._timers[company_id] = timer
+                timer.start()
+
+        if enviar_ya:
+            self._flush_company(company_id)
+
+        return version
+
+    def _flush_company(self, company_id):
+        """Envía la versión pendiente de una empresa (si la hay)"""
+        with self._lock:
+            version = self._pendientes.pop(company_id, None)
+            self._timers.pop(company_id, None)
+
+        if version is None:
+            return
+
+        try:
+            exito = bool(self._send(company_id, version))
+        except Exception as e:
+            logger.error(f"Error al enviar notificación de {company_id}: {e}")
+            exito = False
+
+        with self._lock:
+            self._stats['enviadas' if exito else 'fallidas'] += 1
+
+    def flush(self):
+        """Envía inmediatamente todas las notificaciones pendientes"""
+        with self._lock:
+            timers = list(self._timers.values())
+            companies = list(self._pendientes.keys())
+
+        for timer in timers:
+            timer.cancel()
+
+        for company_id in companies:
+            self._flush_company(company_id)
+
+    def stats(self):
+        """Contadores de notificaciones recibidas, coalescidas, enviadas y fallidas"""
+        with self._lock:
+            data = dict(self._stats)
+            data['pendientes'] = len(self._pendientes)
+        data['ventana_ms'] = int(self.window * 1000)
+        return data
+
+    def reset_stats(self):
+        """Reinicia los contadores (útil para benchmarks)"""
+        with self._lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def _enviar(company_id, version):
+    from .notifiers import get_notifier
+    return get_notifier().notify(company_id, version)
+
+
+def get_dispatcher():
+    """Dispatcher compartido del proceso, configurado desde settings"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                window_ms = getattr(settings, 'REALTIME_COALESCE_WINDOW_MS', 250)
+                _dispatcher = NotificationDispatcher(_enviar, window_ms=window_ms)
+                atexit.register(_dispatcher.flush)
+    return _dispatcher
+
+
+def notificar_cambio(company_id='demo_company'):
+    """
+    Encola una notificación de cambio para la empresa.
+    Se envía agrupada con las demás que lleguen dentro de la ventana.
+    """
+    return get_dispatcher().notify(company_id)
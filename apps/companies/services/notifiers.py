@@ -0,0 +1,164 @@
+"""
+Notifiers
+Backends intercambiables para notificar cambios en tiempo real.
+
+El backend se elige en settings.REALTIME_NOTIFIER, con el mismo formato
+que CACHES o STORAGES de Django:
+
+    REALTIME_NOTIFIER = {
+        'BACKEND': 'apps.companies.services.notifiers.FirebaseRestNotifier',
+        'OPTIONS': {'database_url': '...', 'timeout': 5},
+    }
+"""
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BaseNotifier:
+    """Interfaz común de todos los notificadores"""
+
+    def notify(self, company_id, version):
+        """
+        Publica que la empresa tiene una nueva versión de datos.
+
+        Args:
+            company_id: ID de la empresa
+            version: Timestamp en ms de la última modificación
+
+        Returns:
+            True si la notificación fue entregada
+        """
+        raise NotImplementedError
+
+    def test_connection(self):
+        """Verifica que el backend está disponible"""
+        return True
+
+
+class FirebaseRestNotifier(BaseNotifier):
+    """Escribe el ping en Firebase Realtime Database vía REST"""
+
+    def __init__(self, database_url=None, timeout=5):
+        self.database_url = database_url
+        self.timeout = timeout
+
+    def notify(self, company_id, version):
+        from .firebase_service import FirebaseService
+        return FirebaseService.ping_update(
+            company_id=company_id,
+            timestamp=version,
+            database_url=self.database_url,
+            timeout=self.timeout
+        )
+
+    def test_connection(self):
+        from .firebase_service import FirebaseService
+        return FirebaseService.test_connection(database_url=self.database_url)
+
+
+class BroadcastNotifier(BaseNotifier):
+    """
+    Difunde los pings a los suscriptores del mismo proceso.
+    Lo consume el endpoint SSE del dashboard (sin dependencias externas).
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Registra un suscriptor y devuelve su cola de eventos"""
+        cola = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.add(cola)
+        return cola
+
+    def unsubscribe(self, cola):
+        with self._lock:
+            self._subscribers.discard(cola)
+
+    def notify(self, company_id, version):
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for cola in subscribers:
+            try:
+                cola.put_nowait((company_id, version))
+            except queue.Full:
+                # Cliente lento: basta con que reciba el ping más reciente
+                try:
+                    cola.get_nowait()
+                    cola.put_nowait((company_id, version))
+                except (queue.Empty, queue.Full):
+                    pass
+        return True
+
+
+class LoggingNotifier(BaseNotifier):
+    """Solo registra el ping en el log (desarrollo sin red)"""
+
+    def notify(self, company_id, version):
+        logger.info(f"📡 Ping {company_id}: {version}")
+        return True
+
+
+class InMemoryNotifier(BaseNotifier):
+    """
+    Guarda cada notificación en memoria. Doble de pruebas y benchmarks:
+    latency_ms simula la latencia de un backend remoto.
+    """
+
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+        self.notifications = []
+        self._lock = threading.Lock()
+
+    def notify(self, company_id, version):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        with self._lock:
+            self.notifications.append((company_id, version))
+        return True
+
+    def clear(self):
+        with self._lock:
+            self.notifications.clear()
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier():
+    """Instancia del notificador configurado en settings (una por proceso)"""
+    global _notifier
+    if _notifier is None:
+        with _notifier_lock:
+            if _notifier is None:
+                config = getattr(settings, 'REALTIME_NOTIFIER', {})
+                backend = config.get('BACKEND', 'apps.companies.services.notifiers.FirebaseRestNotifier')
+                _notifier = import_string(backend)(**config.get('OPTIONS', {}))
+    return _notifier
+
+
+def reset_notifier():
+    """Descarta la instancia actual; la próxima llamada relee settings"""
+    global _notifier
+    with _notifier_lock:
+        _notifier = None
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(sender, setting, **kwargs):
+    if setting == 'REALTIME_NOTIFIER':
+        reset_notifier()
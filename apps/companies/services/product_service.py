@@ -1,9 +1,10 @@
-from django.db.models import Q, F
+from django.db.models import Q, F, Case, When, Value, IntegerField
 from decimal import Decimal
 from typing import List, Optional
 import logging
 
 from ..models import Producto, Categoria, Proveedor
+from .busqueda_service import buscar_productos
 
 logger = logging.getLogger(__name__)
 
@@ -47,22 +48,29 @@ class ProductService:
             return None
     
     @staticmethod
-    def buscar_productos(query: str):
+    def buscar_productos(query: str, limite: int = 50):
         """
         Busca productos por nombre o código de barras
         
+        Usa el índice de texto del motor (FTS5 en SQLite, trigramas en PostgreSQL)
+        sin distinguir tildes; si no está disponible, busca por subcadena.
+        
         Args:
             query: Texto a buscar
+            limite: Máximo de resultados
             
         Returns:
-            QuerySet de productos que coinciden
+            QuerySet de productos que coinciden, del más al menos relevante
         """
         try:
-            return Producto.objects.filter(
-                Q(nombre__icontains=query) | 
-                Q(codigo_barras__icontains=query),
-                activo=True
-            ).select_related('categoria', 'proveedor')
+            ids = [producto_id for producto_id, _ in buscar_productos(query, limite)]
+            if not ids:
+                return Producto.objects.none()
+            
+            orden = Case(*[When(id=pid, then=Value(i)) for i, pid in enumerate(ids)], output_field=IntegerField())
+            return Producto.objects.filter(id__in=ids).select_related(
+                'categoria', 'proveedor'
+            ).order_by(orden)
         except Exception as e:
             logger.error(f"Error al buscar productos: {e}")
             return Producto.objects.none()
@@ -12,7 +12,7 @@ from typing import Dict, List, Optional, Any
 import logging
 
 from ..models import Venta, ItemVenta, Producto
-from .firebase_service import FirebaseService  # ← NUEVO IMPORT
+from .notification_dispatcher import notificar_cambio
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +26,7 @@ class SalesService:
     @transaction.atomic
     def crear_venta(items_data: List[Dict], cliente_nombre: str = None, notas: str = None) -> Optional[Venta]:
         """
-        Crea una nueva venta con sus items y notifica a Firebase
+        Crea una nueva venta con sus items y notifica el cambio en tiempo real
         
         Args:
             items_data: Lista de dicts con {producto_id, cantidad}
@@ -71,13 +71,10 @@ class SalesService:
             # Calcular total de la venta
             venta.calcular_total()
             
-            # 🔥 NOTIFICAR A FIREBASE EN TIEMPO REAL
-            firebase_success = FirebaseService.ping_update(company_id='demo_company')
+            # 🔥 NOTIFICAR EN TIEMPO REAL (agrupado, después del commit)
+            transaction.on_commit(lambda: notificar_cambio(company_id='demo_company'))
             
-            if firebase_success:
-                logger.info(f"✅ Venta {venta.id} creada (${venta.total}) y notificada a Firebase")
-            else:
-                logger.warning(f"⚠️ Venta {venta.id} creada pero Firebase no respondió")
+            logger.info(f"✅ Venta {venta.id} creada (${venta.total}), notificación encolada")
             
             return venta
             
@@ -0,0 +1,171 @@
+"""
+Tabla de Nombres
+Nombres de productos activos ya normalizados, en memoria, para buscar por nombre
+sin consultar la base de datos en cada búsqueda.
+"""
+
+from rapidfuzz import fuzz, process
+from collections import Counter
+import threading
+import unicodedata
+import logging
+
+from ..fonetica import claves_foneticas
+from ..models import Producto
+from .versioning import get_version
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sin tildes ni diéresis y con espacios simples ('Cuadérno  A4' -> 'cuaderno a4')"""
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', str(texto).lower())
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_tildes.split())
+
+
+class NombresCatalogo:
+    """
+    Foto inmutable de los productos activos (ordenados por nombre) con su forma
+    normalizada y su índice fonético.
+
+    Quien la usa toma una referencia una vez y calcula índices y lee ids y
+    nombres sobre esa misma foto, aunque entre medias se cargue otra.
+    """
+
+    __slots__ = ('ids', 'nombres', 'normalizados', 'foneticos')
+
+    def __init__(self, filas=()):
+        normalizados = tuple(normalizar_texto(nombre) for _, nombre in filas)
+
+        foneticos = {}     # clave fonética -> índices de los nombres que la contienen
+        for indice, normalizado in enumerate(normalizados):
+            for clave in claves_foneticas(normalizado):
+                foneticos.setdefault(clave, []).append(indice)
+
+        self.ids = tuple(producto_id for producto_id, _ in filas)
+        self.nombres = tuple(nombre for _, nombre in filas)
+        self.normalizados = normalizados
+        self.foneticos = {clave: tuple(indices) for clave, indices in foneticos.items()}
+
+    def clasificar(self, consulta):
+        """
+        Una pasada sobre la tabla que agrupa los índices por capa de coincidencia
+
+        Returns:
+            Dict {'exacto': [...], 'prefijo': [...], 'palabras': [...], 'contiene': [...]}
+        """
+        capas = {'exacto': [], 'prefijo': [], 'palabras': [], 'contiene': []}
+        if not consulta:
+            return capas
+
+        # Como antes: dos o más palabras, ignorando las de 2 letras o menos
+        terminos = consulta.split()
+        claves = [t for t in terminos if len(t) > 2] if len(terminos) >= 2 else []
+
+        for indice, nombre in enumerate(self.normalizados):
+            if nombre == consulta:
+                capas['exacto'].append(indice)
+            elif nombre.startswith(consulta):
+                capas['prefijo'].append(indice)
+            elif claves and all(clave in nombre for clave in claves):
+                capas['palabras'].append(indice)
+            elif consulta in nombre:
+                capas['contiene'].append(indice)
+
+        return capas
+
+    def foneticos_de(self, consulta):
+        """
+        Nombres que suenan como la consulta: los que comparten más claves
+        fonéticas con ella ('lapis' -> 'Lápiz Grafito HB')
+
+        Returns:
+            Lista de índices (vacía si ninguna palabra suena parecido)
+        """
+        conteo = Counter()
+        for clave in claves_foneticas(consulta):
+            conteo.update(self.foneticos.get(clave, ()))
+
+        if not conteo:
+            return []
+
+        maximo = max(conteo.values())
+        return sorted(indice for indice, veces in conteo.items() if veces == maximo)
+
+    def difusos(self, consulta, limite=5, minimo=0, indices=None):
+        """
+        Mejores coincidencias aproximadas (token_sort_ratio) calculadas en RapidFuzz
+
+        Args:
+            indices: Limitar la comparación a estos nombres (candidatos fonéticos)
+
+        Returns:
+            Lista de (indice, similitud) de mayor a menor
+        """
+        if indices is not None:
+            resultados = process.extract(
+                consulta,
+                {indice: self.normalizados[indice] for indice in indices},
+                scorer=fuzz.WRatio,
+                processor=None,
+                limit=limite,
+                score_cutoff=minimo
+            )
+            return [(indice, similitud) for _, similitud, indice in resultados]
+
+        resultados = process.extract(
+            consulta,
+            self.normalizados,
+            scorer=fuzz.token_sort_ratio,
+            processor=None,
+            limit=limite,
+            score_cutoff=minimo
+        )
+        return [(indice, similitud) for _, similitud, indice in resultados]
+
+
+class TablaNombres:
+    """
+    Publica la foto del catálogo (NombresCatalogo) vigente.
+
+    Se construye con una consulta y se reconstruye cuando cambia la versión
+    del catálogo (altas, bajas o cambios de nombre vía save()); la foto nueva
+    reemplaza a la anterior en una sola asignación.
+    """
+
+    def __init__(self):
+        self._nombres = NombresCatalogo()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def sincronizar(self):
+        """Foto vigente, recargada antes si el catálogo cambió desde la última carga"""
+        version = get_version('catalogo')
+        if version == self._version:
+            return self._nombres
+
+        with self._lock:
+            if version != self._version:
+                filas = list(Producto.objects.filter(activo=True).order_by('nombre').values_list('id', 'nombre'))
+                self._nombres = NombresCatalogo(filas)
+                self._version = version
+                logger.debug(f"Tabla de nombres recargada: {len(filas)} productos")
+
+            return self._nombres
+
+
+_tabla = None
+_tabla_lock = threading.Lock()
+
+
+def get_tabla_nombres():
+    """Foto de nombres del catálogo vigente (NombresCatalogo), compartida por el proceso"""
+    global _tabla
+    if _tabla is None:
+        with _tabla_lock:
+            if _tabla is None:
+                _tabla = TablaNombres()
+    return _tabla.sincronizar()
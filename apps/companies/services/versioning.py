@@ -0,0 +1,97 @@
+"""
+Versioning
+Contadores de versión por espacio de nombres para invalidar cachés en memoria.
+
+Cada caché guarda la versión con la que se construyó y la compara en cada uso:
+si alguien llamó a bump_version(), la caché se descarta y se reconstruye.
+
+    if indice.version != get_version('catalogo'):
+        indice.recargar()
+
+Los contadores viven en la tabla ContadorVersion: bump_version() es un
+UPDATE valor = valor + 1, atómico aunque incrementen varios workers a la vez.
+get_version() lee una copia del proceso que se refresca como mucho cada
+VERSIONES_REFRESCO_S segundos con una sola consulta para todos los espacios
+de nombres, así que el camino habitual es una lectura de diccionario. Los
+incrementos del propio proceso se ven al instante; los de otros workers, en
+el siguiente refresco.
+
+Las señales usan bump_al_confirmar(): un solo incremento por transacción,
+por muchas filas que guarde.
+"""
+
+from functools import partial
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+import threading
+import time
+import logging
+
+from ..models import ContadorVersion
+
+logger = logging.getLogger(__name__)
+
+_versiones = {}  # nombre -> valor; se reemplaza entero, nunca se modifica
+_leidas_en = None
+_lock = threading.Lock()
+_incrementos = {}  # nombre -> callback de bump_version (misma identidad para deduplicar)
+
+
+def get_version(namespace='catalogo'):
+    """Versión actual del espacio de nombres (0 si nunca se incrementó)"""
+    if _leidas_en is None or time.monotonic() - _leidas_en >= getattr(settings, 'VERSIONES_REFRESCO_S', 1.0):
+        _refrescar()
+    return _versiones.get(namespace, 0)
+
+
+def bump_version(namespace='catalogo'):
+    """
+    Incrementa la versión del espacio de nombres.
+
+    Returns:
+        Nueva versión
+    """
+    contadores = ContadorVersion.objects.filter(nombre=namespace)
+    with transaction.atomic():
+        if not contadores.update(valor=F('valor') + 1):
+            # Primera vez: la fila aún no existe
+            ContadorVersion.objects.get_or_create(nombre=namespace)
+            contadores.update(valor=F('valor') + 1)
+        nueva = contadores.values_list('valor', flat=True).get()
+    # Dentro de otra transacción la copia del proceso se actualiza al confirmar
+    transaction.on_commit(partial(_publicar, namespace, nueva))
+    return nueva
+
+
+def bump_al_confirmar(namespace='catalogo', using=None):
+    """
+    Incrementa la versión cuando se confirme la transacción actual (de
+    inmediato en autocommit). Las llamadas repetidas dentro de la misma
+    transacción dejan un solo incremento pendiente.
+    """
+    incremento = _incrementos.setdefault(namespace, partial(bump_version, namespace))
+    conexion = transaction.get_connection(using)
+    if conexion.in_atomic_block and any(callback is incremento for _, callback, _ in conexion.run_on_commit):
+        return
+    transaction.on_commit(incremento, using=using)
+
+
+def _refrescar():
+    global _versiones, _leidas_en
+    with _lock:
+        if _leidas_en is not None and time.monotonic() - _leidas_en < getattr(settings, 'VERSIONES_REFRESCO_S', 1.0):
+            return
+        try:
+            _versiones = dict(ContadorVersion.objects.values_list('nombre', 'valor'))
+        except DatabaseError as e:
+            # Sin tabla (antes de migrar) o sin conexión: se conservan las versiones conocidas
+            logger.warning(f"⚠️ No se pudieron leer las versiones: {e}")
+        _leidas_en = time.monotonic()
+
+
+def _publicar(namespace, valor):
+    global _versiones
+    with _lock:
+        if valor > _versiones.get(namespace, 0):
+            _versiones = {**_versiones, namespace: valor}
@@ -0,0 +1,47 @@
+"""
+Señales de la app companies
+Incrementan la versión del catálogo cuando cambian productos (nombre, código,
+precio, estado o categoría; no el stock) o categorías, y la
+versión de los datos del negocio cuando además cambian ventas o compras.
+
+Los incrementos se aplican al confirmar la transacción, uno por espacio de
+nombres: una venta de muchas líneas no escribe un contador por fila
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Producto, Categoria, Venta, ItemVenta, Compra, ItemCompra
+from .services.versioning import bump_al_confirmar
+
+
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_catalogo(sender, **kwargs):
+    bump_al_confirmar('catalogo')
+
+
+@receiver(post_save, sender=Producto)
+def invalidar_catalogo_producto(sender, instance, created, update_fields=None, **kwargs):
+    # El save() de stock de cada venta no reconstruye los índices del catálogo
+    if created or instance.cambio_catalogo(update_fields):
+        bump_al_confirmar('catalogo')
+    instance._catalogo_cargado = instance.valores_catalogo()
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Venta)
+@receiver(post_delete, sender=Venta)
+@receiver(post_save, sender=ItemVenta)
+@receiver(post_delete, sender=ItemVenta)
+@receiver(post_save, sender=Compra)
+@receiver(post_delete, sender=Compra)
+@receiver(post_save, sender=ItemCompra)
+@receiver(post_delete, sender=ItemCompra)
+def invalidar_datos(sender, **kwargs):
+    # Al confirmar: los items y el stock de la misma transacción ya son visibles
+    bump_al_confirmar('datos')
@@ -9,6 +9,7 @@ import MetricsUpdater from './modules/MetricsUpdater.js';
 import ChartManager from './modules/ChartManager.js';
 import UpdateIndicator from './modules/UpdateIndicator.js';
 import FirebaseSync from './modules/FirebaseSync.js';
+import EventSourceSync from './modules/EventSourceSync.js';
 import ChartsInit from './modules/ChartsInit.js';
 
 
@@ -24,8 +25,13 @@ class Dashboard {
         this.chartsInit = null;
         this.chartManager = null;
         
-        // Firebase Sync para tiempo real
-        this.firebaseSync = new FirebaseSync(
+        // Control de refetch: como máximo uno en vuelo y uno pendiente
+        this.isUpdating = false;
+        this.updatePending = false;
+        
+        // Sincronización en tiempo real (Firebase o SSE según el backend del servidor)
+        const RealtimeSync = window.REALTIME_BACKEND === 'sse' ? EventSourceSync : FirebaseSync;
+        this.firebaseSync = new RealtimeSync(
             'demo_company',
             () => this.onFirebaseUpdate()
         );
@@ -95,6 +101,13 @@ class Dashboard {
      * Actualiza todos los datos del dashboard (después de cambios)
      */
     async update() {
+        if (this.isUpdating) {
+            this.updatePending = true;
+            return;
+        }
+        
+        this.isUpdating = true;
+        
         try {
             this.indicator.showUpdating();
 
@@ -116,6 +129,13 @@ class Dashboard {
         } catch (error) {
             console.error('Error al actualizar dashboard:', error);
             this.indicator.showActive();
+        } finally {
+            this.isUpdating = false;
+            
+            if (this.updatePending) {
+                this.updatePending = false;
+                this.update();
+            }
         }
     }
 
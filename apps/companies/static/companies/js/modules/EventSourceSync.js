@@ -0,0 +1,69 @@
+/**
+ * EventSourceSync
+ * Escucha los pings del servidor vía Server-Sent Events.
+ * Misma interfaz que FirebaseSync (para el backend BroadcastNotifier).
+ */
+
+class EventSourceSync {
+    /**
+     * @param {string} companyId - ID de la empresa a escuchar
+     * @param {Function} onUpdate - Callback cuando hay cambios
+     * @param {string} url - Endpoint SSE
+     */
+    constructor(companyId, onUpdate, url = '/companies/api/eventos/') {
+        this.companyId = companyId;
+        this.onUpdate = onUpdate;
+        this.url = url;
+        this.source = null;
+        this.isListening = false;
+    }
+
+    /**
+     * Abre la conexión SSE
+     */
+    startListening() {
+        if (this.isListening) {
+            console.warn('📡 Ya está escuchando eventos');
+            return;
+        }
+
+        this.source = new EventSource(`${this.url}?company_id=${encodeURIComponent(this.companyId)}`);
+
+        this.source.addEventListener('ping', (event) => {
+            const { version } = JSON.parse(event.data);
+            console.log(`📡 Cambio detectado vía SSE: ${new Date(version).toLocaleString()}`);
+
+            if (this.onUpdate) {
+                this.onUpdate();
+            }
+        });
+
+        this.source.onerror = () => {
+            console.warn('📡 Conexión SSE interrumpida, reintentando...');
+        };
+
+        console.log(`🔊 Escuchando eventos SSE para: ${this.companyId}`);
+        this.isListening = true;
+    }
+
+    /**
+     * Cierra la conexión SSE
+     */
+    stopListening() {
+        if (this.source && this.isListening) {
+            this.source.close();
+            this.source = null;
+            this.isListening = false;
+            console.log('📡 Listener SSE detenido');
+        }
+    }
+
+    /**
+     * Verifica si está escuchando
+     */
+    isActive() {
+        return this.isListening;
+    }
+}
+
+export default EventSourceSync;
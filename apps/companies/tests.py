@@ -1,3 +1,293 @@
-from django.test import TestCase
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from .barcodes import candidatos_gtin, digito_control_gtin, gtin_valido
+from .fonetica import clave_fonetica, claves_foneticas
+from .models import Categoria, ContadorVersion, ItemCompra, Producto, Proveedor
+from .services import notification_dispatcher
+from .services.compra_service import CompraService
+from .services.firebase_stub import FirebaseStubServer
+from .services.notification_dispatcher import NotificationDispatcher
+from .services.notifiers import FirebaseRestNotifier, InMemoryNotifier, get_notifier
+from .services.sales_service import SalesService
+from .services.versioning import bump_version, get_version
+
+IN_MEMORY = {'BACKEND': 'apps.companies.services.notifiers.InMemoryNotifier', 'OPTIONS': {}}
+
+# EAN-13 válido (dígito de control 1)
+EAN = '4006381333931'
+
+
+class FirebaseStubTests(SimpleTestCase):
+    """Notificaciones en tiempo real sin salir a internet"""
+
+    def test_notifier_rest_escribe_el_ping_en_el_stub(self):
+        with FirebaseStubServer() as stub:
+            notifier = FirebaseRestNotifier(database_url=stub.url, timeout=2)
+            self.assertTrue(notifier.notify('demo_company', 1700000000000))
+            self.assertTrue(notifier.test_connection())
+            self.assertEqual(stub.pings, [('demo_company', 1700000000000)])
+
+    def test_dispatcher_agrupa_los_cambios_en_un_ping(self):
+        with FirebaseStubServer() as stub:
+            notifier = FirebaseRestNotifier(database_url=stub.url, timeout=2)
+            dispatcher = NotificationDispatcher(notifier.notify, window_ms=10_000)
+            versiones = [dispatcher.notify('demo_company') for _ in range(5)]
+            dispatcher.flush()
+
+            self.assertEqual(stub.pings, [('demo_company', versiones[-1])])
+            self.assertEqual(versiones, sorted(set(versiones)))
+            self.assertEqual(dispatcher.stats()['coalescidas'], 4)
+
+    def test_stub_rechaza_rutas_desconocidas(self):
+        with FirebaseStubServer() as stub:
+            notifier = FirebaseRestNotifier(database_url=stub.url + '/otra', timeout=2)
+            self.assertFalse(notifier.notify('demo_company', 1))
+            self.assertEqual(stub.pings, [])
+
+
+@override_settings(REALTIME_NOTIFIER=IN_MEMORY)
+class NotificacionVentaTests(TestCase):
+    """Una venta confirmada publica un ping con el backend configurado"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Cuadernos')
+        self.producto = Producto.objects.create(
+            nombre='Cuaderno Espiral A4', categoria=categoria,
+            precio_venta='3.00', precio_compra='1.50', stock_actual=10
+        )
+        # Dispatcher propio del test: sin ventana, envía al notificador en memoria
+        self._dispatcher = notification_dispatcher._dispatcher
+        notification_dispatcher._dispatcher = NotificationDispatcher(notification_dispatcher._enviar, window_ms=0)
+
+    def tearDown(self):
+        notification_dispatcher._dispatcher = self._dispatcher
+
+    def test_venta_notifica_al_confirmar(self):
+        notifier = get_notifier()
+        self.assertIsInstance(notifier, InMemoryNotifier)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            venta = SalesService.crear_venta([{'producto_id': self.producto.id, 'cantidad': 2}])
+
+        self.assertIsNotNone(venta)
+        self.assertEqual([empresa for empresa, _ in notifier.notifications], ['demo_company'])
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 8)
+
+
+
+class EventosStreamTests(TestCase):
+
+    def test_requiere_sesion(self):
+        respuesta = self.client.get(reverse('companies:eventos_stream'))
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertIn(reverse('custom_auth:login'), respuesta['Location'])
+
+
+@override_settings(REALTIME_NOTIFIER=IN_MEMORY, VERSIONES_REFRESCO_S=0)
+class VersionesTests(TransactionTestCase):
+    """Contadores de versión: atómicos y un solo incremento por transacción confirmada"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Cuadernos')
+        self.productos = [
+            Producto.objects.create(
+                nombre=f'Cuaderno {i}', categoria=categoria,
+                precio_venta='3.00', precio_compra='1.50', stock_actual=10
+            )
+            for i in range(3)
+        ]
+        self._dispatcher = notification_dispatcher._dispatcher
+        notification_dispatcher._dispatcher = NotificationDispatcher(notification_dispatcher._enviar, window_ms=0)
+
+    def tearDown(self):
+        notification_dispatcher._dispatcher = self._dispatcher
+
+    def test_bump_incrementa_la_fila(self):
+        primera = bump_version('pruebas')
+        segunda = bump_version('pruebas')
+
+        self.assertEqual(segunda, primera + 1)
+        self.assertEqual(ContadorVersion.objects.get(nombre='pruebas').valor, segunda)
+        self.assertEqual(get_version('pruebas'), segunda)
+
+    def test_venta_de_varias_lineas_incrementa_una_vez(self):
+        datos = get_version('datos')
+        catalogo = get_version('catalogo')
+
+        with CaptureQueriesContext(connection) as consultas:
+            SalesService.crear_venta([{'producto_id': p.id, 'cantidad': 1} for p in self.productos])
+
+        # Venta, 3 items y 3 productos guardados: un único UPDATE del contador
+        incrementos = [
+            q for q in consultas.captured_queries
+            if q['sql'].startswith('UPDATE') and ContadorVersion._meta.db_table in q['sql']
+        ]
+        self.assertEqual(len(incrementos), 1)
+        self.assertEqual(get_version('datos'), datos + 1)
+        # El descuento de stock no toca el catálogo
+        self.assertEqual(get_version('catalogo'), catalogo)
+
+    def test_cambio_de_precio_incrementa_el_catalogo(self):
+        catalogo = get_version('catalogo')
+        producto = self.productos[0]
+        producto.precio_venta = '3.50'
+        producto.save()
+
+        self.assertEqual(get_version('catalogo'), catalogo + 1)
+
+    def test_rollback_descarta_el_incremento(self):
+        catalogo = get_version('catalogo')
+        try:
+            with transaction.atomic():
+                self.productos[0].delete()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(get_version('catalogo'), catalogo)
+
+
+@override_settings(REALTIME_NOTIFIER=IN_MEMORY)
+class CompraServiceTests(TestCase):
+    """Compras a proveedores: CSV de la factura y UPDATE agrupado de stock"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Cuadernos')
+        self.proveedor = Proveedor.objects.create(nombre='Distribuidora Andina')
+        self.cuaderno = Producto.objects.create(
+            nombre='Cuaderno Espiral A4', categoria=categoria, codigo_barras=EAN,
+            precio_venta='3.00', precio_compra='1.50', stock_actual=10
+        )
+        self.lapiz = Producto.objects.create(
+            nombre='Lápiz HB', categoria=categoria, codigo_barras='96385074',
+            precio_venta='0.50', precio_compra='0.20', stock_actual=0
+        )
+
+    def test_leer_csv_con_punto_y_coma_y_coma_decimal(self):
+        items = CompraService.leer_csv(
+            'codigo;cantidad;precio\n'
+            f'{EAN};1.200;1.234,50\n'
+            '96385074;5,00;0,25\n'
+        )
+
+        self.assertEqual(
+            [(i['codigo_barras'], i['cantidad'], i['precio_unitario']) for i in items],
+            [(EAN, '1200', '1234.50'), ('96385074', '5', '0.25')]
+        )
+
+    def test_leer_csv_con_coma_y_miles_entre_comillas(self):
+        items = CompraService.leer_csv(
+            'producto_id,cantidad,precio_unitario\n'
+            f'{self.cuaderno.id},"1,200","1,234.50"\n'
+            f'{self.lapiz.id},3,0.25\n'
+        )
+
+        self.assertEqual(
+            [(i['producto_id'], i['cantidad'], i['precio_unitario']) for i in items],
+            [(str(self.cuaderno.id), '1200', '1234.50'), (str(self.lapiz.id), '3', '0.25')]
+        )
+
+    def test_leer_csv_sin_columnas_requeridas(self):
+        with self.assertRaises(ValueError):
+            CompraService.leer_csv('codigo;precio\n123;1,00\n')
+
+    def test_registrar_compra_agrupa_el_stock(self):
+        compra = CompraService.registrar_compra(self.proveedor.id, [
+            {'producto_id': self.cuaderno.id, 'cantidad': 5, 'precio_unitario': '1.50'},
+            {'codigo_barras': '96385074', 'cantidad': 20, 'precio_unitario': '0.22'},
+            {'producto_id': self.cuaderno.id, 'cantidad': 3, 'precio_unitario': '1.60'},
+        ])
+
+        self.cuaderno.refresh_from_db()
+        self.lapiz.refresh_from_db()
+        self.assertEqual(self.cuaderno.stock_actual, 18)
+        self.assertEqual(self.lapiz.stock_actual, 20)
+        # Último costo recibido por producto
+        self.assertEqual(str(self.cuaderno.precio_compra), '1.60')
+        self.assertEqual(str(self.lapiz.precio_compra), '0.22')
+        self.assertEqual(ItemCompra.objects.filter(compra=compra).count(), 3)
+        self.assertEqual(str(compra.total), '16.70')
+
+    def test_compra_invalida_no_toca_el_stock(self):
+        with self.assertRaises(ValueError):
+            CompraService.registrar_compra(self.proveedor.id, [
+                {'producto_id': self.cuaderno.id, 'cantidad': 5, 'precio_unitario': '1.50'},
+                {'codigo_barras': '0000', 'cantidad': 1, 'precio_unitario': '1.00'},
+            ])
+
+        self.cuaderno.refresh_from_db()
+        self.assertEqual(self.cuaderno.stock_actual, 10)
+
+    def test_importar_csv(self):
+        compra = CompraService.importar_csv(
+            f'codigo;cantidad;precio\n{EAN};1.200;1,50\n'.encode('utf-8-sig'), self.proveedor.id
+        )
+
+        self.cuaderno.refresh_from_db()
+        self.assertEqual(self.cuaderno.stock_actual, 1210)
+        self.assertEqual(str(compra.total), '1800.00')
+
+
+class CandidatosGtinTests(SimpleTestCase):
+
+    def test_codigo_valido_no_tiene_candidatos(self):
+        self.assertTrue(gtin_valido(EAN))
+        self.assertEqual(candidatos_gtin(EAN), [])
+
+    def test_no_gtin_no_tiene_candidatos(self):
+        self.assertEqual(candidatos_gtin('ABC123'), [])
+        self.assertEqual(candidatos_gtin('12345'), [])
+
+    def test_corrige_un_digito_sustituido(self):
+        leido = EAN[:4] + str((int(EAN[4]) + 5) % 10) + EAN[5:]
+        candidatos = candidatos_gtin(leido)
+
+        self.assertIn((EAN, 'sustitucion', 4), candidatos)
+        self.assertTrue(all(gtin_valido(codigo) for codigo, _, _ in candidatos))
+        # Como mucho una sustitución por posición, sin repetidos
+        self.assertLessEqual(len(candidatos), 2 * len(EAN))
+        self.assertEqual(len({codigo for codigo, _, _ in candidatos}), len(candidatos))
+
+    def test_corrige_dos_digitos_transpuestos(self):
+        # Transponer dígitos cuya diferencia no es 5 siempre rompe el dígito de control
+        posicion = next(
+            i for i in range(len(EAN) - 1)
+            if EAN[i] != EAN[i + 1] and abs(int(EAN[i]) - int(EAN[i + 1])) != 5
+        )
+        leido = EAN[:posicion] + EAN[posicion + 1] + EAN[posicion] + EAN[posicion + 2:]
+
+        self.assertFalse(gtin_valido(leido))
+        self.assertIn(EAN, [codigo for codigo, _, _ in candidatos_gtin(leido)])
+
+    def test_digito_control(self):
+        self.assertEqual(digito_control_gtin(EAN[:-1]), int(EAN[-1]))
+        self.assertTrue(gtin_valido('96385074'))  # EAN-8
+
+
+class ClaveFoneticaTests(SimpleTestCase):
+
+    def test_seseo_y_plurales(self):
+        self.assertEqual(clave_fonetica('lapis'), clave_fonetica('lapiz'))
+        self.assertEqual(clave_fonetica('lapiz'), clave_fonetica('lapices'))
+        self.assertEqual(clave_fonetica('sacapunta'), clave_fonetica('sacapuntas'))
+
+    def test_yeismo_h_muda_y_b_v(self):
+        self.assertEqual(clave_fonetica('llave'), clave_fonetica('yave'))
+        self.assertEqual(clave_fonetica('hoja'), clave_fonetica('oja'))
+        self.assertEqual(clave_fonetica('borrador'), clave_fonetica('vorrador'))
+
+    def test_palabras_distintas_no_coinciden(self):
+        self.assertNotEqual(clave_fonetica('cuaderno'), clave_fonetica('carpeta'))
+        self.assertNotEqual(clave_fonetica('goma'), clave_fonetica('toma'))
+
+    def test_numeros_y_vacios(self):
+        self.assertEqual(clave_fonetica('100'), '100')
+        self.assertEqual(clave_fonetica(''), '')
+
+    def test_claves_ignoran_palabras_cortas(self):
+        claves = claves_foneticas('lapiz de grafito hb')
+        self.assertEqual(claves, {clave_fonetica('lapiz'), clave_fonetica('grafito')})
@@ -9,4 +9,8 @@ urlpatterns = [
     path('api/dashboard-data/', views.dashboard_data, name='dashboard_data'),  # Nueva ruta
     path('api/ventas/', api_views.create_venta_api, name='api_create_venta'),  # ← NUEVO
     path('api/test-firebase/', api_views.test_firebase, name='api_test_firebase'),  # ← NUEVO (testing)
+    path('api/eventos/', views.eventos_stream, name='eventos_stream'),
+    path('api/productos/buscar/', api_views.buscar_productos_api, name='api_buscar_productos'),
+    path('api/productos/autocompletar/', api_views.autocompletar_productos_api, name='api_autocompletar_productos'),
+    path('api/notificaciones/estadisticas/', api_views.notification_stats, name='api_notification_stats'),
 ]
\ No newline at end of file
@@ -1,13 +1,27 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.http import require_http_methods
+import asyncio
 import json
+import queue
+import time
 import logging
 from django.contrib.auth.decorators import login_required
 from .services.dashboard_service import DashboardService
+from .services.notifiers import BroadcastNotifier, get_notifier
 
 logger = logging.getLogger(__name__)
 
+# SSE del dashboard: comentario cada KEEP_ALIVE_S y, bajo ASGI, revisión de la cola cada SONDEO_S
+KEEP_ALIVE_S = 15
+SONDEO_S = 0.5
+
+
+def _realtime_backend():
+    """'sse' si el notificador es el broadcast local, 'firebase' en otro caso"""
+    return 'sse' if isinstance(get_notifier(), BroadcastNotifier) else 'firebase'
+
 
 @login_required
 @require_http_methods(["GET"])
@@ -34,6 +48,7 @@ def dashboard(request):
             'productos_reponer': data.get('productos_reponer', []),
             'labels_semana': json.dumps(data.get('labels_semana', [])),
             'datos_semana': json.dumps(data.get('datos_semana', [])),
+            'realtime_backend': _realtime_backend(),
         }
         
         return render(request, 'companies/dashboard.html', context)
@@ -52,6 +67,7 @@ def dashboard(request):
             'productos_reponer': [],
             'labels_semana': json.dumps([]),
             'datos_semana': json.dumps([]),
+            'realtime_backend': _realtime_backend(),
             'error': 'Error al cargar los datos del dashboard'
         }
         return render(request, 'companies/dashboard.html', context)
@@ -77,4 +93,69 @@ def dashboard_data(request):
                 'message': str(e)
             },
             status=500
-        )
\ No newline at end of file
+        )
+
+
+@login_required
+@require_http_methods(["GET"])
+def eventos_stream(request):
+    """
+    Server-Sent Events con los pings del BroadcastNotifier.
+    Alternativa a Firebase cuando REALTIME_NOTIFIER usa el backend broadcast.
+    """
+    notifier = get_notifier()
+    
+    if not isinstance(notifier, BroadcastNotifier):
+        return JsonResponse(
+            {'error': 'El backend de notificaciones configurado no soporta SSE'},
+            status=404
+        )
+    
+    company_id = request.GET.get('company_id', 'demo_company')
+    
+    def stream():
+        cola = notifier.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    empresa, version = cola.get(timeout=KEEP_ALIVE_S)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                if empresa == company_id:
+                    yield f"event: ping\ndata: {json.dumps({'version': version})}\n\n"
+        finally:
+            notifier.unsubscribe(cola)
+    
+    async def stream_async():
+        # Bajo ASGI un generador síncrono infinito nunca se enviaría (Django lo
+        # consume entero con sync_to_async) y dejaría un hilo tomado por cliente.
+        # Aquí se revisa la cola sin bloquear el event loop; al desconectarse el
+        # cliente Django cancela el generador y el finally da de baja la cola.
+        cola = notifier.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            ultimo_envio = time.monotonic()
+            while True:
+                try:
+                    empresa, version = cola.get_nowait()
+                except queue.Empty:
+                    if time.monotonic() - ultimo_envio >= KEEP_ALIVE_S:
+                        ultimo_envio = time.monotonic()
+                        yield ": keep-alive\n\n"
+                    await asyncio.sleep(SONDEO_S)
+                    continue
+                
+                if empresa == company_id:
+                    ultimo_envio = time.monotonic()
+                    yield f"event: ping\ndata: {json.dumps({'version': version})}\n\n"
+        finally:
+            notifier.unsubscribe(cola)
+    
+    cuerpo = stream_async() if isinstance(request, ASGIRequest) else stream()
+    response = StreamingHttpResponse(cuerpo, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
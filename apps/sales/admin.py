@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ReservaStock
+
+
+@admin.register(ReservaStock)
+class ReservaStockAdmin(admin.ModelAdmin):
+    list_display = ('carrito_id', 'producto', 'cantidad', 'creada_en', 'expira_en')
+    list_filter = ('expira_en',)
+    search_fields = ('carrito_id', 'producto__nombre')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.sales.services.reserva_service import ReservaService
+
+
+class Command(BaseCommand):
+    help = 'Elimina las reservas de stock del punto de venta que ya expiraron'
+
+    def handle(self, *args, **kwargs):
+        eliminadas = ReservaService.limpiar_expiradas()
+        self.stdout.write(self.style.SUCCESS(f'✓ {eliminadas} reservas expiradas eliminadas'))
@@ -1,3 +1,30 @@
 from django.db import models
+from django.core.validators import MinValueValidator
 
-# Create your models here.
+
+class ReservaStock(models.Model):
+    """
+    Unidades apartadas por un carrito del punto de venta mientras se arma la venta.
+    Stock disponible = stock_actual - reservas activas (no expiradas) de otros carritos.
+    """
+    carrito_id = models.CharField(max_length=64, db_index=True)
+    producto = models.ForeignKey(
+        'companies.Producto',
+        on_delete=models.CASCADE,
+        related_name='reservas'
+    )
+    cantidad = models.IntegerField(validators=[MinValueValidator(1)])
+    
+    creada_en = models.DateTimeField(auto_now_add=True)
+    expira_en = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        verbose_name_plural = "Reservas de stock"
+        unique_together = ['carrito_id', 'producto']
+        indexes = [
+            # Agregado de reservas activas por producto
+            models.Index(fields=['producto', 'expira_en']),
+        ]
+    
+    def __str__(self):
+        return f"{self.cantidad}x {self.producto_id} (carrito {self.carrito_id})"
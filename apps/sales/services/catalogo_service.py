@@ -0,0 +1,142 @@
+"""
+Catálogo Service
+Exporta el catálogo del punto de venta para que cada caja lo tenga en local
+"""
+
+from django.db.models import Count, Max, Q
+from datetime import datetime, timedelta, timezone as dt_timezone
+from apps.companies.models import Producto, Categoria
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogoService:
+    """
+    Snapshot y deltas del catálogo con formato columnar (una lista por campo),
+    compacto y muy comprimible con gzip.
+
+    La versión es fecha_actualizacion más reciente en milisegundos: todo cambio
+    de producto (save o update) la mueve, así que una caja con la versión V
+    solo necesita los productos modificados después de V.
+
+    Los borrados físicos y los cambios de categoría no mueven esa fecha: el
+    ETag del snapshot (etag()) suma el total de activos y una huella de las
+    categorías para que la caja no reciba un 304 con datos viejos.
+    """
+
+    COLUMNAS = ('id', 'codigo_barras', 'nombre', 'precio_venta', 'stock', 'categoria_id')
+
+    # Solapamiento del delta: cubre transacciones que confirmaron tarde
+    # con una fecha_actualizacion anterior a la versión ya entregada
+    MARGEN_DELTA = timedelta(seconds=5)
+
+    # Con más cambios que esto conviene descargar el snapshot completo
+    MAX_FILAS_DELTA = 5000
+
+    @staticmethod
+    def version():
+        """Versión actual del catálogo (ms desde epoch, 0 si está vacío)"""
+        ultima = Producto.objects.aggregate(ultima=Max('fecha_actualizacion'))['ultima']
+        return CatalogoService._a_version(ultima)
+
+    @staticmethod
+    def etag():
+        """ETag del snapshot: versión, productos activos y huella de las categorías"""
+        estado = Producto.objects.aggregate(
+            ultima=Max('fecha_actualizacion'),
+            activos=Count('id', filter=Q(activo=True))
+        )
+        categorias = zlib.crc32(repr(list(
+            Categoria.objects.order_by('id').values_list('id', 'nombre')
+        )).encode())
+        return f"{CatalogoService._a_version(estado['ultima'])}-{estado['activos']}-{categorias:08x}"
+
+    @staticmethod
+    def snapshot():
+        """
+        Catálogo completo de productos activos
+
+        Returns:
+            Dict con version, columnas, datos (columnar), categorias y total
+        """
+        version = CatalogoService.version()
+        filas = Producto.objects.filter(activo=True).order_by('id').values_list(
+            'id', 'codigo_barras', 'nombre', 'precio_venta', 'stock_actual', 'categoria_id'
+        )
+
+        return {
+            'version': version,
+            'columnas': list(CatalogoService.COLUMNAS),
+            'datos': CatalogoService._columnar(filas),
+            'categorias': CatalogoService._categorias(),
+            'total': len(filas)
+        }
+
+    @staticmethod
+    def delta(desde):
+        """
+        Productos modificados desde la versión indicada
+
+        Args:
+            desde: Versión que tiene el cliente (ms desde epoch)
+
+        Returns:
+            Dict con version, datos (altas y cambios), eliminados (ids desactivados),
+            categorias y total de activos para que el cliente verifique su copia.
+            Si hay demasiados cambios devuelve {'completo': True}: pedir el snapshot.
+
+        Raises:
+            ValueError: Si desde no es una versión representable como fecha
+        """
+        limite = CatalogoService._a_fecha(desde) - CatalogoService.MARGEN_DELTA
+        filas = list(
+            Producto.objects.filter(fecha_actualizacion__gt=limite).order_by('id').values_list(
+                'id', 'codigo_barras', 'nombre', 'precio_venta', 'stock_actual', 'categoria_id',
+                'activo', 'fecha_actualizacion'
+            )[:CatalogoService.MAX_FILAS_DELTA + 1]
+        )
+
+        if len(filas) > CatalogoService.MAX_FILAS_DELTA:
+            return {'completo': True, 'version': desde}
+
+        activos = [fila[:6] for fila in filas if fila[6]]
+        version = max([desde] + [CatalogoService._a_version(fila[7]) for fila in filas])
+
+        return {
+            'version': version,
+            'columnas': list(CatalogoService.COLUMNAS),
+            'datos': CatalogoService._columnar(activos),
+            'eliminados': [fila[0] for fila in filas if not fila[6]],
+            'categorias': CatalogoService._categorias(),
+            'total': Producto.objects.filter(activo=True).count()
+        }
+
+    @staticmethod
+    def _columnar(filas):
+        columnas = {nombre: [] for nombre in CatalogoService.COLUMNAS}
+        for producto_id, codigo, nombre, precio, stock, categoria_id in filas:
+            columnas['id'].append(producto_id)
+            columnas['codigo_barras'].append(codigo)
+            columnas['nombre'].append(nombre)
+            columnas['precio_venta'].append(float(precio))
+            columnas['stock'].append(stock)
+            columnas['categoria_id'].append(categoria_id)
+        return columnas
+
+    @staticmethod
+    def _categorias():
+        return {str(cid): nombre for cid, nombre in Categoria.objects.values_list('id', 'nombre')}
+
+    @staticmethod
+    def _a_version(fecha):
+        return int(fecha.timestamp() * 1000) if fecha else 0
+
+    @staticmethod
+    def _a_fecha(version):
+        """Fecha de una versión; ValueError si no corresponde a una fecha representable"""
+        try:
+            return datetime.fromtimestamp(version / 1000, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            raise ValueError(f"Versión fuera de rango: {version}")
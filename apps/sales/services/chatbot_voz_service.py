@@ -1,12 +1,16 @@
-from openai import OpenAI
-from decouple import config
+from apps.chatbot.services.llm_clients import get_client, get_async_client
 import json
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
-client = OpenAI(api_key=config("OPENAI_API_KEY"))
+RESPUESTA_ERROR = {
+    'accion': 'pedir_aclaracion',
+    'cantidad': None,
+    'confirmacion': False,
+    'respuesta_chatbot': 'Disculpa, hubo un error.'
+}
 
 class ChatbotVozService:
     """
@@ -18,6 +22,37 @@ class ChatbotVozService:
         """
         Interpreta comando de voz del usuario
         """
+        try:
+            response = get_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=ChatbotVozService._mensajes_comando(texto, contexto),
+                temperature=0.3
+            )
+            return ChatbotVozService._leer_comando(response.choices[0].message.content)
+            
+        except Exception as e:
+            logger.error(f"Error interpretando comando: {e}")
+            return dict(RESPUESTA_ERROR)
+    
+    @staticmethod
+    async def interpretar_comando_voz_async(texto, contexto=None):
+        """
+        Igual que interpretar_comando_voz sin bloquear el event loop (vista async)
+        """
+        try:
+            response = await get_async_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=ChatbotVozService._mensajes_comando(texto, contexto),
+                temperature=0.3
+            )
+            return ChatbotVozService._leer_comando(response.choices[0].message.content)
+            
+        except Exception as e:
+            logger.error(f"Error interpretando comando: {e}")
+            return dict(RESPUESTA_ERROR)
+    
+    @staticmethod
+    def _mensajes_comando(texto, contexto=None):
         contexto = contexto or {}
         
         prompt = f"""
@@ -48,41 +83,27 @@ REGLAS:
 
 Respuesta breve (máximo 2 oraciones).
 """
-
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Asistente de ventas experto en comandos de voz."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
-            
-            texto_respuesta = response.choices[0].message.content
-            match = re.search(r"\{.*\}", texto_respuesta, re.DOTALL)
-            
-            if not match:
-                return {
-                    'accion': 'pedir_aclaracion',
-                    'cantidad': None,
-                    'confirmacion': False,
-                    'respuesta_chatbot': 'No entendí. ¿Puedes repetir?'
-                }
-            
-            resultado = json.loads(match.group())
-            logger.info(f"Comando interpretado: {resultado}")
-            
-            return resultado
-            
-        except Exception as e:
-            logger.error(f"Error interpretando comando: {e}")
+        return [
+            {"role": "system", "content": "Asistente de ventas experto en comandos de voz."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    @staticmethod
+    def _leer_comando(texto_respuesta):
+        match = re.search(r"\{.*\}", texto_respuesta, re.DOTALL)
+        
+        if not match:
             return {
                 'accion': 'pedir_aclaracion',
                 'cantidad': None,
                 'confirmacion': False,
-                'respuesta_chatbot': 'Disculpa, hubo un error.'
+                'respuesta_chatbot': 'No entendí. ¿Puedes repetir?'
             }
+        
+        resultado = json.loads(match.group())
+        logger.info(f"Comando interpretado: {resultado}")
+        
+        return resultado
     
     @staticmethod
     def generar_respuesta_producto_escaneado(producto_info):
@@ -0,0 +1,161 @@
+"""
+Índice de Códigos de Barras
+Índice en memoria código → resumen de producto para el escáner del punto de venta
+"""
+
+from apps.companies.models import Producto, Categoria
+from apps.companies.services.versioning import get_version
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+CAMPOS = ('id', 'nombre', 'codigo_barras', 'precio_venta', 'stock_actual', 'categoria_id', 'fecha_actualizacion')
+
+
+class IndiceCodigos:
+    """
+    Índice por proceso de los productos con código de barras.
+
+    Se carga la primera vez que se usa. Cuando la versión del catálogo cambia
+    solo se releen las categorías y los productos modificados desde la última
+    carga (fecha_actualizacion), no el catálogo completo.
+
+    Cada acierto se confirma con una consulta por clave primaria que trae el
+    stock actual y detecta cambios hechos por otros procesos.
+    """
+
+    def __init__(self):
+        self._por_codigo = {}       # codigo_barras -> fila del producto
+        self._codigo_por_id = {}    # producto_id -> codigo_barras
+        self._categorias = {}       # categoria_id -> nombre
+        self._version = None
+        self._marca = None          # fecha_actualizacion más reciente cargada
+        self._lock = threading.Lock()
+        self._stats = {'aciertos': 0, 'fallos': 0, 'refrescos': 0, 'cargas': 0, 'deltas': 0}
+
+    def buscar(self, codigo):
+        """
+        Busca un producto por código exacto
+
+        Returns:
+            Dict con id, nombre, codigo_barras, precio_venta, stock y categoria, o None
+        """
+        self._sincronizar()
+
+        fila = self._por_codigo.get(codigo)
+        if fila is None:
+            self._stats['fallos'] += 1
+            return self._cargar_codigo(codigo)
+
+        # Verificación barata de frescura: stock y cambios de otros procesos
+        actual = Producto.objects.filter(id=fila['id']).values_list(
+            'codigo_barras', 'stock_actual', 'fecha_actualizacion'
+        ).first()
+
+        if actual is None or actual[0] != codigo:
+            self._quitar(fila['id'])
+            self._stats['fallos'] += 1
+            return self._cargar_codigo(codigo)
+
+        if actual[2] != fila['fecha_actualizacion']:
+            self._stats['refrescos'] += 1
+            return self._cargar_codigo(codigo)
+
+        self._stats['aciertos'] += 1
+        return self._resumen(fila, stock=actual[1])
+
+    def invalidar(self):
+        """Descarta el índice; la próxima búsqueda lo recarga completo"""
+        with self._lock:
+            self._version = None
+
+    def stats(self):
+        data = dict(self._stats)
+        data['productos'] = len(self._por_codigo)
+        data['version'] = self._version
+        return data
+
+    def _sincronizar(self):
+        version = get_version('catalogo')
+        if version == self._version:
+            return
+
+        with self._lock:
+            if version == self._version:
+                return
+
+            self._categorias = dict(Categoria.objects.values_list('id', 'nombre'))
+
+            if self._version is None:
+                filas = Producto.objects.filter(codigo_barras__isnull=False).values(*CAMPOS)
+                self._por_codigo = {}
+                self._codigo_por_id = {}
+                self._marca = None
+                self._stats['cargas'] += 1
+            else:
+                filas = Producto.objects.filter(fecha_actualizacion__gte=self._marca).values(*CAMPOS) \
+                    if self._marca else Producto.objects.none()
+                self._stats['deltas'] += 1
+
+            for fila in filas:
+                self._guardar(fila)
+
+            self._version = version
+
+    def _cargar_codigo(self, codigo):
+        fila = Producto.objects.filter(codigo_barras=codigo).values(*CAMPOS).first()
+        if fila is None:
+            return None
+
+        with self._lock:
+            if fila['categoria_id'] not in self._categorias:
+                self._categorias = dict(Categoria.objects.values_list('id', 'nombre'))
+            self._guardar(fila)
+
+        return self._resumen(fila)
+
+    def _guardar(self, fila):
+        """Inserta o reemplaza la fila (llamar con el lock tomado)"""
+        anterior = self._codigo_por_id.get(fila['id'])
+        if anterior is not None and anterior != fila['codigo_barras']:
+            self._por_codigo.pop(anterior, None)
+
+        if fila['codigo_barras']:
+            self._por_codigo[fila['codigo_barras']] = fila
+            self._codigo_por_id[fila['id']] = fila['codigo_barras']
+        else:
+            self._codigo_por_id.pop(fila['id'], None)
+
+        if self._marca is None or fila['fecha_actualizacion'] > self._marca:
+            self._marca = fila['fecha_actualizacion']
+
+    def _quitar(self, producto_id):
+        with self._lock:
+            codigo = self._codigo_por_id.pop(producto_id, None)
+            if codigo is not None:
+                self._por_codigo.pop(codigo, None)
+
+    def _resumen(self, fila, stock=None):
+        return {
+            'id': fila['id'],
+            'nombre': fila['nombre'],
+            'codigo_barras': fila['codigo_barras'],
+            'precio_venta': float(fila['precio_venta']),
+            'stock': fila['stock_actual'] if stock is None else stock,
+            'categoria': self._categorias.get(fila['categoria_id'], 'Sin categoría')
+        }
+
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def get_indice_codigos():
+    """Índice de códigos compartido del proceso"""
+    global _indice
+    if _indice is None:
+        with _indice_lock:
+            if _indice is None:
+                _indice = IndiceCodigos()
+    return _indice
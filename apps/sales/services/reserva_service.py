@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import timedelta
+from apps.companies.models import Producto
+from apps.sales.models import ReservaStock
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReservaService:
+    """
+    Reservas de stock por carrito del punto de venta.
+    El stock se aparta al escanear/agregar y se libera al quitar, al vender o al expirar.
+    """
+
+    # Barrido oportunista de reservas expiradas (como máximo cada N segundos por proceso)
+    INTERVALO_BARRIDO = 60
+    _ultimo_barrido = 0.0
+
+    @staticmethod
+    def ttl():
+        """Duración de una reserva sin actividad del carrito"""
+        return timedelta(seconds=getattr(settings, 'POS_RESERVA_TTL_SEGUNDOS', 300))
+
+    @staticmethod
+    def stock_disponible(producto_ids, excluir_carrito=None):
+        """
+        Stock disponible por producto: stock_actual - reservas activas de otros carritos.
+        Un solo agregado sobre el índice (producto, expira_en).
+
+        Returns:
+            Dict {producto_id: disponible}
+        """
+        filtro = Q(reservas__expira_en__gt=timezone.now())
+        if excluir_carrito:
+            filtro &= ~Q(reservas__carrito_id=excluir_carrito)
+
+        filas = Producto.objects.filter(id__in=producto_ids).annotate(
+            reservado=Coalesce(Sum('reservas__cantidad', filter=filtro), Value(0))
+        ).values_list('id', 'stock_actual', 'reservado')
+
+        return {pid: stock - reservado for pid, stock, reservado in filas}
+
+    @staticmethod
+    def reservas_activas(carrito_id):
+        """Reservas vigentes de un carrito: {producto_id: cantidad}"""
+        return dict(
+            ReservaStock.objects.filter(
+                carrito_id=carrito_id,
+                expira_en__gt=timezone.now()
+            ).values_list('producto_id', 'cantidad')
+        )
+
+    @staticmethod
+    def reservar(carrito_id, producto_id, cantidad):
+        """
+        Fija la cantidad reservada de un producto para el carrito
+        (cantidad total en el carrito, no incremento) y renueva el TTL del carrito.
+
+        Los errores de base de datos se propagan: la caja no debe dar por
+        apartado un stock que no se pudo reservar.
+        """
+        if not carrito_id:
+            return {'success': False, 'mensaje': 'Carrito no identificado'}
+
+        if cantidad <= 0:
+            ReservaService.liberar(carrito_id, producto_id)
+            return {'success': True, 'reservado': 0}
+
+        ReservaService._barrido_oportunista()
+
+        try:
+            expira_en = timezone.now() + ReservaService.ttl()
+
+            with transaction.atomic():
+                # Cualquier actividad mantiene vivo todo el carrito
+                # (se escribe primero para tomar el bloqueo de escritura desde el inicio)
+                ReservaStock.objects.filter(carrito_id=carrito_id).update(expira_en=expira_en)
+
+                # Serializa las reservas concurrentes del mismo producto
+                producto = Producto.objects.select_for_update().get(id=producto_id, activo=True)
+                disponible = ReservaService.stock_disponible(
+                    [producto.id], excluir_carrito=carrito_id
+                ).get(producto.id, 0)
+
+                if cantidad > disponible:
+                    return {
+                        'success': False,
+                        'disponible': max(disponible, 0),
+                        'mensaje': f'Stock insuficiente para {producto.nombre}. Disponible: {max(disponible, 0)}'
+                    }
+
+                ReservaStock.objects.update_or_create(
+                    carrito_id=carrito_id,
+                    producto=producto,
+                    defaults={'cantidad': cantidad, 'expira_en': expira_en}
+                )
+
+            return {
+                'success': True,
+                'reservado': cantidad,
+                'disponible': disponible - cantidad,
+                'expira_en': expira_en.isoformat()
+            }
+
+        except Producto.DoesNotExist:
+            return {'success': False, 'mensaje': 'Producto no encontrado'}
+
+    @staticmethod
+    def liberar(carrito_id, producto_id=None):
+        """Libera las reservas del carrito (o solo las de un producto)"""
+        reservas = ReservaStock.objects.filter(carrito_id=carrito_id)
+        if producto_id is not None:
+            reservas = reservas.filter(producto_id=producto_id)
+        eliminadas, _ = reservas.delete()
+        return eliminadas
+
+    @staticmethod
+    def limpiar_expiradas():
+        """Elimina las reservas vencidas. Devuelve cuántas se borraron"""
+        eliminadas, _ = ReservaStock.objects.filter(expira_en__lte=timezone.now()).delete()
+        if eliminadas:
+            logger.info(f"🧹 {eliminadas} reservas expiradas eliminadas")
+        return eliminadas
+
+    @classmethod
+    def _barrido_oportunista(cls):
+        ahora = time.monotonic()
+        if ahora - cls._ultimo_barrido >= cls.INTERVALO_BARRIDO:
+            cls._ultimo_barrido = ahora
+            cls.limpiar_expiradas()
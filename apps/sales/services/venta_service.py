@@ -1,6 +1,11 @@
 from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from apps.companies.barcodes import candidatos_gtin, invertir_codigo, rango_prefijo
 from apps.companies.models import Producto, Venta, ItemVenta
-from apps.companies.services import FirebaseService
+from apps.companies.services import notificar_cambio
+from .reserva_service import ReservaService
+from .indice_codigos import get_indice_codigos
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,68 +15,55 @@ class VentaService:
     Servicio para gestionar ventas desde el punto de venta
     """
     
+    # Códigos por petición en la búsqueda por lote
+    MAX_CODIGOS_LOTE = 200
+    
     @staticmethod
-    def buscar_producto_por_codigo(codigo_barras):
+    def buscar_producto_por_codigo(codigo_barras, corregir=True):
         """
         Buscar producto por código de barras
         Implementa búsqueda flexible para cámaras de baja calidad
+        
+        La coincidencia exacta se resuelve en el índice en memoria del proceso;
+        solo los códigos desconocidos llegan a la base de datos.
+        
+        Con corregir=True, un EAN/UPC con dígito de control inválido se intenta
+        corregir (un dígito cambiado o dos adyacentes invertidos) antes de
+        recurrir a la búsqueda parcial por sufijo.
         """
         try:
             # Limpiar código (quitar espacios, caracteres raros)
             codigo_limpio = codigo_barras.strip().replace(" ", "").replace("-", "")
             
-            # Búsqueda exacta
-            try:
-                producto = Producto.objects.get(codigo_barras=codigo_limpio)
+            # Búsqueda exacta (índice en memoria + verificación de stock)
+            producto = get_indice_codigos().buscar(codigo_limpio)
+            if producto:
                 return {
                     'encontrado': True,
-                    'producto': {
-                        'id': producto.id,
-                        'nombre': producto.nombre,
-                        'codigo_barras': producto.codigo_barras,
-                        'precio_venta': float(producto.precio_venta),
-                        'stock': producto.stock,
-                        'categoria': producto.categoria.nombre if producto.categoria else 'Sin categoría'
-                    }
+                    'producto': producto
                 }
-            except Producto.DoesNotExist:
-                pass
             
-            # Búsqueda parcial (últimos 8 dígitos para EAN-13 mal leídos)
+            # Corrección de un solo error: candidatos válidos resueltos en una consulta.
+            # Un GTIN con dígito de control válido no tiene candidatos, pero sí pasa
+            # por el sufijo: un código truncado también puede cuadrar por casualidad
+            if corregir:
+                candidatos = candidatos_gtin(codigo_limpio)
+                if candidatos:
+                    resultado = VentaService._resolver_candidatos(codigo_barras, candidatos)
+                    if resultado:
+                        return resultado
+            
+            # Búsqueda parcial por sufijo (últimos 8 dígitos para EAN-13 mal leídos).
+            # Sobre el código invertido el sufijo es un prefijo: rango del índice, una sola consulta
             if len(codigo_limpio) >= 8:
-                productos = Producto.objects.filter(
-                    codigo_barras__icontains=codigo_limpio[-8:]
-                )[:5]
+                desde, hasta = rango_prefijo(invertir_codigo(codigo_limpio[-8:]))
+                productos = list(Producto.objects.select_related('categoria').filter(
+                    codigo_barras_invertido__gte=desde,
+                    codigo_barras_invertido__lt=hasta
+                ).order_by('codigo_barras_invertido')[:5])
                 
-                if productos.exists():
-                    if productos.count() == 1:
-                        producto = productos.first()
-                        return {
-                            'encontrado': True,
-                            'producto': {
-                                'id': producto.id,
-                                'nombre': producto.nombre,
-                                'codigo_barras': producto.codigo_barras,
-                                'precio_venta': float(producto.precio_venta),
-                                'stock': producto.stock,
-                                'categoria': producto.categoria.nombre if producto.categoria else 'Sin categoría'
-                            },
-                            'advertencia': 'Código parcialmente coincidente'
-                        }
-                    else:
-                        return {
-                            'encontrado': False,
-                            'multiples': True,
-                            'productos': [
-                                {
-                                    'id': p.id,
-                                    'nombre': p.nombre,
-                                    'codigo_barras': p.codigo_barras,
-                                    'precio_venta': float(p.precio_venta)
-                                } for p in productos
-                            ],
-                            'mensaje': 'Se encontraron múltiples productos'
-                        }
+                if productos:
+                    return VentaService._resultado_parcial(productos)
             
             return {
                 'encontrado': False,
@@ -86,66 +78,266 @@ class VentaService:
             }
     
     @staticmethod
-    @transaction.atomic
-    def crear_venta(items_data, usa_voz=True, dispositivo='Web'):
+    def buscar_productos_por_codigos(codigos, corregir=True):
+        """
+        Resolver varios códigos de barras a la vez (escaneo de una caja, carga de un ticket)
+        
+        Todas las coincidencias exactas salen de una consulta IN; los códigos no
+        encontrados pasan juntos por una sola consulta de respaldo (correcciones
+        de un dígito y rangos de sufijo).
+        
+        Returns:
+            Dict {codigo_enviado: resultado}, con el mismo formato que buscar_producto_por_codigo
+        """
+        if len(codigos) > VentaService.MAX_CODIGOS_LOTE:
+            raise ValueError(f"Máximo {VentaService.MAX_CODIGOS_LOTE} códigos por consulta")
+        
+        limpios = {}
+        for codigo in codigos:
+            codigo = str(codigo)
+            limpios[codigo] = codigo.strip().replace(" ", "").replace("-", "")
+        
+        base = Producto.objects.select_related('categoria')
+        exactos = {
+            p.codigo_barras: p
+            for p in base.filter(codigo_barras__in={c for c in limpios.values() if c})
+        }
+        
+        resultados = {}
+        pendientes = {}  # codigo_enviado -> (candidatos, rango de sufijo)
+        for codigo, limpio in limpios.items():
+            if limpio in exactos:
+                resultados[codigo] = {
+                    'encontrado': True,
+                    'producto': VentaService._resumen_producto(exactos[limpio])
+                }
+            elif limpio:
+                candidatos = candidatos_gtin(limpio) if corregir else []
+                rango = rango_prefijo(invertir_codigo(limpio[-8:])) if len(limpio) >= 8 else None
+                if candidatos or rango:
+                    pendientes[codigo] = (candidatos, rango)
+        
+        if pendientes:
+            filtro = Q(codigo_barras__in=[
+                candidato for candidatos, _ in pendientes.values() for candidato, _, _ in candidatos
+            ])
+            for _, rango in pendientes.values():
+                if rango:
+                    filtro |= Q(codigo_barras_invertido__gte=rango[0], codigo_barras_invertido__lt=rango[1])
+            
+            respaldo = list(base.filter(filtro).order_by('codigo_barras_invertido'))
+            por_codigo = {p.codigo_barras: p for p in respaldo}
+            
+            for codigo, (candidatos, rango) in pendientes.items():
+                resultado = VentaService._resultado_candidatos(codigo, candidatos, por_codigo) if candidatos else None
+                if resultado is None and rango:
+                    parciales = [
+                        p for p in respaldo
+                        if p.codigo_barras_invertido and rango[0] <= p.codigo_barras_invertido < rango[1]
+                    ][:5]
+                    if parciales:
+                        resultado = VentaService._resultado_parcial(parciales)
+                if resultado:
+                    resultados[codigo] = resultado
+        
+        # Mismo orden en que llegaron los códigos
+        return {
+            codigo: resultados.get(codigo) or {
+                'encontrado': False,
+                'mensaje': f'No se encontró producto con código: {codigo}'
+            }
+            for codigo in limpios
+        }
+    
+    @staticmethod
+    def _resolver_candidatos(codigo_leido, candidatos):
+        """
+        Busca en una sola consulta los códigos corregidos y los ordena:
+        primero los productos activos con stock, luego las sustituciones
+        (más frecuentes en cámaras) antes que las transposiciones.
+        """
+        productos = {
+            p.codigo_barras: p
+            for p in Producto.objects.select_related('categoria').filter(
+                codigo_barras__in=[candidato for candidato, _, _ in candidatos]
+            )
+        }
+        return VentaService._resultado_candidatos(codigo_leido, candidatos, productos)
+    
+    @staticmethod
+    def _resultado_candidatos(codigo_leido, candidatos, productos):
+        """
+        Resultado de la corrección a partir de los productos ya cargados
+        ({codigo_barras: Producto}). None si ningún candidato existe.
+        """
+        coincidencias = sorted(
+            (
+                (productos[candidato], tipo, posicion)
+                for candidato, tipo, posicion in candidatos
+                if candidato in productos
+            ),
+            key=lambda c: (
+                not (c[0].activo and c[0].stock_actual > 0),
+                c[1] != 'sustitucion'
+            )
+        )
+        if not coincidencias:
+            return None
+        
+        if len(coincidencias) == 1:
+            producto, tipo, posicion = coincidencias[0]
+            return {
+                'encontrado': True,
+                'producto': VentaService._resumen_producto(producto),
+                'advertencia': f'Código corregido: se leyó {codigo_leido}',
+                'correccion': {
+                    'codigo_leido': codigo_leido,
+                    'tipo': tipo,
+                    'posicion': posicion
+                }
+            }
+        
+        return {
+            'encontrado': False,
+            'multiples': True,
+            'productos': [
+                dict(
+                    VentaService._resumen_producto(producto),
+                    correccion={'tipo': tipo, 'posicion': posicion}
+                )
+                for producto, tipo, posicion in coincidencias
+            ],
+            'mensaje': 'El código leído puede corresponder a varios productos'
+        }
+    
+    @staticmethod
+    def _resultado_parcial(productos):
+        """Resultado de la búsqueda por sufijo (lista no vacía de productos)"""
+        if len(productos) == 1:
+            return {
+                'encontrado': True,
+                'producto': VentaService._resumen_producto(productos[0]),
+                'advertencia': 'Código parcialmente coincidente'
+            }
+        
+        return {
+            'encontrado': False,
+            'multiples': True,
+            'productos': [
+                {
+                    'id': p.id,
+                    'nombre': p.nombre,
+                    'codigo_barras': p.codigo_barras,
+                    'precio_venta': float(p.precio_venta)
+                } for p in productos
+            ],
+            'mensaje': 'Se encontraron múltiples productos'
+        }
+    
+    @staticmethod
+    def _resumen_producto(producto):
+        return {
+            'id': producto.id,
+            'nombre': producto.nombre,
+            'codigo_barras': producto.codigo_barras,
+            'precio_venta': float(producto.precio_venta),
+            'stock': producto.stock_actual,
+            'categoria': producto.categoria.nombre if producto.categoria else 'Sin categoría'
+        }
+    
+    @staticmethod
+    def crear_venta(items_data, usa_voz=True, dispositivo='Web', carrito_id=None):
         """
         Crear venta desde el punto de venta
+        
+        Si el carrito tiene reservas vigentes, esas líneas ya están validadas:
+        se confirman con un descuento atómico de stock, sin revalidar bajo bloqueo.
+        Solo las líneas sin reserva pasan por la validación completa.
         """
         try:
             if not items_data:
                 raise ValueError("No hay productos en la venta")
             
-            # Crear venta base
-            venta = Venta.objects.create(
-                cliente_nombre='Cliente POS',
-                total=0
-            )
-            
-            total = 0
-            items_creados = []
-            
-            # Crear items
+            # Agrupar cantidades por producto
+            cantidades = {}
             for item_data in items_data:
-                producto = Producto.objects.get(id=item_data['producto_id'])
-                cantidad = item_data['cantidad']
+                producto_id = item_data['producto_id']
+                cantidades[producto_id] = cantidades.get(producto_id, 0) + int(item_data['cantidad'])
+            
+            with transaction.atomic():
+                # Crear venta base (primera escritura: toma el bloqueo de escritura desde el inicio)
+                venta = Venta.objects.create(
+                    cliente_nombre='Cliente POS',
+                    total=0
+                )
                 
-                # Validar stock
-                if producto.stock < cantidad:
-                    raise ValueError(f"Stock insuficiente para {producto.nombre}")
+                productos = Producto.objects.in_bulk(list(cantidades))
+                if len(productos) != len(cantidades):
+                    raise Producto.DoesNotExist
                 
-                # Calcular subtotal
-                subtotal = producto.precio_venta * cantidad
-                total += subtotal
+                reservas = ReservaService.reservas_activas(carrito_id) if carrito_id else {}
+                sin_reserva = sorted(pid for pid, cantidad in cantidades.items() if reservas.get(pid, 0) < cantidad)
                 
-                # Crear item de venta
-                ItemVenta.objects.create(
-                    venta=venta,
-                    producto=producto,
-                    cantidad=cantidad,
-                    precio_unitario=producto.precio_venta,
-                    subtotal=subtotal
-                )
+                if sin_reserva:
+                    # Validación completa: bloquear filas y respetar reservas de otros carritos
+                    list(Producto.objects.select_for_update().filter(id__in=sin_reserva).order_by('id'))
+                    disponibles = ReservaService.stock_disponible(sin_reserva, excluir_carrito=carrito_id)
+                    for producto_id in sin_reserva:
+                        if disponibles.get(producto_id, 0) < cantidades[producto_id]:
+                            raise ValueError(f"Stock insuficiente para {productos[producto_id].nombre}")
                 
-                # Actualizar stock
-                producto.stock -= cantidad
-                producto.save()
+                total = 0
+                items = []
+                items_creados = []
+                ahora = timezone.now()
                 
-                items_creados.append({
-                    'producto': producto.nombre,
-                    'cantidad': cantidad,
-                    'precio': float(producto.precio_venta),
-                    'subtotal': float(subtotal)
-                })
-            
-            # Actualizar total
-            venta.total = total
-            venta.save()
-            
-            # Notificar Firebase
-            try:
-                FirebaseService.ping_update('demo_company')
-            except Exception as e:
-                logger.warning(f"No se pudo notificar a Firebase: {e}")
+                # Descontar stock en orden de id (orden de bloqueo estable entre cajas)
+                for producto_id in sorted(cantidades):
+                    producto = productos[producto_id]
+                    cantidad = cantidades[producto_id]
+                    
+                    # La condición protege frente a ventas hechas por otras vías
+                    actualizados = Producto.objects.filter(
+                        id=producto_id,
+                        stock_actual__gte=cantidad
+                    ).update(
+                        stock_actual=F('stock_actual') - cantidad,
+                        fecha_actualizacion=ahora
+                    )
+                    if not actualizados:
+                        raise ValueError(f"Stock insuficiente para {producto.nombre}")
+                    
+                    subtotal = producto.precio_venta * cantidad
+                    total += subtotal
+                    
+                    items.append(ItemVenta(
+                        venta=venta,
+                        producto=producto,
+                        cantidad=cantidad,
+                        precio_unitario=producto.precio_venta,
+                        costo_unitario=producto.precio_compra,
+                        subtotal=subtotal
+                    ))
+                    
+                    items_creados.append({
+                        'producto': producto.nombre,
+                        'cantidad': cantidad,
+                        'precio': float(producto.precio_venta),
+                        'subtotal': float(subtotal)
+                    })
+                
+                ItemVenta.objects.bulk_create(items)
+                
+                # Actualizar total
+                venta.total = total
+                venta.save(update_fields=['total'])
+                
+                # Las reservas quedan consumidas por la venta
+                if carrito_id:
+                    ReservaService.liberar(carrito_id)
+                
+                # Notificar en tiempo real (agrupado, después del commit)
+                transaction.on_commit(lambda: notificar_cambio('demo_company'))
             
             logger.info(f"Venta #{venta.id} creada: ${total}")
             
@@ -157,6 +349,12 @@ class VentaService:
                 'mensaje': f'Venta registrada exitosamente: ${total:.2f}'
             }
             
+        except Producto.DoesNotExist:
+            logger.error("Error de validación: producto no encontrado")
+            return {
+                'success': False,
+                'mensaje': 'Producto no encontrado'
+            }
         except ValueError as e:
             logger.error(f"Error de validación: {e}")
             return {
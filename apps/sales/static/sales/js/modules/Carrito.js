@@ -5,9 +5,28 @@
 class Carrito {
     constructor() {
         this.items = [];
+        this.carritoId = Carrito.generateId(); // Identifica las reservas de stock en el servidor
         this.onCartUpdate = null; // Callback
     }
 
+    /**
+     * Generar ID único del carrito
+     */
+    static generateId() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+    }
+
+    /**
+     * Cantidad actual de un producto en el carrito
+     */
+    getQuantity(productoId) {
+        const existente = this.items.find(item => item.producto_id === productoId);
+        return existente ? existente.cantidad : 0;
+    }
+
     /**
      * Agregar producto
      */
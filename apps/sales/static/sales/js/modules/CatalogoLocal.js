@@ -0,0 +1,183 @@
+/**
+ * CatalogoLocal - Copia local del catálogo para resolver escaneos sin red
+ *
+ * Descarga una vez el snapshot columnar del catálogo y después solo pide
+ * los productos modificados (delta por versión). Los escaneos se resuelven
+ * con un Map en memoria; el servidor solo atiende códigos desconocidos.
+ */
+
+class CatalogoLocal {
+    constructor(options = {}) {
+        this.storageKey = options.storageKey || 'predicta.pos.catalogo';
+        this.intervaloMs = options.intervaloMs || 30000;
+
+        this.version = 0;
+        this.productos = new Map();   // id -> producto
+        this.porCodigo = new Map();   // codigo_barras -> id
+        this.categorias = {};
+        this.timer = null;
+        this.sincronizando = false;
+    }
+
+    /**
+     * Cargar la copia guardada (o el snapshot) y empezar la sincronización periódica
+     */
+    async init() {
+        const cargado = this.cargarGuardado();
+
+        try {
+            if (cargado) {
+                await this.sincronizar();
+            } else {
+                await this.descargarSnapshot();
+            }
+        } catch (error) {
+            console.warn('⚠️ Catálogo local sin sincronizar:', error);
+        }
+
+        this.timer = setInterval(() => this.sincronizar(), this.intervaloMs);
+        window.addEventListener('online', () => this.sincronizar());
+
+        console.log(`✅ Catálogo local: ${this.productos.size} productos (versión ${this.version})`);
+    }
+
+    /**
+     * Buscar un producto por código exacto. null si no está en la copia local
+     */
+    buscar(codigo) {
+        const limpio = String(codigo).trim().replace(/[\s-]/g, '');
+        const id = this.porCodigo.get(limpio);
+        return id !== undefined ? { ...this.productos.get(id) } : null;
+    }
+
+    /**
+     * Aplicar los cambios del servidor desde la versión local
+     */
+    async sincronizar() {
+        if (this.sincronizando || !navigator.onLine) return;
+        this.sincronizando = true;
+
+        try {
+            const response = await fetch(`/sales/api/catalogo/delta/?desde=${this.version}`);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+            const delta = await response.json();
+
+            if (delta.completo) {
+                await this.descargarSnapshot();
+                return;
+            }
+
+            this.aplicar(delta);
+            (delta.eliminados || []).forEach(id => this.quitar(id));
+            this.version = delta.version;
+
+            // Productos borrados no llegan en el delta: si no cuadra, recargar todo
+            // sin pasar por la caché HTTP (podría devolver la misma copia desfasada)
+            if (this.productos.size !== delta.total) {
+                await this.descargarSnapshot({ sinCache: true });
+                return;
+            }
+
+            this.guardar();
+        } catch (error) {
+            console.warn('⚠️ No se pudo sincronizar el catálogo:', error);
+        } finally {
+            this.sincronizando = false;
+        }
+    }
+
+    async descargarSnapshot({ sinCache = false } = {}) {
+        const response = await fetch('/sales/api/catalogo/', sinCache ? { cache: 'no-store' } : {});
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+        const snapshot = await response.json();
+
+        this.productos.clear();
+        this.porCodigo.clear();
+        this.aplicar(snapshot);
+        this.version = snapshot.version;
+        this.guardar();
+    }
+
+    /**
+     * Insertar/actualizar las filas de un snapshot o delta (formato columnar)
+     */
+    aplicar(paquete) {
+        this.categorias = paquete.categorias || this.categorias;
+
+        const datos = paquete.datos;
+        for (let i = 0; i < datos.id.length; i++) {
+            const id = datos.id[i];
+            this.quitar(id);
+
+            const producto = {
+                id,
+                nombre: datos.nombre[i],
+                codigo_barras: datos.codigo_barras[i],
+                precio_venta: datos.precio_venta[i],
+                stock: datos.stock[i],
+                categoria: this.categorias[datos.categoria_id[i]] || 'Sin categoría'
+            };
+
+            this.productos.set(id, producto);
+            if (producto.codigo_barras) {
+                this.porCodigo.set(producto.codigo_barras, id);
+            }
+        }
+    }
+
+    quitar(id) {
+        const anterior = this.productos.get(id);
+        if (anterior && anterior.codigo_barras) {
+            this.porCodigo.delete(anterior.codigo_barras);
+        }
+        this.productos.delete(id);
+    }
+
+    cargarGuardado() {
+        try {
+            const guardado = JSON.parse(localStorage.getItem(this.storageKey));
+            if (!guardado) return false;
+
+            this.aplicar(guardado);
+            this.version = guardado.version;
+            return true;
+        } catch (error) {
+            return false;
+        }
+    }
+
+    guardar() {
+        const columnas = { id: [], codigo_barras: [], nombre: [], precio_venta: [], stock: [], categoria_id: [] };
+        const idsCategoria = Object.fromEntries(
+            Object.entries(this.categorias).map(([id, nombre]) => [nombre, id])
+        );
+
+        this.productos.forEach(p => {
+            columnas.id.push(p.id);
+            columnas.codigo_barras.push(p.codigo_barras);
+            columnas.nombre.push(p.nombre);
+            columnas.precio_venta.push(p.precio_venta);
+            columnas.stock.push(p.stock);
+            columnas.categoria_id.push(idsCategoria[p.categoria] || null);
+        });
+
+        try {
+            localStorage.setItem(this.storageKey, JSON.stringify({
+                version: this.version,
+                categorias: this.categorias,
+                datos: columnas
+            }));
+        } catch (error) {
+            // Cuota llena: la copia en memoria sigue sirviendo
+            console.warn('⚠️ No se pudo guardar el catálogo local:', error);
+        }
+    }
+
+    destroy() {
+        clearInterval(this.timer);
+    }
+}
+
+export default CatalogoLocal;
@@ -6,6 +6,7 @@ import BarcodeScanner from './modules/BarcodeScanner.js';
 import VoiceAssistant from './modules/VoiceAssistant.js';
 import SpeechManager from './modules/SpeechManager.js';
 import Carrito from './modules/Carrito.js';
+import CatalogoLocal from './modules/CatalogoLocal.js';
 
 class PuntoVenta {
     constructor() {
@@ -13,6 +14,7 @@ class PuntoVenta {
         this.scanner = new BarcodeScanner();
         this.voiceAssistant = new VoiceAssistant();
         this.carrito = new Carrito();
+        this.catalogo = new CatalogoLocal();
         
         // Estado
         this.currentProduct = null;
@@ -78,6 +80,9 @@ class PuntoVenta {
         this.setupVoiceAssistant();
         this.setupCart();
         
+        // Copia local del catálogo: los escaneos conocidos no van al servidor
+        this.catalogo.init();
+        
         console.log('✅ Punto de Venta listo');
     }
 
@@ -250,18 +255,31 @@ class PuntoVenta {
         await this.scanner.pause();
         
         try {
-            const response = await fetch(`/sales/api/producto/${code}/`);
+            let data;
+            const local = this.catalogo.buscar(code);
             
-            if (!response.ok) {
-                throw new Error('Producto no encontrado');
+            if (local) {
+                data = { encontrado: true, producto: local };
+            } else {
+                // Código desconocido en local: el servidor intenta corregir la lectura
+                const response = await fetch(`/sales/api/producto/${code}/`);
+                
+                if (!response.ok) {
+                    throw new Error('Producto no encontrado');
+                }
+                
+                data = await response.json();
             }
             
-            const data = await response.json();
-            
             if (data.encontrado) {
                 this.currentProduct = data.producto;
                 this.showProductInfo();
-                
+
+                if (data.advertencia) {
+                    // Lectura corregida o parcial: que el cajero confirme el producto
+                    this.showNotification(`${data.advertencia} → ${data.producto.codigo_barras}`, 'warning');
+                }
+
                 if (this.voiceAssistant.isEnabled()) {
                     const message = `${this.currentProduct.nombre} detectado. Precio: ${this.currentProduct.precio_venta} dólares. ¿Cuántos deseas agregar?`;
                     await this.voiceAssistant.speak(message);
@@ -333,6 +351,19 @@ class PuntoVenta {
             return;
         }
         
+        // Apartar el stock en el servidor antes de agregarlo al carrito
+        const cantidadTotal = this.carrito.getQuantity(this.currentProduct.id) + cantidad;
+        const reserva = await this.reservarStock(this.currentProduct.id, cantidadTotal);
+        
+        if (!reserva.success) {
+            const mensaje = reserva.mensaje || 'No se pudo reservar el stock';
+            this.showNotification(mensaje, 'error');
+            if (this.voiceAssistant.isEnabled()) {
+                await this.voiceAssistant.speak(mensaje);
+            }
+            return;
+        }
+        
         const totalParcial = this.carrito.addItem(this.currentProduct, cantidad);
         
         this.DOM.productInfo.classList.add('d-none');
@@ -378,6 +409,7 @@ class PuntoVenta {
             case 'eliminar_ultimo':
                 const removed = this.carrito.removeLastItem();
                 if (removed) {
+                    this.liberarReserva(removed.producto_id);
                     await this.voiceAssistant.speak(`${removed.nombre} eliminado del carrito`);
                 }
                 break;
@@ -428,16 +460,65 @@ class PuntoVenta {
     }
 
     removeCartItem(index) {
+        const item = this.carrito.getItems()[index];
+        if (item) {
+            this.liberarReserva(item.producto_id);
+        }
         this.carrito.removeItem(index);
     }
 
     clearCart() {
         if (confirm('¿Limpiar todo el carrito?')) {
+            this.liberarReserva();
             this.carrito.clear();
             this.voiceAssistant.clearContext();
         }
     }
 
+    /**
+     * Reservar stock en el servidor (cantidad total del producto en el carrito)
+     */
+    async reservarStock(productoId, cantidad) {
+        try {
+            const response = await fetch('/sales/api/reserva/', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this.getCookie('csrftoken')
+                },
+                body: JSON.stringify({
+                    carrito_id: this.carrito.carritoId,
+                    producto_id: productoId,
+                    cantidad: cantidad
+                })
+            });
+            return await response.json();
+        } catch (error) {
+            console.error('Error reservando stock:', error);
+            // Sin respuesta del servidor el stock no quedó apartado: no agregar al carrito
+            return { success: false, mensaje: 'No se pudo reservar el stock. Revisa la conexión e inténtalo de nuevo' };
+        }
+    }
+
+    /**
+     * Liberar reservas del carrito (todas, o solo las de un producto)
+     */
+    liberarReserva(productoId = null) {
+        const body = { carrito_id: this.carrito.carritoId };
+        if (productoId !== null) {
+            body.producto_id = productoId;
+        }
+        
+        fetch('/sales/api/reserva/liberar/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': this.getCookie('csrftoken')
+            },
+            body: JSON.stringify(body)
+        }).catch(error => console.error('Error liberando reserva:', error));
+    }
+
     async showCheckoutModal() {
         const total = this.carrito.getTotal();
         const itemCount = this.carrito.getItemCount();
@@ -470,6 +551,7 @@ class PuntoVenta {
                 },
                 body: JSON.stringify({
                     items: items,
+                    carrito_id: this.carrito.carritoId,
                     usa_voz: this.voiceAssistant.isEnabled(),
                     dispositivo: 'Web'
                 })
@@ -494,6 +576,9 @@ class PuntoVenta {
                 this.voiceAssistant.clearContext();
                 this.DOM.productInfo.classList.add('d-none');
                 
+                // Traer el stock actualizado de lo vendido
+                this.catalogo.sincronizar();
+                
             } else {
                 throw new Error(data.mensaje || 'Error desconocido');
             }
@@ -1,3 +1,270 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from apps.companies.models import Categoria, Producto, Venta
+from .models import ReservaStock
+from .services.indice_codigos import IndiceCodigos
+from .services.reserva_service import ReservaService
+from .services.venta_service import VentaService
+
+
+class BuscarProductoPorCodigoTests(TestCase):
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Cuadernos')
+        self.producto = Producto.objects.create(
+            nombre='Cuaderno Espiral A4', categoria=self.categoria, codigo_barras='7750096385074',
+            precio_venta='3.00', precio_compra='1.50', stock_actual=10
+        )
+
+    def test_codigo_exacto(self):
+        resultado = VentaService.buscar_producto_por_codigo('7750096385074')
+        self.assertTrue(resultado['encontrado'])
+        self.assertEqual(resultado['producto']['id'], self.producto.id)
+
+    def test_codigo_truncado_con_control_valido_usa_el_sufijo(self):
+        # '96385074' es un EAN-8 válido que no está en el catálogo: es el final del código
+        resultado = VentaService.buscar_producto_por_codigo('96385074')
+        self.assertTrue(resultado['encontrado'])
+        self.assertEqual(resultado['producto']['id'], self.producto.id)
+
+        lote = VentaService.buscar_productos_por_codigos(['96385074'])
+        self.assertTrue(lote['96385074']['encontrado'])
+
+    def test_gtin_valido_desconocido(self):
+        resultado = VentaService.buscar_producto_por_codigo('4006381333931')
+        self.assertFalse(resultado['encontrado'])
+
+
+class BuscarProductosLoteViewTests(TestCase):
+
+    def test_cuerpo_que_no_es_objeto(self):
+        respuesta = self.client.post(
+            reverse('sales:buscar_productos_lote'), data='["7750096385074"]', content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(respuesta.json()['success'])
+
+    def test_codigos_vacios(self):
+        respuesta = self.client.post(
+            reverse('sales:buscar_productos_lote'), data={'codigos': []}, content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+
+
+@override_settings(VERSIONES_REFRESCO_S=0)
+class IndiceCodigosTests(TransactionTestCase):
+    """El índice solo se reconstruye cuando cambia un campo del catálogo"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Cuadernos')
+        self.producto = Producto.objects.create(
+            nombre='Cuaderno Espiral A4', categoria=categoria, codigo_barras='7750096385074',
+            precio_venta='3.00', precio_compra='1.50', stock_actual=10
+        )
+        self.indice = IndiceCodigos()
+        self.indice.buscar('7750096385074')
+
+    def test_acierto_es_una_consulta(self):
+        # Versión ya leída en este proceso: solo la verificación de stock por clave primaria
+        with override_settings(VERSIONES_REFRESCO_S=60), self.assertNumQueries(1):
+            self.assertEqual(self.indice.buscar('7750096385074')['stock'], 10)
+
+    def test_cambio_de_stock_no_reconstruye(self):
+        self.producto.stock_actual = 4
+        self.producto.save(update_fields=['stock_actual', 'fecha_actualizacion'])
+
+        resumen = self.indice.buscar('7750096385074')
+
+        self.assertEqual(resumen['stock'], 4)
+        self.assertEqual(self.indice.stats()['cargas'], 1)
+        self.assertEqual(self.indice.stats()['deltas'], 0)
+
+    def test_cambio_de_precio_relee_el_producto(self):
+        self.producto.precio_venta = '3.50'
+        self.producto.save()
+
+        resumen = self.indice.buscar('7750096385074')
+
+        self.assertEqual(resumen['precio_venta'], 3.5)
+        self.assertEqual(self.indice.stats()['cargas'], 1)
+        self.assertEqual(self.indice.stats()['deltas'], 1)
+
+    def test_cambio_de_codigo(self):
+        self.producto.codigo_barras = '4006381333931'
+        self.producto.save()
+
+        self.assertIsNone(self.indice.buscar('7750096385074'))
+        self.assertEqual(self.indice.buscar('4006381333931')['id'], self.producto.id)
+
+
+class CatalogoApiTests(TestCase):
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Cuadernos')
+        self.productos = [
+            Producto.objects.create(
+                nombre=f'Cuaderno {i}', categoria=self.categoria, codigo_barras=f'77500963850{i:02d}',
+                precio_venta='3.00', precio_compra='1.50', stock_actual=10
+            )
+            for i in range(3)
+        ]
+
+    def _snapshot(self, etag=None):
+        cabeceras = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse('sales:catalogo_snapshot'), **cabeceras)
+
+    def test_snapshot_sin_cambios_responde_304(self):
+        respuesta = self._snapshot()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['total'], 3)
+
+        self.assertEqual(self._snapshot(respuesta['ETag']).status_code, 304)
+
+    def test_borrado_de_un_producto_antiguo_cambia_el_etag(self):
+        etag = self._snapshot()['ETag']
+        # No es el más reciente: la fecha_actualizacion máxima no se mueve
+        self.productos[0].delete()
+
+        respuesta = self._snapshot(etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['total'], 2)
+
+    def test_renombrar_categoria_cambia_el_etag(self):
+        etag = self._snapshot()['ETag']
+        self.categoria.nombre = 'Cuadernos y blocks'
+        self.categoria.save()
+
+        respuesta = self._snapshot(etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('Cuadernos y blocks', respuesta.json()['categorias'].values())
+
+    def test_delta_trae_cambios_y_desactivados(self):
+        version = self._snapshot().json()['version']
+        cambiado, desactivado = self.productos[1], self.productos[2]
+        cambiado.precio_venta = '4.00'
+        cambiado.save()
+        desactivado.activo = False
+        desactivado.save()
+
+        delta = self.client.get(reverse('sales:catalogo_delta'), {'desde': version}).json()
+
+        self.assertIn(cambiado.id, delta['datos']['id'])
+        self.assertEqual(delta['eliminados'], [desactivado.id])
+        self.assertEqual(delta['total'], 2)
+        self.assertGreaterEqual(delta['version'], version)
+
+    def test_delta_con_version_invalida(self):
+        url = reverse('sales:catalogo_delta')
+        self.assertEqual(self.client.get(url, {'desde': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'desde': 10 ** 20}).status_code, 400)
+
+
+class ReservaStockTests(TestCase):
+    """Reservas por carrito: apartar, expirar, liberar y confirmar con la venta"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Cuadernos')
+        self.producto = Producto.objects.create(
+            nombre='Cuaderno Espiral A4', categoria=categoria,
+            precio_venta='3.00', precio_compra='1.50', stock_actual=5
+        )
+
+    def _disponible(self, excluir_carrito=None):
+        return ReservaService.stock_disponible([self.producto.id], excluir_carrito)[self.producto.id]
+
+    def test_reserva_aparta_stock_para_otros_carritos(self):
+        resultado = ReservaService.reservar('caja-1', self.producto.id, 3)
+
+        self.assertTrue(resultado['success'])
+        self.assertEqual(self._disponible(), 2)
+        self.assertEqual(self._disponible(excluir_carrito='caja-1'), 5)
+
+        rechazada = ReservaService.reservar('caja-2', self.producto.id, 3)
+        self.assertFalse(rechazada['success'])
+        self.assertEqual(rechazada['disponible'], 2)
+
+    def test_la_cantidad_es_el_total_del_carrito(self):
+        ReservaService.reservar('caja-1', self.producto.id, 2)
+        ReservaService.reservar('caja-1', self.producto.id, 4)
+
+        self.assertEqual(ReservaService.reservas_activas('caja-1'), {self.producto.id: 4})
+
+        ReservaService.reservar('caja-1', self.producto.id, 0)
+        self.assertEqual(ReservaService.reservas_activas('caja-1'), {})
+
+    def test_reserva_expirada_no_cuenta_y_se_limpia(self):
+        ReservaService.reservar('caja-1', self.producto.id, 3)
+        ReservaStock.objects.update(expira_en=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self._disponible(), 5)
+        self.assertEqual(ReservaService.reservas_activas('caja-1'), {})
+        self.assertTrue(ReservaService.reservar('caja-2', self.producto.id, 5)['success'])
+
+        ReservaStock.objects.filter(carrito_id='caja-2').update(expira_en=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(ReservaService.limpiar_expiradas(), 2)
+
+    def test_liberar(self):
+        ReservaService.reservar('caja-1', self.producto.id, 3)
+
+        self.assertEqual(ReservaService.liberar('caja-1'), 1)
+        self.assertEqual(self._disponible(), 5)
+
+    def test_venta_confirma_la_reserva(self):
+        ReservaService.reservar('caja-1', self.producto.id, 3)
+
+        resultado = VentaService.crear_venta(
+            [{'producto_id': self.producto.id, 'cantidad': 3}], carrito_id='caja-1'
+        )
+
+        self.assertTrue(resultado['success'])
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 2)
+        self.assertFalse(ReservaStock.objects.exists())
+
+    def test_venta_sin_reserva_respeta_las_de_otros_carritos(self):
+        ReservaService.reservar('caja-1', self.producto.id, 4)
+
+        resultado = VentaService.crear_venta([{'producto_id': self.producto.id, 'cantidad': 2}], carrito_id='caja-2')
+
+        self.assertFalse(resultado['success'])
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 5)
+
+    def test_descuento_condicional_si_el_stock_bajo_por_otra_via(self):
+        # La reserva se hizo con stock, pero luego se vendió por otra vía
+        ReservaService.reservar('caja-1', self.producto.id, 3)
+        Producto.objects.filter(id=self.producto.id).update(stock_actual=1)
+
+        resultado = VentaService.crear_venta(
+            [{'producto_id': self.producto.id, 'cantidad': 3}], carrito_id='caja-1'
+        )
+
+        self.assertFalse(resultado['success'])
+        self.assertIn('Stock insuficiente', resultado['mensaje'])
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 1)
+        self.assertFalse(Venta.objects.exists())
+
+    def test_vista_responde_409_sin_stock(self):
+        respuesta = self.client.post(
+            reverse('sales:reservar_stock'),
+            data={'carrito_id': 'caja-1', 'producto_id': self.producto.id, 'cantidad': 6},
+            content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertFalse(respuesta.json()['success'])
+
+    def test_vista_informa_el_error_del_servidor(self):
+        with mock.patch.object(ReservaService, 'reservar', side_effect=RuntimeError('bd caída')):
+            respuesta = self.client.post(
+                reverse('sales:reservar_stock'),
+                data={'carrito_id': 'caja-1', 'producto_id': self.producto.id, 'cantidad': 1},
+                content_type='application/json'
+            )
+        self.assertEqual(respuesta.status_code, 500)
+        self.assertFalse(respuesta.json()['success'])
@@ -6,6 +6,11 @@ app_name = 'sales'
 urlpatterns = [
     path('', views.punto_venta, name='punto_venta'),
     path('api/producto/<str:codigo>/', views.buscar_producto_por_codigo, name='buscar_producto'),
+    path('api/productos/lote/', views.buscar_productos_lote, name='buscar_productos_lote'),
+    path('api/catalogo/', views.catalogo_snapshot, name='catalogo_snapshot'),
+    path('api/catalogo/delta/', views.catalogo_delta, name='catalogo_delta'),
     path('api/venta/', views.crear_venta, name='crear_venta'),
+    path('api/reserva/', views.reservar_stock, name='reservar_stock'),
+    path('api/reserva/liberar/', views.liberar_reserva, name='liberar_reserva'),
     path('api/comando-voz/', views.interpretar_comando_voz, name='comando_voz'),
 ]
\ No newline at end of file
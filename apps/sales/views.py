@@ -1,11 +1,14 @@
 from django.shortcuts import render
 from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_http_methods, etag
 import json
 import logging
 
 from .services.venta_service import VentaService
 from .services.chatbot_voz_service import ChatbotVozService
+from .services.reserva_service import ReservaService
+from .services.catalogo_service import CatalogoService
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +18,9 @@ def punto_venta(request):
 
 @require_http_methods(["GET"])
 def buscar_producto_por_codigo(request, codigo):
-    """API: Buscar producto por código de barras"""
-    resultado = VentaService.buscar_producto_por_codigo(codigo)
+    """API: Buscar producto por código de barras (?corregir=0 desactiva la corrección de lecturas)"""
+    corregir = request.GET.get('corregir', '1') != '0'
+    resultado = VentaService.buscar_producto_por_codigo(codigo, corregir=corregir)
     
     if resultado['encontrado']:
         return JsonResponse(resultado)
@@ -24,6 +28,60 @@ def buscar_producto_por_codigo(request, codigo):
         status = 404 if not resultado.get('multiples') else 200
         return JsonResponse(resultado, status=status)
 
+@require_http_methods(["POST"])
+def buscar_productos_lote(request):
+    """API: Resolver varios códigos de barras en una sola petición"""
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            return JsonResponse({'success': False, 'mensaje': 'Se esperaba un objeto JSON'}, status=400)
+        
+        codigos = data.get('codigos')
+        
+        if not isinstance(codigos, list) or not codigos:
+            return JsonResponse({'success': False, 'mensaje': 'codigos debe ser una lista no vacía'}, status=400)
+        
+        resultados = VentaService.buscar_productos_por_codigos(
+            codigos,
+            corregir=data.get('corregir', True)
+        )
+        
+        return JsonResponse({
+            'success': True,
+            'resultados': resultados,
+            'encontrados': sum(1 for r in resultados.values() if r['encontrado']),
+            'total': len(resultados)
+        })
+        
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'mensaje': 'JSON inválido'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'mensaje': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error en búsqueda por lote: {e}")
+        return JsonResponse({'success': False, 'mensaje': 'Error del servidor'}, status=500)
+
+@require_http_methods(["GET"])
+@gzip_page
+@etag(lambda request: CatalogoService.etag())
+def catalogo_snapshot(request):
+    """API: Catálogo completo (columnar) para la caché local de la caja"""
+    return JsonResponse(CatalogoService.snapshot())
+
+@require_http_methods(["GET"])
+@gzip_page
+def catalogo_delta(request):
+    """API: Productos modificados desde ?desde=<version>"""
+    try:
+        desde = int(request.GET.get('desde', ''))
+    except ValueError:
+        return JsonResponse({'success': False, 'mensaje': 'desde debe ser una versión numérica'}, status=400)
+    
+    try:
+        return JsonResponse(CatalogoService.delta(max(desde, 0)))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'mensaje': str(e)}, status=400)
+
 @require_http_methods(["POST"])
 def crear_venta(request):
     """API: Crear venta"""
@@ -32,11 +90,13 @@ def crear_venta(request):
         items = data.get('items', [])
         usa_voz = data.get('usa_voz', True)
         dispositivo = data.get('dispositivo', 'Web')
+        carrito_id = data.get('carrito_id')
         
         resultado = VentaService.crear_venta(
             items_data=items,
             usa_voz=usa_voz,
-            dispositivo=dispositivo
+            dispositivo=dispositivo,
+            carrito_id=carrito_id
         )
         
         if resultado['success']:
@@ -51,8 +111,49 @@ def crear_venta(request):
         return JsonResponse({'success': False, 'mensaje': 'Error del servidor'}, status=500)
 
 @require_http_methods(["POST"])
-def interpretar_comando_voz(request):
-    """API: Interpretar comando de voz"""
+def reservar_stock(request):
+    """API: Reservar stock para un producto del carrito (cantidad total en el carrito)"""
+    try:
+        data = json.loads(request.body)
+        carrito_id = data.get('carrito_id')
+        producto_id = data.get('producto_id')
+        cantidad = int(data.get('cantidad', 1))
+        
+        if not carrito_id or not producto_id:
+            return JsonResponse({'success': False, 'mensaje': 'carrito_id y producto_id son requeridos'}, status=400)
+        
+        resultado = ReservaService.reservar(carrito_id, producto_id, cantidad)
+        
+        if resultado['success']:
+            return JsonResponse(resultado)
+        else:
+            return JsonResponse(resultado, status=409 if 'disponible' in resultado else 400)
+            
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return JsonResponse({'success': False, 'mensaje': 'JSON inválido'}, status=400)
+    except Exception as e:
+        logger.error(f"Error reservando stock: {e}")
+        return JsonResponse({'success': False, 'mensaje': 'Error al reservar stock'}, status=500)
+
+@require_http_methods(["POST"])
+def liberar_reserva(request):
+    """API: Liberar reservas del carrito (todas o solo las de un producto)"""
+    try:
+        data = json.loads(request.body)
+        carrito_id = data.get('carrito_id')
+        
+        if not carrito_id:
+            return JsonResponse({'success': False, 'mensaje': 'carrito_id es requerido'}, status=400)
+        
+        liberadas = ReservaService.liberar(carrito_id, data.get('producto_id'))
+        return JsonResponse({'success': True, 'liberadas': liberadas})
+        
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'mensaje': 'JSON inválido'}, status=400)
+
+@require_http_methods(["POST"])
+async def interpretar_comando_voz(request):
+    """API: Interpretar comando de voz (async: no ocupa un worker mientras responde OpenAI)"""
     try:
         data = json.loads(request.body)
         texto = data.get('texto', '')
@@ -64,7 +165,7 @@ def interpretar_comando_voz(request):
                 'respuesta_chatbot': 'No escuché nada.'
             })
         
-        resultado = ChatbotVozService.interpretar_comando_voz(texto, contexto)
+        resultado = await ChatbotVozService.interpretar_comando_voz_async(texto, contexto)
         return JsonResponse(resultado)
         
     except Exception as e: